@@ -1,11 +1,13 @@
 import logging
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
 
 from config.defaults import CONFIG  # Assuming your config is here
-from nlp.retrieve.retrieval_chain import create_retrieval_qa_chain
+from nlp.embed.namespaces import default_namespace
+from nlp.retrieve.cache import cache_stats
+from nlp.retrieve.retrieval_chain import answer_question, create_retrieval_qa_chain
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -32,13 +34,15 @@ class QueryRequest(BaseModel):
         ],
     )
     chat_id: str = Field(..., example="abc-123-session-id")
+    # Document set to answer from; see CONFIG["CHROMA"]["NAMESPACES"]
+    namespace: Optional[str] = Field(default=None, example="default")
 
 
 # ----- End of change -----
 
 
 # ----- Initialize QA chain map (per chat_id memory) -----
-qa_chain_map = {}  # Stores qa_chain instances per chat_id
+qa_chain_map = {}  # Stores qa_chain instances per (namespace, chat_id)
 # ----- End of change -----
 
 
@@ -51,64 +55,53 @@ def chat_endpoint(request: QueryRequest):
         query = request.question
         chat_history = request.chat_history
         chat_id = request.chat_id
+        namespace = request.namespace or default_namespace()
 
-        logger.info(f"Processing question for chat_id: {chat_id}")
+        logger.info(f"Processing question for chat_id: {chat_id} in namespace: {namespace}")
 
         # ----- Create/reuse QA chain with memory per chat_id -----
-        if chat_id not in qa_chain_map:
+        # Chains share the namespace's cached retriever; only the memory is per chat
+        key = (namespace, chat_id)
+        if key not in qa_chain_map:
             logger.debug(f"No chain found for chat_id={chat_id}, creating new one.")
-            qa_chain_map[chat_id] = create_retrieval_qa_chain()
-        qa_chain = qa_chain_map[chat_id]
+            try:
+                qa_chain_map[key] = create_retrieval_qa_chain(namespace)
+            except ValueError as e:
+                raise HTTPException(status_code=404, detail=str(e))
+        qa_chain = qa_chain_map[key]
         # ----- End of change -----
 
-        # Step 1: Retrieve the relevant documents based on the query
-        retrieved_docs = qa_chain.retriever.get_relevant_documents(query)
-        logger.info(f"Retrieved {len(retrieved_docs)} documents for query: {query}")
-
-        # Step 2: Combine the question and retrieved documents into a single input string
-        input_data = (
-            query + "\n\n" + "\n".join([doc.page_content for doc in retrieved_docs])
+        # Steps 1-3: condense, retrieve once, answer from exactly those chunks
+        result = answer_question(qa_chain, query, chat_history)
+        answer = result["answer"]
+        documents = result["source_documents"]
+        logger.info(
+            f"Answered from {len(documents)} document(s) with {result['retrievals']} retrieval(s)."
         )
-        logger.debug(
-            f"Input data being passed to QA chain: {input_data[:500]}..."
-        )  # Preview first 500 chars
-
-        # Step 3: Prepare the input payload with the correct format
-        input_payload = {
-            "question": input_data,
-            "chat_history": chat_history,
-        }
-        logger.debug(f"Input payload to qa_chain.invoke: {input_payload}")
-
-        # Step 4: Invoke the chain and get the raw response
-        raw_response = qa_chain.invoke(input_payload)
-
-        logger.info("QA chain processed the question.")
-        logger.debug(f"Raw response from QA chain: {raw_response}")
-        logger.debug(f"Raw response keys: {list(raw_response.keys())}")
 
-        # Step 5: Save only the 'answer' in memory
-        answer = raw_response.get("answer", "No answer found")
-        qa_chain.memory.save_context({"question": query}, {"answer": answer})
-
-        # Step 6: Log source documents if configured
-        if return_source_documents and "source_documents" in raw_response:
+        # Step 4: Log source documents if configured
+        if return_source_documents:
             logger.info("Source documents used:")
-            for i, doc in enumerate(raw_response["source_documents"], 1):
-                metadata = doc.metadata
-                content = doc.page_content
-                logger.info(f"[{i}] Metadata: {metadata}")
-                logger.info(f"[{i}] Content Preview: {content[:200]}...")
+            for i, doc in enumerate(documents, 1):
+                logger.info(f"[{i}] Metadata: {doc.metadata}")
+                logger.info(f"[{i}] Content Preview: {doc.page_content[:200]}...")
 
-        # Step 7: Return response
+        # Step 5: Return response
         updated_chat_history = qa_chain.memory.chat_memory.messages
         return {
             "answer": answer,
             "chat_history": updated_chat_history,
             "memory_output": {"answer": answer},
-            "source_documents": raw_response.get("source_documents", []),
+            # The chunks the answer was generated from
+            "source_documents": documents,
+            "retrievals": result["retrievals"],
+            "single_retrieval": result["retrievals"] == 1,
+            # Token budget, tokens used and saved vs. sending every chunk
+            "context": result["context"],
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(
             f"Error occurred while processing the request:\n{e}", exc_info=True
@@ -116,6 +109,12 @@ def chat_endpoint(request: QueryRequest):
         return {"error": "An error occurred while processing your request."}
 
 
+@app.get("/cache/stats")
+def cache_stats_endpoint():
+    """Hit rates and estimated latency saved by the retrieval caches."""
+    return cache_stats()
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,102 @@
+# - benchmarks/bench_chunk_store.py
+"""
+Load time and peak Python memory: chunked_docs.jsonl vs the Arrow chunk store.
+
+    python -m benchmarks.bench_chunk_store [--chunks N] [--repeat N]
+
+Synthetic chunks are written in both formats to a temporary directory. The
+"jsonl" row is the old --from-disk path (load_from_jsonl, then
+dicts_to_documents); "arrow stream" turns the store into Documents one batch
+at a time; "arrow open+count" opens the memory map and counts rows.
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+# config.defaults refuses to import without these; nothing here talks to the network
+for var in ("CLOUDFLARE_API_TOKEN", "CLOUDFLARE_ACCOUNT_ID", "CLOUDFLARE_GATEWAY_ID", "OPENAI_API_KEY"):
+    os.environ.setdefault(var, "bench")
+
+from nlp.utils.chunk_store import ChunkStore, iter_chunk_documents, write_chunks
+from nlp.utils.converter import dicts_to_documents
+from nlp.utils.io_jsonl import load_from_jsonl
+
+
+def synthetic_chunks(n):
+    sentence = "Retrieval quality depends on how documents are split into chunks. "
+    for i in range(n):
+        yield {
+            "page_content": sentence * 8,
+            "metadata": {
+                "chunk_id": f"{i:032x}",
+                "source": f"source/docs/page_{i // 10}.html",
+                "title": f"Page {i // 10}",
+            },
+        }
+
+
+def load_jsonl(path):
+    # dicts_to_documents prints a preview; keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        return len(dicts_to_documents(load_from_jsonl(path)))
+
+
+def stream_arrow(path):
+    return sum(1 for _ in iter_chunk_documents(path))
+
+
+def count_arrow(path):
+    with ChunkStore(path) as store:
+        return len(store)
+
+
+def measure(load, path, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        count = load(path)
+    seconds = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    load(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger("nlp").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl_path = os.path.join(tmp, "chunked_docs.jsonl")
+        arrow_path = os.path.join(tmp, "chunks.arrow")
+        write_chunks(synthetic_chunks(args.chunks), jsonl_path)
+        write_chunks(synthetic_chunks(args.chunks), arrow_path)
+        print(
+            f"{args.chunks} chunks: jsonl {os.path.getsize(jsonl_path) / 1024**2:.1f} MiB, "
+            f"arrow {os.path.getsize(arrow_path) / 1024**2:.1f} MiB"
+        )
+        print(f"{'path':<18}{'seconds':>10}{'chunks/s':>12}{'peak MiB':>10}")
+        for label, load, path in (
+            ("jsonl", load_jsonl, jsonl_path),
+            ("arrow stream", stream_arrow, arrow_path),
+            ("arrow open+count", count_arrow, arrow_path),
+        ):
+            count, seconds, peak = measure(load, path, args.repeat)
+            assert count == args.chunks, (label, count)
+            print(
+                f"{label:<18}{seconds:>10.3f}{count / seconds:>12.0f}"
+                f"{peak / 1024**2:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
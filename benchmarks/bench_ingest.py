@@ -0,0 +1,267 @@
+# - benchmarks/bench_ingest.py
+"""
+Stage-by-stage ingest throughput against a local mock Workers-AI gateway.
+
+    python -m benchmarks.bench_ingest [--docs N] [--latency S] [--error-rate R]
+        [--rate-limit N] [--workers N] [--output run.json] [--compare base.json]
+
+Generates a synthetic corpus (benchmarks.corpus), then times the stages of
+scripts/ingest.py one after another: discovery, parse, chunk, dedup, embed and
+store. For each it reports items/sec, the peak RSS of this process during the
+stage (sampled), the peak RSS of worker processes that exited during it (the
+parse pool) and, for embed and store, p50/p99 latency per call (one embedding
+request batch, one Chroma upsert). The total's peak RSS is the whole run's.
+The report is JSON, so runs from different commits can be compared with
+--compare.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# config.defaults refuses to import without these; the mock gateway ignores them
+for var in ("CLOUDFLARE_API_TOKEN", "CLOUDFLARE_ACCOUNT_ID", "CLOUDFLARE_GATEWAY_ID", "OPENAI_API_KEY"):
+    os.environ.setdefault(var, "bench")
+os.environ["CHROMA_TELEMETRY_ENABLED"] = "false"
+
+from benchmarks.corpus import generate_corpus
+from config.defaults import CONFIG
+from input.get_files import get_files, load_documents
+from nlp.chunk.chunker import chunker
+from nlp.chunk.dedup import dedup_chunks
+from nlp.embed.model import CloudflareEmbeddings
+from nlp.embed.store import ChromaBatchWriter
+from nlp.embed.utils import open_collection
+from tests.mock_gateway import MockGateway
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile; None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def peak_rss_mb():
+    """Highest RSS so far of this process and of any exited child, in MiB."""
+    # ru_maxrss is in KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"self": round(own / 1024, 1), "children": round(children / 1024, 1)}
+
+
+def rss_mb():
+    """This process's RSS now, in MiB (the running peak where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return peak_rss_mb()["self"]
+
+
+class RssSampler:
+    """Track this process's highest RSS while running, sampled every ``interval`` seconds."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = rss_mb()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def stop(self):
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+        return self.peak
+
+
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.unit = "items"
+        self.calls = []  # seconds per call, where a stage makes calls
+
+    def report(self, seconds, rss_peak, children_before, children_after):
+        report = {
+            "seconds": round(seconds, 4),
+            "items": self.items,
+            "unit": self.unit,
+            "per_sec": round(self.items / seconds, 1) if seconds else None,
+            # ru_maxrss only ever grows, so children count only if one peaked higher here
+            "peak_rss_mb": {
+                "self": round(rss_peak, 1),
+                "children": children_after if children_after > children_before else None,
+            },
+        }
+        if self.calls:
+            report["calls"] = len(self.calls)
+            report["latency_ms"] = {
+                "p50": round(percentile(self.calls, 0.50) * 1000, 2),
+                "p99": round(percentile(self.calls, 0.99) * 1000, 2),
+            }
+        return report
+
+
+@contextmanager
+def timed(stages, name):
+    stage = Stage(name)
+    children = peak_rss_mb()["children"]
+    sampler = RssSampler()
+    started = time.perf_counter()
+    yield stage
+    seconds = time.perf_counter() - started
+    stages[name] = stage.report(seconds, sampler.stop(), children, peak_rss_mb()["children"])
+
+
+def run_benchmark(source, persist_dir, workers):
+    stages = {}
+    with timed(stages, "discovery") as stage:
+        files = get_files(source)
+        stage.items, stage.unit = len(files), "files"
+
+    with timed(stages, "parse") as stage:
+        documents, _ = load_documents(files, workers=workers)
+        stage.items, stage.unit = len(documents), "docs"
+
+    with timed(stages, "chunk") as stage:
+        chunks = chunker(documents)
+        stage.items, stage.unit = len(chunks), "chunks"
+
+    with timed(stages, "dedup") as stage:
+        stage.items, stage.unit = len(chunks), "chunks"
+        chunks = dedup_chunks(chunks)
+
+    embedding_function = CloudflareEmbeddings()
+    with timed(stages, "embed") as stage:
+        stage.items, stage.unit = len(chunks), "chunks"
+        embeddings = []
+        batch_size = embedding_function.batch_size
+        for start in range(0, len(chunks), batch_size):
+            texts = [chunk["page_content"] for chunk in chunks[start : start + batch_size]]
+            call_started = time.perf_counter()
+            embeddings.extend(embedding_function.embed_documents_partial(texts))
+            stage.calls.append(time.perf_counter() - call_started)
+
+    collection = open_collection(embedding_function, persist_dir, "bench", purge=True)
+    with timed(stages, "store") as stage:
+        stage.unit = "chunks"
+        writer = ChromaBatchWriter(collection)
+        for start in range(0, len(chunks), writer.batch_size):
+            for chunk, embedding in zip(
+                chunks[start : start + writer.batch_size],
+                embeddings[start : start + writer.batch_size],
+            ):
+                if embedding:
+                    metadata = chunk["metadata"]
+                    writer.add(metadata["chunk_id"], chunk["page_content"], metadata, embedding)
+            call_started = time.perf_counter()
+            writer.flush()
+            stage.calls.append(time.perf_counter() - call_started)
+        stage.items = writer.written
+
+    return stages, len(files), len(chunks)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    print(f"{'stage':<11}{'per_sec':>12}{'baseline':>12}{'change':>9}")
+    for name, stage in report["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if not before or not before.get("per_sec") or not stage["per_sec"]:
+            print(f"{name:<11}{stage['per_sec'] or 0:>12.1f}{'-':>12}")
+            continue
+        change = stage["per_sec"] / before["per_sec"] - 1
+        print(f"{name:<11}{stage['per_sec']:>12.1f}{before['per_sec']:>12.1f}{change:>+9.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=12)
+    parser.add_argument("--txt-ratio", type=float, default=0.2)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per gateway response.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 500.")
+    parser.add_argument("--rate-limit", type=int, default=0, help="First N requests get 429.")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes.")
+    parser.add_argument("--cache", action="store_true", help="Keep the embedding cache on.")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout).")
+    parser.add_argument("--compare", help="A previous report to compare throughput against.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    CONFIG["EMBED_CACHE"]["enabled"] = args.cache
+    # Retries should cost the mock's latency, not real-world backoff
+    CONFIG["CLOUDFLARE"]["embed_backoff_base"] = 0.01
+
+    with tempfile.TemporaryDirectory() as tmp, MockGateway(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_first=args.rate_limit,
+        seed=args.seed,
+    ) as gateway:
+        CONFIG["CLOUDFLARE"]["gateway_endpoint"] = gateway.endpoint
+        source = generate_corpus(
+            Path(tmp) / "corpus",
+            docs=args.docs,
+            paragraphs=args.paragraphs,
+            txt_ratio=args.txt_ratio,
+            duplicate_ratio=args.duplicate_ratio,
+            seed=args.seed,
+        )
+        started = time.perf_counter()
+        stages, docs, chunks = run_benchmark(source, os.path.join(tmp, "chroma"), args.workers)
+        total = time.perf_counter() - started
+        requests = len(gateway.requests)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "stages": stages,
+        "total": {
+            "seconds": round(total, 4),
+            "docs_per_sec": round(docs / total, 1),
+            "chunks_per_sec": round(chunks / total, 1),
+            "gateway_requests": requests,
+            "peak_rss_mb": peak_rss_mb(),
+        },
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
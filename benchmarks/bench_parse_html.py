@@ -0,0 +1,67 @@
+# - benchmarks/bench_parse_html.py
+"""
+Pages/sec for each HTML extraction backend, and for main-content mode.
+
+    python -m benchmarks.bench_parse_html [html dir] [--repeat N]
+
+Defaults to the test fixture corpus. Backends that aren't installed are skipped.
+"""
+
+import argparse
+import logging
+import os
+import time
+from pathlib import Path
+
+# config.defaults refuses to import without these; nothing here talks to the network
+for var in ("CLOUDFLARE_API_TOKEN", "CLOUDFLARE_ACCOUNT_ID", "CLOUDFLARE_GATEWAY_ID", "OPENAI_API_KEY"):
+    os.environ.setdefault(var, "bench")
+
+from input.parse_html import HTML_BACKENDS, parse_html
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "html"
+
+
+def bench(files, backend, repeat, mode):
+    HTML_BACKENDS[backend]("<p>warm up</p>")  # raises ImportError if not installed
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for path in files:
+            parse_html(str(path), backend=backend, mode=mode)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", nargs="?", default=str(FIXTURES))
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.getLogger("input").setLevel(logging.WARNING)
+    files = sorted(Path(args.source).rglob("*.html"))
+    if not files:
+        raise SystemExit(f"No .html files under {args.source}")
+    megabytes = sum(path.stat().st_size for path in files) * args.repeat / 1024**2
+    pages = len(files) * args.repeat
+
+    print(f"{len(files)} page(s), {megabytes / args.repeat:.2f} MiB, x{args.repeat}")
+    print(f"{'backend':<12}{'pages/s':>10}{'MiB/s':>10}{'speedup':>10}")
+    baseline = None
+    # Full-text extraction per backend, then main-content mode (always lxml)
+    runs = [(backend, backend, "full") for backend in HTML_BACKENDS]
+    runs.append(("main", "lxml", "main"))
+    for label, backend, mode in runs:
+        try:
+            seconds = bench(files, backend, args.repeat, mode)
+        except ImportError:
+            print(f"{label:<12}{'not installed':>30}")
+            continue
+        baseline = baseline or seconds
+        print(
+            f"{label:<12}{pages / seconds:>10.1f}{megabytes / seconds:>10.2f}"
+            f"{baseline / seconds:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
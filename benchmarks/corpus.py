@@ -0,0 +1,95 @@
+# - benchmarks/corpus.py
+"""
+Synthetic HTML/TXT corpus for the ingest benchmarks.
+
+    python -m benchmarks.corpus <output dir> [--docs N] [--paragraphs N] [--txt-ratio R]
+
+Pages share a site header, nav and footer (what main-content extraction and
+dedup are there to remove), and a ``--duplicate-ratio`` share of them repeat
+another page's body, so every stage has realistic work. The same seed always
+writes the same corpus.
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+WORDS = (
+    "ingest pipeline vector store embedding chunk retrieval query gateway model "
+    "document parser token overlap batch latency throughput cache index search "
+    "answer context prompt source metadata collection worker process memory disk"
+).split()
+
+NAV = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(12))
+HEADER = f'<header class="site-header"><h1>Example Docs</h1><nav class="menu"><ul>{NAV}</ul></nav></header>'
+FOOTER = '<footer class="site-footer"><p>Copyright Example Inc. All rights reserved.</p></footer>'
+
+
+def paragraph(rng: random.Random) -> str:
+    sentences = []
+    for _ in range(rng.randint(3, 6)):
+        words = rng.choices(WORDS, k=rng.randint(8, 18))
+        sentences.append(" ".join(words).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def html_page(title: str, paragraphs) -> str:
+    body = "".join(f"<p>{text}</p>" for text in paragraphs)
+    return (
+        f"<!DOCTYPE html><html><head><title>{title}</title></head><body>{HEADER}"
+        f'<main><article class="content"><h2>{title}</h2>{body}</article></main>'
+        f"{FOOTER}</body></html>"
+    )
+
+
+def generate_corpus(
+    output_dir,
+    docs: int = 200,
+    paragraphs: int = 12,
+    txt_ratio: float = 0.2,
+    duplicate_ratio: float = 0.1,
+    seed: int = 0,
+) -> Path:
+    """Write ``docs`` files under ``output_dir``, 50 per subdirectory; returns the directory."""
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    bodies = []
+    for i in range(docs):
+        if bodies and rng.random() < duplicate_ratio:
+            body = rng.choice(bodies)
+        else:
+            body = [paragraph(rng) for _ in range(max(1, int(rng.gauss(paragraphs, paragraphs / 4))))]
+            bodies.append(body)
+        folder = output_dir / f"part{i // 50:03d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        title = f"Page {i}"
+        if rng.random() < txt_ratio:
+            (folder / f"page{i:05d}.txt").write_text(title + "\n\n" + "\n\n".join(body))
+        else:
+            (folder / f"page{i:05d}.html").write_text(html_page(title, body))
+    return output_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output_dir")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=12)
+    parser.add_argument("--txt-ratio", type=float, default=0.2)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = generate_corpus(
+        args.output_dir,
+        docs=args.docs,
+        paragraphs=args.paragraphs,
+        txt_ratio=args.txt_ratio,
+        duplicate_ratio=args.duplicate_ratio,
+        seed=args.seed,
+    )
+    print(f"Wrote {args.docs} file(s) under {path}")
+
+
+if __name__ == "__main__":
+    main()
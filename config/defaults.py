@@ -7,6 +7,7 @@ load_dotenv()
 
 CONFIG = {
     "DEFAULT_PROVIDER": "CLOUDFLARE",
+    # Retrieval backend: "CHROMA", or "HNSW" (ingest still writes to Chroma)
     "DEFAULT_VECTORDB": "CHROMA",
     "CLOUDFLARE": {
         "gateway_endpoint": "https://gateway.ai.cloudflare.com/v1/{account_id}/{gateway_id}/workers-ai/{model_id}",
@@ -18,6 +19,42 @@ CONFIG = {
         "chunk_overlap": 50,
         "similarity_threshold": 0.75,
         "debug_mode": True,
+        # Embedding requests are batched; a batch closes at whichever limit is hit first
+        "embed_batch_size": 100,
+        "embed_batch_max_bytes": 256 * 1024,
+        # Async embedding (aembed_documents / ingest --concurrency)
+        "embed_concurrency": 4,  # batches in flight at once
+        "embed_max_rps": 0,  # requests per second across all in-flight batches; 0 = unlimited
+        "embed_max_retries": 5,  # per batch, on 429/5xx and connection errors
+        "embed_backoff_base": 0.5,  # seconds; full-jitter exponential backoff
+        "embed_backoff_max": 30,
+    },
+    "LOCAL": {
+        # CPU embeddings through ONNX Runtime; select with DEFAULT_PROVIDER = "LOCAL".
+        # Expects <MODEL_DIR>/<model name>/model.onnx (or onnx/model.onnx) and tokenizer.json
+        "EMBED_MODEL": "BAAI/bge-small-en-v1.5",  # or sentence-transformers/all-MiniLM-L6-v2
+        "MODEL_DIR": "nlp/persist/models",
+        "quantize": False,  # dynamic int8 quantization, built once next to model.onnx
+        "num_threads": 4,  # ONNX Runtime intra-op threads
+        "batch_size": 32,
+        "max_length": 512,
+    },
+    "EMBED_CACHE": {
+        # Content-addressed document embeddings, keyed by (model id, normalized text)
+        "enabled": True,
+        "path": "nlp/persist/cache/embeddings.sqlite",
+        "max_bytes": 2 * 1024**3,  # vector bytes kept before LRU eviction
+    },
+    "HTTP": {
+        # Shared keep-alive transport used by every provider client
+        "pool_connections": 4,  # distinct hosts kept in the pool
+        "pool_maxsize": 16,  # connections per host; size to the API threadpool
+        "connect_timeout": 3.05,
+        "read_timeout": 60,
+        "max_retries": 2,  # connection errors and 429 + Retry-After only; never 5xx
+        "backoff_factor": 0.5,
+        "gzip_requests": False,  # compress request bodies (responses always accept gzip)
+        "gzip_min_bytes": 1024,
     },
     "OPENAI": {
         "api_base": "https://api.openai.com/v1",
@@ -28,15 +65,110 @@ CONFIG = {
     },
     "CHROMA": {
         "PERSIST_DIR": "nlp/persist/db/chroma",
-        "COLLECTION_NAME": "document_collection",
+        "COLLECTION_NAME": "document_collection",  # the default namespace's collection
+        "DEFAULT_NAMESPACE": "default",
+        # Each namespace (document set) lives in its own collection; unlisted names
+        # are used as the collection name. e.g. {"handbook": "hr_handbook"}
+        "NAMESPACES": {},
+        "WRITE_BATCH_SIZE": 500,  # records buffered per upsert
+        "MANIFEST_DIR": "nlp/persist/manifests",  # <collection>.json: files behind each collection
+        "RUNS_DB": "nlp/persist/runs.sqlite3",  # ingestion run checkpoints and status records
     },
     "GENERAL": {
         "default_similarity_top_k": 3,
         "max_tokens": 100,
-        "tokenizer_encoding": "gpt2",
+        # Tokens chunks are split and counted in: "embedding" = the embedding model's
+        # tokenizer.json under LOCAL.MODEL_DIR (gpt2 until it's downloaded), a path
+        # to a tokenizer.json, or a tiktoken encoding name
+        "tokenizer_encoding": "embedding",
         "CHUNK_SIZE": 500,
         "CHUNK_OVERLAP": 100,
-        "CHUNK_FILE": "outputs/chunked_docs.jsonl",
+        "CHUNK_UNIT": "chars",  # "tokens" splits by tokenizer_encoding tokens instead (re-embeds all)
+        "CHUNK_TOKENS": 256,  # token budget per chunk when CHUNK_UNIT is "tokens"
+        "CHUNK_TOKEN_OVERLAP": 32,
+        "CHUNK_WORKERS": 1,  # chunking processes for large corpora; 0 = one per CPU
+        "CHUNK_FILE": "outputs/chunks.arrow",  # Arrow IPC chunk store; a .jsonl path keeps JSON lines
+        "PARSE_WORKERS": 1,  # parser processes; 0 = one per CPU
+        "PARSE_TIMEOUT": 120,  # seconds before a single file is abandoned
+        "HTML_EXTRACT": "full",  # "main" drops site chrome (menus, footers); switching re-embeds all HTML
+        "HTML_BACKEND": "auto",  # "selectolax", "lxml" or "bs4"; auto = fastest installed
+        "CHARSET_SNIFF_BYTES": 64 * 1024,  # chardet input cap for non-UTF-8 pages
+    },
+    "STREAM": {
+        # ingest --stream: all stages run at once, joined by bounded queues
+        "queue_size": 8,  # documents or embedding batches buffered between two stages
+        "flush_interval": 2.0,  # seconds before a partial Chroma batch is written
+    },
+    "WATCH": {
+        # ingest --watch: poll the source directory and ingest what changed
+        "poll_interval": 1.0,  # seconds between directory scans
+        "debounce": 2.0,  # quiet seconds after the last change before ingesting
+        "max_wait": 30.0,  # ingest anyway once changes have kept coming this long
+    },
+    "METRICS": {
+        # ingest --report / --progress; nothing is recorded unless one of them is given
+        "report_dir": "outputs/runs",  # <run id>.json when --report has no path
+        "progress_interval": 1.0,  # seconds between progress line updates
+    },
+    "PDF": {
+        "workers": 0,  # page-extraction processes for large PDFs; 0 = one per CPU
+        "parallel_min_pages": 50,  # smaller PDFs are read page by page in-process
+        "page_timeout": 30,  # seconds before a single page is skipped
+        "memory_limit_mb": 1024,  # growth allowed per page worker before MemoryError
+    },
+    "DEDUP": {
+        # Drop repeated chunks (nav bars, footers) between chunking and embedding
+        "enabled": True,
+        "threshold": 0.85,  # estimated Jaccard similarity at which chunks are near-duplicates
+        "num_perm": 128,  # MinHash permutations; more is more accurate and slower
+        "shingle_size": 5,  # words per shingle
+    },
+    "RETRIEVAL_CACHE": {
+        # In-process caches in front of /chat retrieval; see GET /cache/stats
+        "enabled": True,
+        "query_embeddings": 4096,  # query vectors kept (LRU), keyed by normalized question
+        "results": 2048,  # top-k result lists kept (LRU); invalidated by any ingest
+        "result_ttl": 600,  # seconds a cached result list is served
+    },
+    "HNSW": {
+        # Read-only ANN snapshots of Chroma collections; serve from them with
+        # DEFAULT_VECTORDB = "HNSW". Ingest (or scripts.migrate_hnsw) exports them.
+        "PERSIST_DIR": "nlp/persist/db/hnsw",
+        "M": 16,  # graph degree: higher = better recall, more memory
+        "EF_CONSTRUCTION": 200,  # build-time beam width
+        "EF_SEARCH": 64,  # query-time beam width (at least k)
+        "DTYPE": "float16",  # stored vector matrix: "float16" or "float32"
+        "FILTER_OVERFETCH": 4,  # candidates per result when a metadata filter is given
+        "MERGE_RATIO": 0.1,  # ingests add to a delta snapshot; re-export once it covers this share
+    },
+    "BM25": {
+        # Lexical index built at the end of each ingest, fused with vector search
+        "enabled": True,
+        "dir": "nlp/persist/db/bm25",  # one index per collection, next to the Chroma dir
+        "k1": 1.2,
+        "b": 0.75,
+        "max_postings": 2000,  # highest-impact postings read per query term
+        "merge_ratio": 0.1,  # ingests add to a delta index; rebuild once it covers this share
+        "candidates": 20,  # hits taken from each side before fusion
+        "rrf_k": 60,  # reciprocal-rank fusion constant
+        "k": 8,  # chunks returned after fusion; CONTEXT packs the prompt from these
+    },
+    "CONTEXT": {
+        # Which retrieved chunks go into the answer prompt (nlp/retrieve/context.py)
+        "enabled": True,
+        # Prompt tokens for question + history + chunks, per LLM model id
+        "budget_tokens": {"default": 2048, "@cf/openchat/openchat-3.5-0106": 3072},
+        # Tokenizer the prompt is counted in, per LLM model id: a tokenizer.json path or a
+        # tiktoken name; "default" for other models (None = GENERAL.tokenizer_encoding, whose
+        # precomputed chunk token_counts are then reused). openchat-3.5 is a Mistral-7B
+        # fine-tune; to count in Mistral's SentencePiece vocabulary, download its
+        # tokenizer.json and add e.g.
+        #   "@cf/openchat/openchat-3.5-0106": "nlp/persist/models/openchat-3.5-0106/tokenizer.json"
+        "encodings": {"default": None},
+        "mmr_lambda": 0.7,  # relevance vs. diversity; 1 = retrieval order only
+        "duplicate_threshold": 0.9,  # term cosine at which a chunk counts as a repeat
+        "min_trim_tokens": 64,  # a chunk is trimmed to fit only if this much room is left
+        "token_cache": 8192,  # token counts cached per encoding
     },
     "MEMORY": {
         # Options: "buffer", "window", "summary"
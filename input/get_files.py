@@ -2,40 +2,69 @@
 
 import logging
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional, Tuple
 
 from langchain.schema import Document
 
-from input.parser import parse_files
+from input.parser import ParseSummary, parse_files_with_summary
 from input.registry import PARSER_REGISTRY
 from input.utils.filtering import filter_documents  # 👈 New import
+from nlp.utils.metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 
 
-def get_files(source_path: Path) -> List[Path]:
-    """List all supported files in the source directory and its subdirectories."""
-    files = []
+def iter_files(source_path: Path) -> Iterator[Path]:
+    """Yield supported files under the source directory as they are discovered."""
+    metrics = get_metrics()
     for file_path in source_path.rglob("*"):
         if file_path.suffix.lower() in PARSER_REGISTRY:
-            files.append(file_path)
+            metrics.count("files.discovered")
+            yield file_path
         elif file_path.is_dir():
             logger.warning(f"⚠️ Skipping directory: {file_path.name}")
         else:
+            metrics.count("files.unsupported")
             logger.warning(f"⚠️ Skipping unsupported file type: {file_path.name}")
-    return files
 
 
-def load_documents_from_cli(source_path: Path) -> List[Document]:
-    """CLI interface to load and clean documents from the provided directory path."""
-    files = get_files(source_path)
-    logger.info(f"📂 Found {len(files)} supported file(s).")
+def get_files(source_path: Path) -> List[Path]:
+    """List all supported files in the source directory and its subdirectories."""
+    return list(iter_files(source_path))
+
 
-    documents = parse_files(files)
+def load_documents(
+    files: List[Path],
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Tuple[List[Document], ParseSummary]:
+    """Parse and clean the given files; returns the documents and parse summary."""
+    documents, summary = parse_files_with_summary(files, workers=workers, timeout=timeout)
+    summary.log()
     logger.info(f"✅ Parsed {len(documents)} document(s).")
 
     # 🧹 Filter trivial/invalid documents
+    kept = len(documents)
     documents = filter_documents(documents, min_length=50)
+    get_metrics().count("parse.filtered", kept - len(documents))
     logger.info(f"✅ Retained {len(documents)} document(s) after filtering.")
 
+    return documents, summary
+
+
+def load_documents_from_cli(
+    source_path: Path,
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> List[Document]:
+    """
+    CLI interface to load and clean documents from the provided directory path.
+
+    ``workers`` and ``timeout`` are passed to parse_files; by default they come
+    from CONFIG["GENERAL"]["PARSE_WORKERS"] and ["PARSE_TIMEOUT"].
+    """
+    files = get_files(source_path)
+    logger.info(f"📂 Found {len(files)} supported file(s).")
+
+    documents, _ = load_documents(files, workers=workers, timeout=timeout)
     return documents
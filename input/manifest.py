@@ -0,0 +1,136 @@
+# - input/manifest.py
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's bytes, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class ManifestPlan:
+    """What an incremental run has to do, relative to the last recorded run."""
+
+    new: List[Path] = field(default_factory=list)
+    changed: List[Path] = field(default_factory=list)
+    unchanged: List[Path] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def to_ingest(self) -> List[Path]:
+        return self.new + self.changed
+
+    @property
+    def stale_sources(self) -> List[str]:
+        """Sources whose stored vectors must go before re-ingesting."""
+        return [str(path) for path in self.changed] + self.removed
+
+    def log(self):
+        logger.info(
+            f"🗂️ Manifest: {len(self.new)} new, {len(self.changed)} changed, "
+            f"{len(self.unchanged)} unchanged, {len(self.removed)} removed file(s)."
+        )
+
+
+class IngestManifest:
+    """
+    Record of the files behind a collection: path, size, mtime and content hash.
+
+    ``plan()`` compares the files on disk against the record. Size and mtime
+    are checked first, and a file is only re-hashed when either differs, so an
+    unchanged corpus is planned without reading it. Entries are recorded once
+    their vectors are stored and written with ``save()``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, dict] = {}
+        self._observed: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.files = data.get("files", {})
+            else:
+                logger.warning(f"⚠️ Ignoring manifest {path} with unknown version.")
+
+    def plan(self, files: Iterable[Path], complete: bool = True) -> ManifestPlan:
+        """
+        Compare ``files`` with the record. They are normally every file
+        under the source, so recorded files not among them were removed.
+        With ``complete=False`` they are only the paths that may have
+        changed (e.g. from a DirectoryWatcher): those gone from disk are
+        removed, and files not listed are left out of the plan.
+        """
+        plan = ManifestPlan()
+        seen = set()
+        for path in files:
+            source = str(path)
+            seen.add(source)
+            if not complete and not path.exists():
+                if source in self.files:
+                    plan.removed.append(source)
+                continue
+            stat = path.stat()
+            entry = {"size": stat.st_size, "mtime": stat.st_mtime}
+            previous = self.files.get(source)
+            if previous and all(previous[key] == entry[key] for key in entry):
+                plan.unchanged.append(path)
+                continue
+
+            entry["sha256"] = file_digest(path)
+            self._observed[source] = entry
+            if previous is None:
+                plan.new.append(path)
+            elif previous["sha256"] != entry["sha256"]:
+                plan.changed.append(path)
+            else:
+                # Touched but identical: refresh the stat fields, skip the work
+                self.files[source] = entry
+                plan.unchanged.append(path)
+        if complete:
+            plan.removed = sorted(source for source in self.files if source not in seen)
+        else:
+            plan.removed.sort()
+        return plan
+
+    def record(self, path: Path):
+        source = str(path)
+        entry = self._observed.pop(source, None)
+        if entry is None:
+            stat = path.stat()
+            entry = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "sha256": file_digest(path),
+            }
+        self.files[source] = entry
+
+    def forget(self, source: str):
+        self.files.pop(source, None)
+
+    def clear(self):
+        self.files = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, f, indent=1)
+        os.replace(tmp_path, self.path)
+        logger.info(f"💾 Saved manifest of {len(self.files)} file(s) to {self.path}.")
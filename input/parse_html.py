@@ -1,5 +1,6 @@
 # - scripts/load/parse_html.py
 
+import html as html_entities
 import logging
 import re
 
@@ -7,40 +8,169 @@ import chardet
 from bs4 import BeautifulSoup
 from langchain.schema import Document
 
+from config.defaults import CONFIG
+from input.utils.main_content import extract_main_content, parse_document
+
 logger = logging.getLogger(__name__)
 
+HTML_BACKEND = CONFIG["GENERAL"]["HTML_BACKEND"]
+HTML_EXTRACT = CONFIG["GENERAL"]["HTML_EXTRACT"]
+SNIFF_BYTES = CONFIG["GENERAL"]["CHARSET_SNIFF_BYTES"]
+
+# Elements whose text is not page content (BeautifulSoup's get_text skips them too)
+_SKIP_TAGS = {"script", "style", "template"}
+
+# Everything below \x20 except \n, plus DEL; deleted after the ASCII encode
+_CONTROL_CHARS = dict.fromkeys(c for c in (*range(0x20), 0x7F) if c != 0x0A)
+
+# One pass for what used to be three: blank-line runs collapse to one blank
+# line, space runs to one space (tabs are already gone with the control chars)
+_WHITESPACE_RUNS = re.compile(r"\n[ \n]*\n| {2,}")
+_TITLE = re.compile(r"<title[^>]*>(.*?)</title\s*>", re.I | re.S)
+
 
 def remove_non_ascii(text: str) -> str:
     """Remove characters outside basic printable ASCII range."""
-    return re.sub(r"[^\x20-\x7E\n]+", "", text)
+    return text.encode("ascii", "ignore").decode("ascii").translate(_CONTROL_CHARS)
+
+
+def normalize_text(text: str) -> str:
+    """ASCII-only text with collapsed blank lines and spaces."""
+    text = remove_non_ascii(text)
+    return _WHITESPACE_RUNS.sub(
+        lambda m: "\n\n" if m.group(0)[0] == "\n" else " ", text
+    ).strip()
+
+
+def decode_html(raw_data: bytes) -> str:
+    """
+    Decode page bytes. Valid UTF-8 (and so plain ASCII) is taken as is; only
+    other encodings are sniffed, and only from the first ``SNIFF_BYTES``.
+    """
+    try:
+        return raw_data.decode("utf-8")
+    except UnicodeDecodeError:
+        pass
+    encoding = chardet.detect(raw_data[:SNIFF_BYTES])["encoding"]
+    return raw_data.decode(encoding or "utf-8", errors="replace")
+
+
+def title_from_html(html: str):
+    """The <title> text, without building a tree."""
+    match = _TITLE.search(html)
+    if not match:
+        return None
+    return " ".join(html_entities.unescape(match.group(1)).split()) or None
+
+
+def _join_strings(strings) -> str:
+    # Same contract as get_text(separator="\n", strip=True)
+    return "\n".join(s for s in (s.strip() for s in strings if s) if s)
+
+
+def extract_text_bs4(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    return soup.get_text(separator="\n", strip=True)
+
+
+def extract_text_lxml(html: str) -> str:
+    root = parse_document(html)
+    if root is None:
+        return ""
+
+    # drop_tree keeps each element's tail, which is ordinary page text
+    for element in list(root.iter(*_SKIP_TAGS)):
+        element.drop_tree()
 
+    def strings():
+        for element in root.iter():
+            if isinstance(element.tag, str):  # not a comment or processing instruction
+                yield element.text
+            yield element.tail
+
+    return _join_strings(strings())
+
+
+def extract_text_selectolax(html: str) -> str:
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    if tree.root is None:
+        return ""
+
+    def strings():
+        for node in tree.root.traverse(include_text=True):
+            if node.tag == "-text" and node.parent.tag not in _SKIP_TAGS:
+                yield node.text_content
+
+    return _join_strings(strings())
+
+
+HTML_BACKENDS = {
+    "bs4": extract_text_bs4,
+    "lxml": extract_text_lxml,
+    "selectolax": extract_text_selectolax,
+}
+
+
+def resolve_backend(name: str = HTML_BACKEND) -> str:
+    """Map "auto" to the fastest installed backend."""
+    if name != "auto":
+        if name not in HTML_BACKENDS:
+            raise ValueError(f"Unknown HTML backend {name!r}; use {sorted(HTML_BACKENDS)}")
+        return name
+    for candidate, module in (("selectolax", "selectolax.lexbor"), ("lxml", "lxml.html")):
+        try:
+            __import__(module)
+            return candidate
+        except ImportError:
+            continue
+    return "bs4"
+
+
+_default_backend = None
+
+
+def parse_html(file_path: str, backend: str = None, mode: str = None):
+    """
+    Parse one HTML file into a Document with ``source`` and ``title`` metadata.
+
+    ``mode`` "main" keeps only the page's main content (see
+    input.utils.main_content); "full" keeps every visible string, extracted
+    with ``backend``. Both default to CONFIG["GENERAL"].
+    """
+    global _default_backend
+    mode = mode or HTML_EXTRACT
+    if backend is None:
+        if _default_backend is None:
+            _default_backend = resolve_backend()
+        backend = _default_backend
+    extract_text = HTML_BACKENDS[backend]
 
-def parse_html(file_path: str):
     documents = []
     try:
         with open(file_path, "rb") as f:
             raw_data = f.read()
-            encoding = chardet.detect(raw_data)["encoding"]
-            text = raw_data.decode(encoding or "utf-8", errors="replace")
-
-            # Parse HTML and extract visible text
-            soup = BeautifulSoup(text, "html.parser")
-            cleaned_text = soup.get_text(separator="\n", strip=True)
-
-            # Remove non-ASCII characters and extra whitespace
-            cleaned_text = remove_non_ascii(cleaned_text)
-            cleaned_text = re.sub(
-                r"\n\s*\n+", "\n\n", cleaned_text
-            )  # collapse blank lines
-            cleaned_text = re.sub(r"[ \t]+", " ", cleaned_text)  # normalize spaces
-            cleaned_text = cleaned_text.strip()
-            # cleaned_text = cleaned_text.replace("\n", " ")
+            text = decode_html(raw_data)
+
+            # Parse HTML and extract visible text, then tidy it in one pass
+            if mode == "main":
+                title, main_text, full_chars = extract_main_content(text)
+                cleaned_text = normalize_text(main_text)
+            else:
+                title, full_chars = title_from_html(text), None
+                cleaned_text = normalize_text(extract_text(text))
 
             # Only add the document if there's actual content
             if cleaned_text:
-                documents.append(
-                    Document(page_content=cleaned_text, metadata={"source": file_path})
-                )
+                metadata = {"source": file_path}
+                if title and remove_non_ascii(title).strip():
+                    metadata["title"] = remove_non_ascii(title).strip()
+                if full_chars is not None:
+                    # Read (and removed) by ParseSummary to report the reduction
+                    metadata["chars_total"] = full_chars
+                    metadata["chars_kept"] = len(main_text)
+                documents.append(Document(page_content=cleaned_text, metadata=metadata))
                 logger.info(f"✅ Parsed HTML file: {file_path}")
             else:
                 logger.warning(
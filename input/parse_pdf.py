@@ -1,25 +1,234 @@
 # - scripts/load/parser_pdf.py
 
+import io
 import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
 
 from langchain.schema import Document
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+from pdfminer.utils import decode_text
 
-# TODO: from pdfminer.high_level import extract_text
+from config.defaults import CONFIG
 
 logger = logging.getLogger(__name__)
 
+PDF_CONFIG = CONFIG["PDF"]
 
-def parse_pdf(file_path: str):
-    documents = []
+
+class PageTimeout(BaseException):
+    """
+    A single page took longer than the per-page timeout. A BaseException,
+    like parser.ParseTimeout, so no ``except Exception`` in pdfminer or in
+    the page loop can swallow it.
+    """
+
+
+@contextmanager
+def _page_deadline(seconds: float):
+    """
+    Raise PageTimeout in the block after ``seconds``. Any outer SIGALRM
+    deadline (parse_files' per-file timeout) is kept: if it is due first it
+    fires as usual, and it is re-armed with its remaining time afterwards.
+    """
+    outer_remaining, _ = (
+        signal.getitimer(signal.ITIMER_REAL) if hasattr(signal, "setitimer") else (0, 0)
+    )
+    usable = (
+        seconds
+        and hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+        and not (outer_remaining and outer_remaining <= seconds)
+    )
+    if not usable:
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise PageTimeout()
+
+    started = time.monotonic()
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
     try:
-        text = extract_text(file_path)
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+        if outer_remaining:
+            left = outer_remaining - (time.monotonic() - started)
+            signal.setitimer(signal.ITIMER_REAL, max(left, 0.001))
+
+
+def pdf_info(file_path: str) -> Tuple[int, Optional[str]]:
+    """Page count and document title, read from the catalog without parsing pages."""
+    with open(file_path, "rb") as fp:
+        document = PDFDocument(PDFParser(fp))
+        pages = resolve1(document.catalog["Pages"])
+        count = int(resolve1(pages.get("Count", 0)))
+        title = None
+        for info in document.info:
+            raw = resolve1(info.get("Title"))
+            if isinstance(raw, bytes):
+                title = " ".join(decode_text(raw).split()) or None
+            elif isinstance(raw, str):
+                title = " ".join(raw.split()) or None
+    return count, title
+
+
+def iter_pdf_pages(
+    file_path: str,
+    pagenos: Optional[List[int]] = None,
+    page_timeout: float = None,
+) -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+    """
+    Yield ``(page number, text, error)`` one page at a time, 1-based.
+
+    Only the current page's layout objects are alive at any moment. A page
+    that times out or runs out of memory yields ``None`` text and the reason,
+    and the rest of the document carries on.
+    """
+    page_timeout = PDF_CONFIG["page_timeout"] if page_timeout is None else page_timeout
+    resources = PDFResourceManager(caching=True)
+    laparams = LAParams()
+    wanted = sorted(pagenos) if pagenos is not None else None
+    with open(file_path, "rb") as fp:
+        pages = PDFPage.get_pages(fp, pagenos=set(wanted) if wanted else None)
+        for index, page in enumerate(pages):
+            page_number = (wanted[index] if wanted else index) + 1
+            buffer = io.StringIO()
+            device = TextConverter(resources, buffer, laparams=laparams)
+            try:
+                with _page_deadline(page_timeout):
+                    PDFPageInterpreter(resources, device).process_page(page)
+                yield page_number, buffer.getvalue(), None
+            except PageTimeout:
+                yield page_number, None, f"timed out after {page_timeout}s"
+            except MemoryError:
+                yield page_number, None, "out of memory"
+            finally:
+                device.close()
+
+
+def _limit_memory(megabytes: int):
+    """Let a page worker grow by at most ``megabytes`` beyond what it inherited."""
+    if not megabytes:
+        return
+    try:
+        import resource
+
+        # A forked worker starts with the parent's address space; cap the growth
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[0]) * resource.getpagesize()
+        limit = current + megabytes * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, OSError, ValueError) as e:
+        logger.debug(f"Memory cap not applied: {e}")
+
+
+def _extract_range(args):
+    file_path, pagenos, page_timeout = args
+    return list(iter_pdf_pages(file_path, pagenos=pagenos, page_timeout=page_timeout))
+
+
+def _page_ranges(count: int, parts: int) -> List[List[int]]:
+    size = -(-count // parts)
+    return [list(range(start, min(start + size, count))) for start in range(0, count, size)]
+
+
+def iter_page_texts(
+    file_path: str, page_count: int
+) -> Iterator[Tuple[int, Optional[str], Optional[str]]]:
+    """
+    Page texts in order. Large PDFs are split into page ranges spread over a
+    worker pool; each worker may grow by at most ``memory_limit_mb``. Inside a
+    daemonic parse_files worker (which can't start children) pages run
+    sequentially instead.
+    """
+    workers = PDF_CONFIG["workers"] or os.cpu_count() or 1
+    parallel = (
+        workers > 1
+        and page_count >= PDF_CONFIG["parallel_min_pages"]
+        and not multiprocessing.current_process().daemon
+    )
+    if not parallel:
+        yield from iter_pdf_pages(file_path)
+        return
+
+    ranges = _page_ranges(page_count, workers * 4)
+    logger.info(
+        f"📄 Extracting {page_count} pages of {file_path} with {workers} worker(s)..."
+    )
+    pool = multiprocessing.Pool(
+        workers, initializer=_limit_memory, initargs=(PDF_CONFIG["memory_limit_mb"],)
+    )
+    try:
+        tasks = ((file_path, pages, PDF_CONFIG["page_timeout"]) for pages in ranges)
+        for results in pool.imap(_extract_range, tasks):
+            yield from results
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def iter_pdf_documents(file_path: str) -> Iterator[Document]:
+    """
+    Yield one Document per non-empty page as soon as it is extracted, with
+    ``page`` (1-based) and ``title`` metadata. Pages that fail are logged
+    and skipped.
+    """
+    page_count, title = pdf_info(file_path)
+    title = title or Path(file_path).stem
+    kept, failed_pages = 0, []
+    for page_number, text, error in iter_page_texts(file_path, page_count):
+        if error:
+            failed_pages.append(page_number)
+            logger.warning(f"⚠️ Skipped page {page_number} of {file_path}: {error}")
+            continue
+        text = text.strip()
         if text:
-            documents.append(
-                Document(page_content=text, metadata={"source": str(file_path)})
+            kept += 1
+            yield Document(
+                page_content=text,
+                metadata={
+                    "source": str(file_path),
+                    "page": page_number,
+                    "title": title,
+                },
             )
-            logger.info(f"✅ Parsed PDF file: {file_path}")
-        else:
-            logger.warning(f"⚠️ Empty PDF or unreadable: {file_path}")
+    if kept:
+        skipped = f", {len(failed_pages)} skipped" if failed_pages else ""
+        logger.info(
+            f"✅ Parsed PDF file: {file_path} "
+            f"({kept}/{page_count} pages with text{skipped})"
+        )
+    else:
+        logger.warning(f"⚠️ Empty PDF or unreadable: {file_path}")
+
+
+def parse_pdf(file_path: str):
+    """All of iter_pdf_documents as a list (the pages read before an error, if any)."""
+    documents = []
+    try:
+        documents.extend(iter_pdf_documents(file_path))
     except Exception as e:
         logger.error(f"❌ Failed to parse PDF {file_path}: {e}")
     return documents
+
+
+# Pages carry their own deadline, so parse_files doesn't time the whole file
+parse_pdf.timeout_per_page = True
+# iter_parsed hands pages on one at a time when parsing in-process
+parse_pdf.iter_documents = iter_pdf_documents
@@ -1,21 +1,303 @@
 # scripts/load/source/parser.py
 
 import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
+
 from langchain.schema import Document
+
+from config.defaults import CONFIG
 from input.registry import PARSER_REGISTRY
+from nlp.utils.metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 
+PARSE_WORKERS = CONFIG["GENERAL"]["PARSE_WORKERS"]
+PARSE_TIMEOUT = CONFIG["GENERAL"]["PARSE_TIMEOUT"]
 
-def parse_files(files: List[Path]) -> List[Document]:
-    """Parse files using the registered parser functions."""
+
+class ParseTimeout(BaseException):
+    """
+    Raised inside a parser that ran too long. A BaseException, so the
+    parsers' own ``except Exception`` blocks can't swallow it.
+    """
+
+
+@dataclass
+class ParseSummary:
+    """Outcome of a parse_files run; failures are collected rather than only logged."""
+
+    files: int = 0
+    documents: int = 0
+    empty: List[str] = field(default_factory=list)
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    timed_out: List[str] = field(default_factory=list)
+    unsupported: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+    chars_total: int = 0  # visible text on pages parsed in main-content mode
+    chars_kept: int = 0  # of which kept as main content
+
+    def log(self):
+        logger.info(
+            f"📑 Parsed {self.files} file(s) into {self.documents} document(s) in "
+            f"{self.seconds:.1f}s: {len(self.failed)} failed, {len(self.timed_out)} timed out, "
+            f"{len(self.empty)} empty, {len(self.unsupported)} unsupported."
+        )
+        if self.chars_total:
+            logger.info(
+                f"🧹 Main-content extraction kept {self.chars_kept:,} of "
+                f"{self.chars_total:,} characters "
+                f"({1 - self.chars_kept / self.chars_total:.1%} reduction)."
+            )
+        for path, reason in self.failed:
+            logger.warning(f"❌ {path}: {reason}")
+        for path in self.timed_out:
+            logger.warning(f"⏱️ {path}: timed out")
+
+
+class _ErrorCollector(logging.Handler):
+    """Capture ERROR records the parsers log while they swallow exceptions."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def _on_alarm(signum, frame):
+    raise ParseTimeout()
+
+
+def _parse_one(path: str, timeout: float) -> Tuple[List[Document], List[str], bool, float]:
+    """Parse one file; returns (documents, error messages, timed out, seconds taken)."""
+    started = time.perf_counter()
+    parser = PARSER_REGISTRY[Path(path).suffix.lower()]
+    collector = _ErrorCollector()
+    input_logger = logging.getLogger("input")
+    input_logger.addHandler(collector)
+
+    # SIGALRM frees a worker stuck in Python code; the parent's deadline covers the rest.
+    # Parsers that time each page themselves (PDF) aren't given a whole-file deadline.
+    use_alarm = (
+        bool(timeout)
+        and not getattr(parser, "timeout_per_page", False)
+        and hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return parser(path), collector.messages, False, time.perf_counter() - started
+    except ParseTimeout:
+        return [], collector.messages, True, time.perf_counter() - started
+    except Exception as e:
+        return [], collector.messages + [str(e)], False, time.perf_counter() - started
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+        input_logger.removeHandler(collector)
+
+
+def _deadline(path: str, timeout: float) -> Optional[float]:
+    parser = PARSER_REGISTRY[Path(path).suffix.lower()]
+    if not timeout or getattr(parser, "timeout_per_page", False):
+        return None
+    return timeout * 2 + 5
+
+
+def _submit(pool, path: str, timeout: float):
+    """Queue ``path`` on ``pool``; its deadline counts from now."""
+    return path, pool.apply_async(_parse_one, (path, timeout)), time.monotonic()
+
+
+def _record(summary: ParseSummary, path: str, result) -> List[Document]:
+    documents, errors, timed_out, seconds = result
+    for document in documents:
+        if "chars_total" in document.metadata:
+            summary.chars_total += document.metadata.pop("chars_total")
+            summary.chars_kept += document.metadata.pop("chars_kept")
+    _record_outcome(summary, path, len(documents), errors, timed_out, seconds)
+    return documents
+
+
+def _record_outcome(
+    summary: ParseSummary,
+    path: str,
+    count: int,
+    errors: List[str],
+    timed_out: bool,
+    seconds: Optional[float],
+):
+    if timed_out:
+        summary.timed_out.append(path)
+    elif errors:
+        summary.failed.append((path, "; ".join(errors)))
+    elif not count:
+        summary.empty.append(path)
+    summary.documents += count
+
+    # Counted here, in the parent, for files parsed in worker processes too
+    metrics = get_metrics()
+    if metrics.enabled:
+        metrics.count("parse.files")
+        metrics.count("parse.documents", count)
+        metrics.count("parse.failed", bool(errors) and not timed_out)
+        metrics.count("parse.timed_out", timed_out)
+        if seconds is not None:
+            metrics.observe("parse.file", seconds)
+        try:
+            metrics.count("parse.bytes", os.path.getsize(path))
+        except OSError:
+            pass
+
+
+def _stream_one(
+    summary: ParseSummary, path: str, iter_documents
+) -> Iterator[Tuple[str, List[Document]]]:
+    """
+    Parse one file with a parser's page generator, yielding each page as
+    it is extracted. The file is recorded in ``summary`` once it is done.
+    """
+    started = time.perf_counter()
+    collector = _ErrorCollector()
+    input_logger = logging.getLogger("input")
+    input_logger.addHandler(collector)
+    count, errors = 0, []
+    try:
+        for document in iter_documents(path):
+            count += 1
+            yield path, [document]
+    except Exception as e:
+        errors.append(str(e))
+    finally:
+        input_logger.removeHandler(collector)
+    _record_outcome(
+        summary, path, count, collector.messages + errors, False, time.perf_counter() - started
+    )
+
+
+def iter_parsed(
+    files: Iterable[Path],
+    summary: ParseSummary,
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Iterator[Tuple[str, List[Document]]]:
+    """
+    Yield ``(path, documents)`` per parsed file, in the order of ``files``.
+    Parsed in-process, a parser with a page generator (``iter_documents``,
+    e.g. PDF) yields ``(path, [page])`` per page instead, so the first pages
+    of a long file move on before the rest are extracted.
+
+    ``workers`` > 1 parses in that many processes (0 means one per CPU), with
+    at most two files per worker in flight so a slow consumer holds parsing
+    back instead of piling up results. ``files`` may be a lazy iterator. A
+    file that takes longer than ``timeout`` seconds is abandoned and listed in
+    ``summary`` instead of stalling the run. A worker hung past the deadline
+    is killed with its pool, and the files queued behind it are resubmitted.
+    Called off the main thread with a timeout, files are parsed in a worker
+    process even when ``workers`` is 1, as the alarm can't be used there.
+    """
+    workers = PARSE_WORKERS if workers is None else workers
+    workers = workers or os.cpu_count() or 1
+    timeout = PARSE_TIMEOUT if timeout is None else timeout
+    started = time.monotonic()
+    # SIGALRM only reaches the main thread; elsewhere a worker process enforces the timeout
+    in_process = workers <= 1 and (
+        not timeout or threading.current_thread() is threading.main_thread()
+    )
+
+    def supported(paths):
+        for file_path in paths:
+            if file_path.suffix.lower() in PARSER_REGISTRY:
+                summary.files += 1
+                yield str(file_path)
+            else:
+                logger.warning(f"⚠️ No parser registered for {file_path.suffix} file.")
+                summary.unsupported.append(str(file_path))
+
+    try:
+        if in_process:
+            for path in supported(files):
+                parser = PARSER_REGISTRY[Path(path).suffix.lower()]
+                iter_documents = getattr(parser, "iter_documents", None)
+                if iter_documents is not None:
+                    yield from _stream_one(summary, path, iter_documents)
+                else:
+                    yield path, _record(summary, path, _parse_one(path, timeout))
+            return
+
+        logger.info(f"🧵 Parsing with {workers} worker process(es)...")
+        pool = multiprocessing.Pool(workers)
+        try:
+            pending = deque()
+            paths = supported(files)
+            while True:
+                for path in paths:
+                    pending.append(_submit(pool, path, timeout))
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+                path, result, submitted = pending.popleft()
+                # Generous deadline for hangs the in-worker alarm can't interrupt
+                deadline = _deadline(path, timeout)
+                try:
+                    outcome = result.get(
+                        None if deadline is None else max(0.0, submitted + deadline - time.monotonic())
+                    )
+                except multiprocessing.TimeoutError:
+                    outcome = ([], [], True, None)
+                    # The hung worker is never freed: replace the pool, and parse
+                    # again whatever was still waiting on it
+                    logger.warning(f"⏱️ {path} hung a parser process; restarting the pool.")
+                    pool.terminate()
+                    pool.join()
+                    pool = multiprocessing.Pool(workers)
+                    pending = deque(
+                        entry if entry[1].ready() else _submit(pool, entry[0], timeout)
+                        for entry in pending
+                    )
+                except Exception as e:
+                    outcome = ([], [f"worker error: {e}"], False, None)
+                yield path, _record(summary, path, outcome)
+        finally:
+            # terminate, not close: a hung worker would otherwise block join()
+            pool.terminate()
+            pool.join()
+    finally:
+        summary.seconds += time.monotonic() - started
+
+
+def parse_files_with_summary(
+    files: List[Path],
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Tuple[List[Document], ParseSummary]:
+    """Parse files (see iter_parsed) and return all documents plus the summary."""
+    summary = ParseSummary()
     documents = []
-    for file_path in files:
-        parser = PARSER_REGISTRY.get(file_path.suffix.lower())
-        if parser:
-            documents.extend(parser(str(file_path)))
-        else:
-            logger.warning(f"⚠️ No parser registered for {file_path.suffix} file.")
+    for _, parsed in iter_parsed(files, summary, workers=workers, timeout=timeout):
+        documents.extend(parsed)
+    return documents, summary
+
+
+def parse_files(
+    files: List[Path],
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> List[Document]:
+    """Parse files using the registered parser functions."""
+    documents, summary = parse_files_with_summary(files, workers, timeout)
+    summary.log()
     return documents
@@ -0,0 +1,175 @@
+# input/utils/main_content.py
+
+import logging
+import re
+from typing import Optional, Tuple
+
+import lxml.etree
+import lxml.html
+
+logger = logging.getLogger(__name__)
+
+# Never page content
+_CHROME_TAGS = (
+    "script", "style", "template", "noscript", "nav", "header", "footer", "aside",
+    "form", "button", "select", "iframe", "svg",
+)
+_UNLIKELY = re.compile(
+    r"menu|nav|footer|sidebar|comment|share|social|breadcrumb|cookie|banner|"
+    r"subscribe|newsletter|related|promo|sponsor|advert|\bads?\b|popup|modal|"
+    r"language|lang-|login|signup|masthead|widget|skip",
+    re.I,
+)
+_LIKELY = re.compile(r"article|body|content|entry|main|post|story|text|blog", re.I)
+_SCORED_TAGS = ("p", "pre", "td", "blockquote", "li", "h2", "h3", "div", "section")
+# Score of a candidate's own tag, as readability does
+_TAG_BONUS = {
+    "article": 10, "main": 10, "section": 5, "div": 5, "pre": 3, "td": 3,
+    "blockquote": 3, "ul": -3, "ol": -3, "li": -3, "th": -5,
+}
+
+
+def parse_document(html: str):
+    """The lxml root of a page, or None for an empty document."""
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration
+        parser = lxml.html.HTMLParser(encoding="utf-8")
+        return lxml.html.document_fromstring(html.encode("utf-8"), parser=parser)
+    except lxml.etree.ParserError:  # empty document
+        return None
+
+
+def element_text(element) -> str:
+    """Text nodes in document order, like get_text(separator="\n", strip=True)."""
+    return "\n".join(s for s in (s.strip() for s in element.itertext()) if s)
+
+
+def _class_weight(element) -> int:
+    names = f"{element.get('class', '')} {element.get('id', '')}"
+    weight = 0
+    if _UNLIKELY.search(names):
+        weight -= 25
+    if _LIKELY.search(names):
+        weight += 25
+    return weight
+
+
+def _link_density(element, text_length: int) -> float:
+    if not text_length:
+        return 0.0
+    link_length = sum(len(element_text(a)) for a in element.iter("a"))
+    return min(link_length / text_length, 1.0)
+
+
+def page_title(root) -> Optional[str]:
+    for xpath in (
+        "//meta[@property='og:title']/@content",
+        "//title//text()",
+        "//h1//text()",
+    ):
+        title = " ".join(" ".join(root.xpath(xpath)).split())
+        if title:
+            return title
+    return None
+
+
+def _drop_chrome(root):
+    for element in list(root.iter(*_CHROME_TAGS)):
+        element.drop_tree()
+    for element in list(root.iter()):
+        if not isinstance(element.tag, str):
+            continue
+        if element.tag in ("html", "body", "article", "main"):
+            continue
+        names = f"{element.get('class', '')} {element.get('id', '')}"
+        if _UNLIKELY.search(names) and not _LIKELY.search(names):
+            element.drop_tree()
+
+
+def extract_main_content(html: str) -> Tuple[Optional[str], str, int]:
+    """
+    Return (title, main text, length of all visible text) for a page.
+
+    Chrome (nav, header, footer, aside, forms, scripts) and elements whose
+    class or id look like menus, share bars or language pickers are dropped.
+    Remaining text blocks are scored readability-style, by length and commas,
+    bonus for content-like class names, discounted by link density, with
+    scores propagated to parents and grandparents. The best container and its
+    strong siblings are kept. When no container clearly wins, the whole
+    de-chromed body is returned instead of guessing.
+    """
+    root = parse_document(html)
+    if root is None:
+        return None, "", 0
+
+    title = page_title(root)
+    # Comments go too, so itertext() only ever sees page text
+    for element in list(root.iter("script", "style", "template", lxml.etree.Comment)):
+        element.drop_tree()
+    full_chars = len(element_text(root))
+
+    _drop_chrome(root)
+    body = root.find("body")
+    if body is None:
+        body = root
+
+    scores = {}
+    for element in body.iter(*_SCORED_TAGS):
+        if element.tag in ("div", "section"):
+            # Only text directly inside, so nested blocks aren't counted twice
+            own_text = " ".join(
+                s.strip() for s in [element.text] + [c.tail for c in element] if s
+            )
+        else:
+            own_text = element_text(element)
+        if len(own_text) < 25:
+            continue
+        score = 1 + own_text.count(",") + min(len(own_text) // 100, 3)
+
+        parent = element.getparent()
+        grandparent = parent.getparent() if parent is not None else None
+        for ancestor, share in ((parent, 1.0), (grandparent, 0.5)):
+            if ancestor is None:
+                continue
+            if ancestor not in scores:
+                scores[ancestor] = _TAG_BONUS.get(ancestor.tag, 0) + _class_weight(ancestor)
+            scores[ancestor] += score * share
+
+    if not scores:
+        return title, element_text(body), full_chars
+
+    adjusted = {
+        element: score * (1 - _link_density(element, len(element_text(element))))
+        for element, score in scores.items()
+    }
+    top = max(adjusted, key=adjusted.get)
+
+    # Siblings that score well, or read like prose, belong to the article too
+    keep = [top]
+    parent = top.getparent()
+    if parent is not None:
+        threshold = max(10, adjusted[top] * 0.2)
+        keep = []
+        for sibling in parent:
+            if not isinstance(sibling.tag, str):
+                continue
+            text = element_text(sibling)
+            if (
+                sibling is top
+                or adjusted.get(sibling, 0) >= threshold
+                or (
+                    sibling.tag == "p"
+                    and len(text) > 80
+                    and _link_density(sibling, len(text)) < 0.25
+                )
+            ):
+                keep.append(sibling)
+
+    text = "\n".join(t for t in (element_text(element) for element in keep) if t)
+    body_text = element_text(body)
+    if len(text) < min(200, len(body_text) * 0.25):
+        # Nothing stands out (e.g. a list or index page): keep the de-chromed body
+        return title, body_text, full_chars
+    return title, text, full_chars
@@ -0,0 +1,89 @@
+# - input/watcher.py
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.defaults import CONFIG
+from input.registry import PARSER_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = CONFIG["WATCH"]["poll_interval"]
+DEBOUNCE = CONFIG["WATCH"]["debounce"]
+MAX_WAIT = CONFIG["WATCH"]["max_wait"]
+
+
+def scan(source_path: Path) -> Dict[str, Tuple[int, int]]:
+    """``{path: (size, mtime_ns)}`` for every supported file under ``source_path``."""
+    found = {}
+    for root, _, names in os.walk(source_path):
+        for name in names:
+            if os.path.splitext(name)[1].lower() not in PARSER_REGISTRY:
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # removed between listing and stat
+            found[path] = (stat.st_size, stat.st_mtime_ns)
+    return found
+
+
+class DirectoryWatcher:
+    """
+    Poll a source directory for added, changed and removed files.
+
+    ``wait()`` returns once something changed and the directory then stayed
+    quiet for ``debounce`` seconds, so a burst (a copy of many files, an
+    editor's save-and-rename) becomes one batch, and a file still being
+    written isn't picked up half-way. Under constant churn a batch is
+    released after ``max_wait`` seconds anyway. Polling needs no extra
+    dependency and also works on network and container-mounted volumes,
+    where inotify events don't arrive; a scan is one stat per file.
+    """
+
+    def __init__(
+        self,
+        source_path: Path,
+        interval: float = POLL_INTERVAL,
+        debounce: float = DEBOUNCE,
+        max_wait: float = MAX_WAIT,
+    ):
+        self.source_path = Path(source_path)
+        self.interval = interval
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self._seen = scan(self.source_path)
+
+    def poll(self) -> List[str]:
+        """Paths added, modified or removed since the last poll."""
+        current = scan(self.source_path)
+        changed = [
+            path for path, state in current.items() if self._seen.get(path) != state
+        ]
+        changed += [path for path in self._seen if path not in current]
+        self._seen = current
+        return changed
+
+    def wait(self, stop: Optional[threading.Event] = None) -> Optional[List[str]]:
+        """Block until a debounced batch of changes is ready; None once ``stop`` is set."""
+        stop = stop or threading.Event()
+        changed = set()
+        first = last = None
+        while not stop.wait(self.interval):
+            now = time.monotonic()
+            paths = self.poll()
+            if paths:
+                changed.update(paths)
+                first = first or now
+                last = now
+            elif changed and now - last >= self.debounce:
+                return sorted(changed)
+            if changed and now - first >= self.max_wait:
+                logger.info(f"⏱️ Changes kept coming for {self.max_wait}s; ingesting what there is.")
+                return sorted(changed)
+        return None
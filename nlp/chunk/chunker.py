@@ -1,13 +1,19 @@
 # - scripts/load/chunker.py
 
 import logging
-from uuid import uuid4
+import multiprocessing
+import os
+from functools import lru_cache
+from pathlib import Path
+from uuid import NAMESPACE_URL, uuid5
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from config.defaults import (
     CONFIG,  # Assuming the provided CONFIG dictionary is in defaults.py
 )
+from nlp.utils.metrics import get_metrics
+from nlp.utils.tokenizer import encode_with_offsets, resolve_encoding
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -15,34 +21,198 @@ logger = logging.getLogger(__name__)
 # Fetch chunk size and overlap from the configuration
 CHUNK_SIZE = CONFIG["GENERAL"]["CHUNK_SIZE"]
 CHUNK_OVERLAP = CONFIG["GENERAL"]["CHUNK_OVERLAP"]
+CHUNK_UNIT = CONFIG["GENERAL"]["CHUNK_UNIT"]
+CHUNK_TOKENS = CONFIG["GENERAL"]["CHUNK_TOKENS"]
+CHUNK_TOKEN_OVERLAP = CONFIG["GENERAL"]["CHUNK_TOKEN_OVERLAP"]
+CHUNK_WORKERS = CONFIG["GENERAL"]["CHUNK_WORKERS"]
+TOKENIZER_ENCODING = CONFIG["GENERAL"]["tokenizer_encoding"]
 
 
-def chunker(documents, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+def chunk_id_for(source, content, occurrence=0):
+    """
+    Deterministic chunk id: the same text from the same source gets the same
+    id on every run, so re-ingesting upserts instead of duplicating.
+    ``occurrence`` tells apart identical chunks within one source.
+    """
+    return str(uuid5(NAMESPACE_URL, f"{source}\0{occurrence}\0{content}"))
+
+
+def _break_before(text, offsets, lowest, end):
+    """
+    The last token index in (lowest, end] that starts a new paragraph, or
+    failing that a new sentence; ``end`` when there is neither. A break is
+    the whitespace around a token's start (inside the token for BPE, before
+    it for WordPiece).
+    """
+    candidates = [e for e in range(end, lowest, -1) if offsets[e]]
+    gaps = {}
+    for e in candidates:
+        left = right = offsets[e]
+        while left > 0 and text[left - 1].isspace():
+            left -= 1
+        while right < len(text) and text[right].isspace():
+            right += 1
+        gaps[e] = (left, right)
+        if "\n" in text[left:right]:
+            return e
+    for e in candidates:
+        left, right = gaps[e]
+        if left < right and left > 0 and text[left - 1] in ".!?":
+            return e
+    return end
+
+
+def split_tokens(text, encoding, size=CHUNK_TOKENS, overlap=CHUNK_TOKEN_OVERLAP):
+    """
+    Yield ``(chunk text, token count)`` windows of at most ``size`` tokens,
+    each starting ``overlap`` tokens before the previous one ended.
+
+    The text is encoded once and windows are mapped back to characters
+    through the token offsets, so no chunk is re-encoded. A window ends
+    early at the last paragraph or sentence break in its final quarter.
+    Whitespace-only tokens at either edge are dropped and not counted.
+    ``encoding`` is a tiktoken Encoding or a TokenizerJsonEncoding.
+    """
+    if not 0 <= overlap < size:
+        raise ValueError(f"Chunk overlap {overlap} must be below the chunk size {size}")
+    text, tokens, offsets = encode_with_offsets(encoding, text)
+    if not tokens:
+        return
+    offsets = list(offsets) + [len(text)]
+
+    start = 0
+    while start < len(tokens):
+        end = min(start + size, len(tokens))
+        if end < len(tokens):
+            end = _break_before(text, offsets, start + size * 3 // 4, end)
+
+        first, last = start, end
+        while first < last and text[offsets[first] : offsets[first + 1]].isspace():
+            first += 1
+        while last > first and text[offsets[last - 1] : offsets[last]].isspace():
+            last -= 1
+        if first < last:
+            yield text[offsets[first] : offsets[last]].strip(), last - first
+
+        if end == len(tokens):
+            break
+        start = max(end - overlap, start + 1)
+
+
+@lru_cache(maxsize=None)
+def _counting_encoding(encoding):
+    """The encoding character chunks are counted in, or None if it can't be loaded."""
+    try:
+        return resolve_encoding(encoding)
+    except Exception as e:
+        logger.warning(f"⚠️ Tokenizer unavailable ({e}); chunks get no token_count.")
+        return None
+
+
+def _token_counter(encoding):
+    """Token count per chunk text, or None throughout without a tokenizer."""
+    encoding = _counting_encoding(encoding or TOKENIZER_ENCODING)
+    if encoding is None:
+        return lambda text: None
+    return lambda text: len(encoding.encode_ordinary(text))
+
+
+def _splitter(unit, size, overlap, encoding):
+    """A function from text to ``(chunk, token count or None)`` pairs."""
+    if unit == "tokens":
+        encoding = resolve_encoding(encoding or TOKENIZER_ENCODING)
+        return lambda text: split_tokens(text, encoding, size, overlap)
+    if unit != "chars":
+        raise ValueError(f"Unknown chunk unit {unit!r}; use 'chars' or 'tokens'")
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=size, chunk_overlap=overlap, length_function=len
     )
+    count = _token_counter(encoding)
+    return lambda text: ((chunk, count(chunk)) for chunk in text_splitter.split_text(text))
 
-    chunked_documents = []
+
+def iter_chunks(documents, size=None, overlap=None, unit=None, encoding=None):
+    """
+    Yield chunk dicts one at a time, so documents can be streamed through.
+
+    ``unit`` "chars" (RecursiveCharacterTextSplitter) or "tokens" (see
+    split_tokens); ``size`` and ``overlap`` are in that unit. Either way
+    chunks record their ``token_count`` in ``encoding`` (a built encoding
+    or a tokenizer_encoding value, see nlp.utils.tokenizer.get_tokenizer)
+    when it can be loaded. All default to CONFIG["GENERAL"].
+    """
+    unit = unit or CHUNK_UNIT
+    if size is None:
+        size = CHUNK_TOKENS if unit == "tokens" else CHUNK_SIZE
+    if overlap is None:
+        overlap = CHUNK_TOKEN_OVERLAP if unit == "tokens" else CHUNK_OVERLAP
+    split = _splitter(unit, size, overlap, encoding)
+    metrics = get_metrics()
 
     for doc_index, document in enumerate(documents):
-        chunks = text_splitter.split_text(document.page_content)
-        for i, chunk in enumerate(chunks, start=1):
+        source = document.metadata.get("source", "unknown")
+        # Page title when the parser found one, otherwise the file name
+        title = document.metadata.get("title") or Path(source).stem
+        page = document.metadata.get("page")
+        # Pages of one PDF share a source; the page keeps their chunk ids apart
+        locator = source if page is None else f"{source}#page={page}"
+        occurrences = {}
+        # Split the whole document before yielding, so the timing excludes the consumer
+        with metrics.timer("chunk.document"):
+            pieces = list(split(document.page_content))
+        metrics.count("chunk.documents")
+        for chunk, token_count in pieces:
             chunk = chunk.strip()
             if not chunk:
                 logger.debug(f"⚠️ Skipped empty chunk from doc {doc_index + 1}")
                 continue
 
-            chunk_id = str(uuid4())
-
-            chunked_documents.append(
-                {
-                    "page_content": chunk,
-                    "metadata": {
-                        "chunk_id": chunk_id,
-                        "source": document.metadata.get("source", "unknown"),
-                    },
-                }
-            )
+            occurrence = occurrences.get(chunk, 0)
+            occurrences[chunk] = occurrence + 1
+            chunk_id = chunk_id_for(locator, chunk, occurrence)
+
+            metadata = {"chunk_id": chunk_id, "source": source, "title": title}
+            if page is not None:
+                metadata["page"] = page
+            if token_count is not None:
+                metadata["token_count"] = token_count
+            metrics.count("chunk.chunks")
+            yield {"page_content": chunk, "metadata": metadata}
+
+
+def _chunk_batch(args):
+    documents, size, overlap, unit, encoding = args
+    return list(iter_chunks(documents, size, overlap, unit, encoding))
+
+
+def chunker(documents, size=None, overlap=None, unit=None, encoding=None, workers=None):
+    """
+    Chunk a list of documents (see iter_chunks). With ``workers`` > 1
+    (default CHUNK_WORKERS, 0 = one per CPU) batches of documents are
+    chunked across a process pool; the output order is unchanged.
+    """
+    documents = list(documents)
+    workers = CHUNK_WORKERS if workers is None else workers
+    workers = workers or os.cpu_count() or 1
+
+    if workers > 1 and len(documents) >= workers * 2:
+        # A few batches per worker keeps them busy without pickling per document
+        step = -(-len(documents) // (workers * 4))
+        tasks = [
+            (documents[i : i + step], size, overlap, unit, encoding)
+            for i in range(0, len(documents), step)
+        ]
+        logger.info(f"✂️ Chunking {len(documents)} documents with {workers} worker(s)...")
+        with multiprocessing.Pool(workers) as pool:
+            chunked_documents = [
+                chunk for batch in pool.imap(_chunk_batch, tasks) for chunk in batch
+            ]
+        # The workers' own counts stay in the workers
+        metrics = get_metrics()
+        metrics.count("chunk.documents", len(documents))
+        metrics.count("chunk.chunks", len(chunked_documents))
+    else:
+        chunked_documents = list(iter_chunks(documents, size, overlap, unit, encoding))
 
     logger.info(f"✅ Total chunks generated: {len(chunked_documents)}")
 
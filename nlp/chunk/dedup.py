@@ -0,0 +1,160 @@
+# - nlp/chunk/dedup.py
+
+import hashlib
+import json
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.defaults import CONFIG
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEDUP_THRESHOLD = CONFIG["DEDUP"]["threshold"]
+DEDUP_NUM_PERM = CONFIG["DEDUP"]["num_perm"]
+DEDUP_SHINGLE_SIZE = CONFIG["DEDUP"]["shingle_size"]
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD = re.compile(r"\w+")
+
+
+def _hash32(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=4).digest(), "little")
+
+
+def _lsh_params(threshold: float, num_perm: int):
+    """Pick (bands, rows) whose S-curve crosses 50% closest to ``threshold``."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        crossover = (1 / bands) ** (1 / rows)
+        if best is None or abs(crossover - threshold) < best[0]:
+            best = (abs(crossover - threshold), bands, rows)
+    return best[1], best[2]
+
+
+class ChunkDeduplicator:
+    """
+    Drop exact and near-duplicate chunks as they stream past.
+
+    Exact copies are caught by a hash of the normalized text. Near copies are
+    found with MinHash signatures over word shingles, bucketed by LSH, and
+    confirmed when the estimated Jaccard similarity reaches ``threshold``.
+    The first chunk seen survives and records how many copies were dropped
+    and where they came from. Only survivors' metadata and signatures are
+    retained, so the index costs well under 1 KiB per unique chunk.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEDUP_THRESHOLD,
+        num_perm: int = DEDUP_NUM_PERM,
+        shingle_size: int = DEDUP_SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _lsh_params(threshold, num_perm)
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        self._exact: Dict[str, dict] = {}  # text hash -> survivor metadata
+        self._buckets = [defaultdict(list) for _ in range(self.bands)]
+        self._survivors: List[tuple] = []  # (metadata, signature)
+        self._updated: Dict[int, dict] = {}  # survivors that gained duplicates
+
+        self.seen = 0
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    @property
+    def kept(self) -> int:
+        return self.seen - self.exact_duplicates - self.near_duplicates
+
+    def signature(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        k = self.shingle_size
+        shingles = {" ".join(words[i : i + k]) for i in range(max(len(words) - k + 1, 1))}
+        hashes = np.array([_hash32(s) for s in shingles], dtype=np.uint64)
+        # (a * h + b) mod p for every permutation and shingle; keep the minimum
+        permuted = np.bitwise_and(
+            (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME, _MAX_HASH
+        )
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def add(self, chunk: dict) -> Optional[dict]:
+        """Return ``chunk`` if it survives, or None if it duplicates an earlier one."""
+        self.seen += 1
+        text = chunk["page_content"]
+
+        key = hashlib.sha1(" ".join(text.lower().split()).encode()).hexdigest()
+        original = self._exact.get(key)
+        if original is not None:
+            self.exact_duplicates += 1
+            self._record_duplicate(original, chunk)
+            return None
+
+        signature = self.signature(text)
+        band_keys = [
+            signature[i * self.rows : (i + 1) * self.rows].tobytes()
+            for i in range(self.bands)
+        ]
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(band_key, ()))
+        for index in sorted(candidates):
+            survivor, survivor_signature = self._survivors[index]
+            if np.mean(survivor_signature == signature) >= self.threshold:
+                self.near_duplicates += 1
+                self._record_duplicate(survivor, chunk)
+                return None
+
+        index = len(self._survivors)
+        metadata = chunk.setdefault("metadata", {})
+        self._survivors.append((metadata, signature))
+        self._exact[key] = metadata
+        for bucket, band_key in zip(self._buckets, band_keys):
+            bucket[band_key].append(index)
+        return chunk
+
+    def updated_metadata(self) -> List[dict]:
+        """
+        Metadata of survivors that gained duplicates. A streaming consumer may
+        already have stored these chunks, so it should write them back.
+        """
+        return list(self._updated.values())
+
+    def _record_duplicate(self, metadata: dict, duplicate: dict):
+        self._updated[id(metadata)] = metadata
+        metadata["duplicate_count"] = metadata.get("duplicate_count", 0) + 1
+        source = duplicate.get("metadata", {}).get("source")
+        # Chroma metadata must be scalar, so the source list is stored as JSON
+        sources = json.loads(metadata.get("duplicate_sources", "[]"))
+        if source and source != metadata.get("source") and source not in sources:
+            sources.append(source)
+            metadata["duplicate_sources"] = json.dumps(sources)
+
+    def log_summary(self):
+        removed = self.seen - self.kept
+        ratio = removed / self.seen if self.seen else 0.0
+        logger.info(
+            f"🧹 Dedup kept {self.kept}/{self.seen} chunk(s): removed "
+            f"{self.exact_duplicates} exact and {self.near_duplicates} near duplicate(s) "
+            f"({ratio:.1%} reduction)."
+        )
+
+
+def dedup_chunks(chunks: List[dict], **kwargs) -> List[dict]:
+    """Deduplicate a list of chunk dicts, keeping the first copy of each."""
+    deduplicator = ChunkDeduplicator(**kwargs)
+    kept = [chunk for chunk in chunks if deduplicator.add(chunk) is not None]
+    deduplicator.log_summary()
+    return kept
@@ -0,0 +1,186 @@
+# - nlp/embed/cache.py
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, Optional
+
+from config.defaults import CONFIG
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+CACHE_CONFIG = CONFIG["EMBED_CACHE"]
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so re-chunked but otherwise identical text still hits."""
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model id, normalized text hash).
+
+    Vectors are stored as float32 blobs in SQLite. Once the stored vector
+    bytes exceed ``max_bytes`` the least recently used entries are evicted.
+    One instance can be shared between threads.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        self.path = path or CACHE_CONFIG["path"]
+        self.max_bytes = max_bytes or CACHE_CONFIG["max_bytes"]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+        )
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+        ).fetchone()[0]
+        logger.info(
+            f"🗃️ Embedding cache at {self.path} "
+            f"({self._total_bytes / 1024**2:.1f} MiB of {self.max_bytes / 1024**2:.0f} MiB)."
+        )
+
+    @staticmethod
+    def key(model_id: str, text: str) -> str:
+        digest = hashlib.sha256(f"{model_id}\0{normalize_text(text)}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, model_id: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up texts, returning a vector or ``None`` per text."""
+        keys = [self.key(model_id, text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start : start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({placeholders})",
+                        [time.time(), *batch],
+                    )
+
+        results = []
+        for key in keys:
+            blob = found.get(key)
+            if blob is None:
+                self.misses += 1
+                results.append(None)
+            else:
+                self.hits += 1
+                vector = array("f")
+                vector.frombytes(blob)
+                results.append(vector.tolist())
+        return results
+
+    def put_many(self, model_id: str, texts: List[str], embeddings: List[List[float]]):
+        """Store vectors for texts, evicting old entries if over the size cap."""
+        now = time.time()
+        rows = {}
+        for text, embedding in zip(texts, embeddings):
+            blob = array("f", embedding).tobytes()
+            key = self.key(model_id, text)
+            rows[key] = (key, model_id, blob, len(blob), now)
+        rows = list(rows.values())
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for key, *_ in rows:
+                existing = self._conn.execute(
+                    "SELECT size FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if existing:
+                    self._total_bytes -= existing[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute("COMMIT")
+            self._total_bytes += sum(row[3] for row in rows)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until 90% of the cap is free again."""
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_used LIMIT ?",
+                (_SQL_BATCH,),
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            drop = []
+            for key, size in rows:
+                if self._total_bytes <= target:
+                    break
+                drop.append((key,))
+                self._total_bytes -= size
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", drop)
+            evicted += len(drop)
+        logger.info(f"🧹 Evicted {evicted} cached embedding(s) to stay under the cap.")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes": self._total_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the shared cache from CONFIG["EMBED_CACHE"], or ``None`` if disabled."""
+    global _cache
+    if not CACHE_CONFIG.get("enabled", False):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
@@ -0,0 +1,154 @@
+# - nlp/embed/local.py
+
+import logging
+import os
+from typing import List, Optional
+
+import numpy as np
+import onnxruntime as ort
+from langchain.embeddings.base import Embeddings
+from tokenizers import Tokenizer
+
+from config.defaults import CONFIG
+from nlp.embed.model import EMBED_DIMENSIONS, model_family
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Sentence pooling used by each supported model family
+LOCAL_POOLING = {
+    "bge-small-en-v1.5": "cls",
+    "all-minilm-l6-v2": "mean",
+}
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Embed text on the local CPU with an ONNX export of a sentence-embedding model.
+
+    Batches of ``batch_size`` texts are tokenized together and run through one
+    ONNX Runtime session using ``num_threads`` intra-op threads. With
+    ``quantize`` the model is dynamically quantized to int8 on first use and
+    the quantized copy is reused afterwards.
+    """
+
+    def __init__(
+        self,
+        model_name: str = None,
+        model_dir: str = None,
+        quantize: bool = None,
+        num_threads: int = None,
+        batch_size: int = None,
+    ):
+        local_config = CONFIG["LOCAL"]
+        self.model_id = model_name or local_config["EMBED_MODEL"]
+        family = model_family(self.model_id)
+        if family not in LOCAL_POOLING:
+            raise ValueError(
+                f"Unsupported local embedding model {self.model_id}; "
+                f"expected one of {sorted(LOCAL_POOLING)}."
+            )
+        self.pooling = LOCAL_POOLING[family]
+        self.batch_size = batch_size or local_config["batch_size"]
+        self.concurrency = 1  # inference parallelism comes from the ORT threads
+        self.cache = None  # the disk cache is for paid network calls
+
+        model_dir = model_dir or os.path.join(local_config["MODEL_DIR"], family)
+        model_path = self._find_model(model_dir)
+        if quantize if quantize is not None else local_config["quantize"]:
+            model_path = self._quantized(model_path)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads or local_config["num_threads"]
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {node.name for node in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=local_config["max_length"])
+        self.tokenizer.enable_padding()
+
+        expected_dim = EMBED_DIMENSIONS[family]
+        output_dim = self.session.get_outputs()[0].shape[-1]
+        self.dimension = output_dim if isinstance(output_dim, int) else expected_dim
+        if self.dimension != expected_dim:
+            raise ValueError(
+                f"{model_path} produces {self.dimension}-d vectors, "
+                f"expected {expected_dim} for {self.model_id}."
+            )
+        logger.info(
+            f"Local ONNX embeddings initialized with model {self.model_id} "
+            f"({os.path.basename(model_path)}, {options.intra_op_num_threads} thread(s))."
+        )
+
+    @staticmethod
+    def _find_model(model_dir: str) -> str:
+        for candidate in ("model.onnx", os.path.join("onnx", "model.onnx")):
+            path = os.path.join(model_dir, candidate)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(
+            f"No model.onnx under {model_dir}. Export one with e.g. "
+            f"`optimum-cli export onnx --model BAAI/bge-small-en-v1.5 {model_dir}`."
+        )
+
+    @staticmethod
+    def _quantized(model_path: str) -> str:
+        quantized_path = model_path.replace(".onnx", "_int8.onnx")
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info(f"🔧 Quantizing {model_path} to int8...")
+            quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        return quantized_path
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed multiple documents, raising if any of them cannot be embedded."""
+        if not all(isinstance(text, str) for text in texts):
+            raise ValueError("All input texts must be of type str.")
+        embeddings = []
+        for start in range(0, len(texts), self.batch_size):
+            embeddings.extend(self._embed_batch(texts[start : start + self.batch_size]))
+        return embeddings
+
+    def embed_documents_partial(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed in batches; a batch that fails yields ``None`` for each of its texts."""
+        if not all(isinstance(text, str) for text in texts):
+            raise ValueError("All input texts must be of type str.")
+        embeddings: List[Optional[List[float]]] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            try:
+                embeddings.extend(self._embed_batch(batch))
+            except Exception as e:
+                logger.warning(f"❌ Failed to embed batch of {len(batch)}: {e}")
+                embeddings.extend([None] * len(batch))
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query."""
+        if not isinstance(text, str):
+            raise ValueError(f"Input text must be of type str, but got {type(text)}.")
+        return self._embed_batch([text])[0]
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            inputs["token_type_ids"] = np.array(
+                [e.type_ids for e in encodings], dtype=np.int64
+            )
+
+        hidden = self.session.run(None, inputs)[0]  # (batch, tokens, dim)
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[:, :, None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).tolist()
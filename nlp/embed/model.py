@@ -1,28 +1,100 @@
 # nlp/embed/model.py
 
+import asyncio
 import logging
-from typing import List
+import time
+from typing import Iterator, List, Optional, Tuple
 
+import aiohttp
 import requests
 from langchain.embeddings.base import Embeddings
 
 from config.defaults import CONFIG
+from nlp.embed.cache import EmbeddingCache, get_embedding_cache
+from nlp.utils.metrics import get_metrics
+from nlp.utils.transport import (
+    AsyncRateLimiter,
+    async_post_json,
+    async_session,
+    backoff_delay,
+    is_payload_error,
+    is_retryable_status,
+    post_json,
+)
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 
-def get_embedding_function(model_name: str = None):
-    """Return the embedding function instance."""
-    return CloudflareEmbeddings()
+# Vector size of the embedding models we know about, keyed by model family
+EMBED_DIMENSIONS = {
+    "bge-small-en-v1.5": 384,
+    "bge-base-en-v1.5": 768,
+    "bge-large-en-v1.5": 1024,
+    "all-minilm-l6-v2": 384,
+}
 
 
-class CloudflareEmbeddings(Embeddings):
-    print("CloudflareEmbeddings initialized!")  # Add this line
+def model_family(model_id: str) -> str:
+    """
+    Provider-independent model name: "@cf/baai/bge-small-en-v1.5" and
+    "BAAI/bge-small-en-v1.5" are both "bge-small-en-v1.5".
+    """
+    return model_id.rstrip("/").split("/")[-1].lower()
+
+
+def get_embedding_function(model_name: str = None, **kwargs):
+    """
+    Return the embedding function for CONFIG["DEFAULT_PROVIDER"].
+
+    Extra keyword arguments (batching, concurrency) are passed to the
+    Cloudflare client; the local provider takes its knobs from CONFIG["LOCAL"].
+    """
+    provider = CONFIG["DEFAULT_PROVIDER"]
+    if provider == "LOCAL":
+        # onnxruntime is only imported when the local provider is selected
+        from nlp.embed.local import OnnxEmbeddings
+
+        return OnnxEmbeddings(model_name=model_name)
+    return CloudflareEmbeddings(model_name=model_name, **kwargs)
+
+
+class EmbeddingRequestError(ValueError):
+    """An embedding request answered with an error status (``None``: no answer)."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def _is_payload_error(error: Exception) -> bool:
+    """
+    Whether a failed batch should be split: only when the gateway rejected
+    the payload (400/413) or answered for a different number of texts.
+    Splitting under a 429, a 5xx or an outage only multiplies the requests.
+    """
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return is_payload_error(error.response.status_code)
+    if isinstance(error, EmbeddingRequestError):
+        return is_payload_error(error.status)
+    return isinstance(error, ValueError)
+
 
-    def __init__(self, model_name: str = None):
+class CloudflareEmbeddings(Embeddings):
+    def __init__(
+        self,
+        model_name: str = None,
+        batch_size: int = None,
+        batch_max_bytes: int = None,
+        concurrency: int = None,
+        max_rps: float = None,
+        cache: Optional[EmbeddingCache] = None,
+    ):
         cf_config = CONFIG["CLOUDFLARE"]
         model_id = model_name or cf_config["EMBED_MODEL"]  # use model_name if given
+        self.model_id = model_id
+        self.dimension = EMBED_DIMENSIONS.get(model_family(model_id))
+        self._cache = cache
 
         self.endpoint_url = cf_config["gateway_endpoint"].format(
             account_id=cf_config["account_id"],
@@ -30,14 +102,129 @@ class CloudflareEmbeddings(Embeddings):
             model_id=model_id,
         )
         self.token = cf_config["api_token"]
+        self.batch_size = batch_size or cf_config.get("embed_batch_size", 100)
+        self.batch_max_bytes = batch_max_bytes or cf_config.get(
+            "embed_batch_max_bytes", 256 * 1024
+        )
+        self.concurrency = concurrency or cf_config.get("embed_concurrency", 4)
+        self.max_rps = max_rps if max_rps is not None else cf_config.get("embed_max_rps", 0)
+        self.max_retries = cf_config.get("embed_max_retries", 5)
+        self.backoff_base = cf_config.get("embed_backoff_base", 0.5)
+        self.backoff_max = cf_config.get("embed_backoff_max", 30)
         logger.info(f"Cloudflare embeddings initialized with model {model_id}.")
 
+    @property
+    def cache(self) -> Optional[EmbeddingCache]:
+        """Document embedding cache; opened on first use unless one was given."""
+        if self._cache is None:
+            self._cache = get_embedding_cache()
+        return self._cache
+
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Embed multiple documents."""
+        """Embed multiple documents, raising if any of them cannot be embedded."""
+        embeddings = self.embed_documents_partial(texts)
+        failed = sum(1 for embedding in embeddings if embedding is None)
+        if failed:
+            raise ValueError(f"Failed to embed {failed} of {len(texts)} documents.")
+        return embeddings
+
+    def embed_documents_partial(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed multiple documents in batches.
+
+        The result is aligned with ``texts``; a text that could not be embedded
+        gets ``None`` instead of a vector. A batch the gateway rejects is split
+        down to the offending text; a batch that still hits 429/5xx or
+        connection errors after its retries comes back as all ``None``.
+        """
         if not all(isinstance(text, str) for text in texts):
             raise ValueError("All input texts must be of type str.")
         logger.debug(f"Embedding {len(texts)} documents.")
-        return [self._embed(text) for text in texts]
+
+        embeddings, pending = self._from_cache(texts)
+        fresh: List[Optional[List[float]]] = []
+        for start, end in self._batch_bounds(pending):
+            fresh.extend(self._embed_batch_with_split(pending[start:end]))
+        return self._merge_fresh(texts, embeddings, pending, fresh)
+
+    def _from_cache(self, texts: List[str]):
+        """Return (cached vector or None per text, unique texts still to embed)."""
+        cache = self.cache
+        if cache is None:
+            embeddings = [None] * len(texts)
+        else:
+            embeddings = cache.get_many(self.model_id, texts)
+        pending = list(
+            dict.fromkeys(
+                text for text, embedding in zip(texts, embeddings) if embedding is None
+            )
+        )
+        get_metrics().count("embed.cached", len(texts) - len(pending))
+        return embeddings, pending
+
+    def _merge_fresh(self, texts, embeddings, pending, fresh):
+        """Cache freshly embedded vectors and fill them in for every matching text."""
+        embedded = {
+            text: embedding
+            for text, embedding in zip(pending, fresh)
+            if embedding is not None
+        }
+        cache = self.cache
+        if cache is not None and embedded:
+            cache.put_many(self.model_id, list(embedded), list(embedded.values()))
+        return [
+            embedding if embedding is not None else embedded.get(text)
+            for text, embedding in zip(texts, embeddings)
+        ]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Asynchronously embed documents, raising if any cannot be embedded."""
+        embeddings = await self.aembed_documents_partial(texts)
+        failed = sum(1 for embedding in embeddings if embedding is None)
+        if failed:
+            raise ValueError(f"Failed to embed {failed} of {len(texts)} documents.")
+        return embeddings
+
+    async def aembed_documents_partial(
+        self, texts: List[str], session: aiohttp.ClientSession = None
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed documents with up to ``concurrency`` batch requests in flight.
+
+        Request starts are capped at ``max_rps``; 429/5xx responses and
+        connection errors are retried with jittered backoff. Results come back
+        in input order, with ``None`` for texts that could not be embedded.
+        Pass ``session`` to reuse one connection pool across several calls.
+        """
+        if not all(isinstance(text, str) for text in texts):
+            raise ValueError("All input texts must be of type str.")
+        logger.debug(
+            f"Embedding {len(texts)} documents, {self.concurrency} request(s) in flight."
+        )
+
+        embeddings, pending = self._from_cache(texts)
+        if not pending:
+            return embeddings
+
+        own_session = session is None
+        if own_session:
+            session = async_session(self.concurrency)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = AsyncRateLimiter(self.max_rps)
+        try:
+            batches = await asyncio.gather(
+                *(
+                    self._aembed_batch_with_split(
+                        pending[start:end], session, semaphore, limiter
+                    )
+                    for start, end in self._batch_bounds(pending)
+                )
+            )
+        finally:
+            if own_session:
+                await session.close()
+        fresh = [embedding for batch in batches for embedding in batch]
+        return self._merge_fresh(texts, embeddings, pending, fresh)
 
     def embed_query(self, text: str) -> List[float]:
         """Embed a single query."""
@@ -46,34 +233,168 @@ class CloudflareEmbeddings(Embeddings):
         logger.debug(f"Embedding query: {text}")
         return self._embed(text)
 
+    def _batch_bounds(self, texts: List[str]) -> Iterator[Tuple[int, int]]:
+        """Yield (start, end) slices that respect the batch size and byte limits."""
+        start, batch_bytes = 0, 0
+        for i, text in enumerate(texts):
+            text_bytes = len(text.encode("utf-8"))
+            full = i - start >= self.batch_size
+            too_big = batch_bytes + text_bytes > self.batch_max_bytes
+            if i > start and (full or too_big):
+                yield start, i
+                start, batch_bytes = i, 0
+            batch_bytes += text_bytes
+        if start < len(texts):
+            yield start, len(texts)
+
+    def _embed_batch_with_split(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed a batch, halving and retrying it when the gateway rejects the
+        payload. Any other failure, once retries are spent, fails the whole
+        batch (``None`` per text).
+        """
+        try:
+            return self._embed_batch_with_retry(texts)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if len(texts) == 1 or not _is_payload_error(e):
+                logger.warning(f"❌ Failed to embed {len(texts)} text(s): {e}")
+                return [None] * len(texts)
+            mid = len(texts) // 2
+            logger.warning(
+                f"⚠️ Batch of {len(texts)} rejected, splitting and retrying: {e}"
+            )
+            get_metrics().count("embed.splits")
+            return self._embed_batch_with_split(
+                texts[:mid]
+            ) + self._embed_batch_with_split(texts[mid:])
+
+    def _embed_batch_with_retry(self, texts: List[str]) -> List[List[float]]:
+        """Send one batch, retrying 429/5xx and connection errors with backoff."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._embed_batch(texts)
+            except requests.exceptions.RequestException as e:
+                response = e.response
+                status = response.status_code if response is not None else None
+                if not is_retryable_status(status) or attempt == self.max_retries:
+                    raise
+                retry_after = response.headers.get("Retry-After") if response is not None else None
+                error = e
+            get_metrics().count("embed.retries")
+            delay = backoff_delay(
+                attempt, self.backoff_base, self.backoff_max, retry_after
+            )
+            logger.warning(
+                f"⏳ Embedding batch of {len(texts)} got {error}; "
+                f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s."
+            )
+            time.sleep(delay)
+
+    async def _aembed_batch_with_split(
+        self, texts: List[str], session, semaphore, limiter
+    ) -> List[Optional[List[float]]]:
+        """Async counterpart of _embed_batch_with_split."""
+        try:
+            return await self._aembed_batch(texts, session, semaphore, limiter)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            if len(texts) == 1 or not _is_payload_error(e):
+                # Left as None, so a resumed run embeds them again
+                logger.warning(f"❌ Failed to embed {len(texts)} text(s): {e}")
+                return [None] * len(texts)
+            mid = len(texts) // 2
+            logger.warning(
+                f"⚠️ Batch of {len(texts)} rejected, splitting and retrying: {e}"
+            )
+            get_metrics().count("embed.splits")
+            halves = await asyncio.gather(
+                self._aembed_batch_with_split(texts[:mid], session, semaphore, limiter),
+                self._aembed_batch_with_split(texts[mid:], session, semaphore, limiter),
+            )
+            return halves[0] + halves[1]
+
+    async def _aembed_batch(
+        self, texts: List[str], session, semaphore, limiter
+    ) -> List[List[float]]:
+        """Send one batch, retrying 429/5xx and connection errors with backoff."""
+        payload = {"text": texts}
+        metrics = get_metrics()
+        max_retries = self.max_retries
+        for attempt in range(max_retries + 1):
+            retry_after = None
+            async with semaphore:
+                await limiter.acquire()
+                metrics.count("embed.requests")
+                try:
+                    with metrics.timer("embed.request"):
+                        status, headers, result = await async_post_json(
+                            session, self.endpoint_url, payload, token=self.token
+                        )
+                    retry_after = headers.get("Retry-After")
+                    error = f"HTTP {status}: {result}"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    status, error = None, e
+                    metrics.count("embed.errors")
+                    if attempt == max_retries:
+                        raise
+
+            if status is not None and status < 400:
+                return self._parse_embeddings(result, texts)
+            if status is not None:
+                metrics.count("embed.errors")
+            if not is_retryable_status(status) or attempt == max_retries:
+                raise EmbeddingRequestError(f"Embedding request failed with {error}", status)
+            metrics.count("embed.retries")
+
+            # Sleep outside the semaphore so other batches keep the slot busy
+            delay = backoff_delay(
+                attempt, self.backoff_base, self.backoff_max, retry_after
+            )
+            logger.warning(
+                f"⏳ Embedding batch of {len(texts)} got {error}; "
+                f"retry {attempt + 1}/{max_retries} in {delay:.2f}s."
+            )
+            await asyncio.sleep(delay)
+
     def _embed(self, text: str) -> List[float]:
         """Internal method to embed text using Cloudflare API."""
         if not isinstance(text, str):
             raise ValueError(f"Expected a string, but got {type(text)} instead.")
+        return self._embed_batch_with_retry([text])[0]
 
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-        }
-
-        payload = {"text": text}
-        logger.debug(f"Sending request to Cloudflare with payload: {payload}")
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Send one batch of texts to the Cloudflare API, one vector per text."""
+        payload = {"text": texts}
+        logger.debug(f"Sending batch of {len(texts)} text(s) to Cloudflare.")
 
+        metrics = get_metrics()
+        metrics.count("embed.requests")
         try:
-            response = requests.post(self.endpoint_url, json=payload, headers=headers)
+            with metrics.timer("embed.request"):
+                response = post_json(self.endpoint_url, payload, token=self.token)
+            if metrics.enabled:
+                # The shared session retries connection errors and 429s itself
+                retries = getattr(getattr(response.raw, "retries", None), "history", ())
+                metrics.count("embed.retries", len(retries or ()))
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
+            metrics.count("embed.errors")
             logger.error(f"Request failed: {e}")
             raise
 
-        result = response.json()
-        logger.debug(f"Response from Cloudflare: {len(result['result']['data'][0])}")
+        return self._parse_embeddings(response.json(), texts)
 
-        if "result" in result and "data" in result["result"]:
-            embedding = result["result"]["data"][0]
-            if isinstance(embedding, list):
-                return embedding
-            else:
-                raise ValueError(f"Embedding is not a list: {embedding}")
+    def _parse_embeddings(self, result: dict, texts: List[str]) -> List[List[float]]:
+        """Pull the vectors out of a Cloudflare response, one per input text."""
+        if result and "result" in result and "data" in result["result"]:
+            embeddings = result["result"]["data"]
+            if len(embeddings) != len(texts):
+                raise ValueError(
+                    f"Expected {len(texts)} embeddings, got {len(embeddings)}."
+                )
+            for embedding in embeddings:
+                if not isinstance(embedding, list):
+                    raise ValueError(f"Embedding is not a list: {embedding}")
+            logger.debug(f"Response from Cloudflare: {len(embeddings)} embedding(s)")
+            return embeddings
         else:
             raise ValueError(f"Unexpected response format: {result}")
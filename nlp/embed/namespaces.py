@@ -0,0 +1,40 @@
+# - nlp/embed/namespaces.py
+
+import re
+from typing import Dict, Optional
+
+from config.defaults import CONFIG
+
+# Chroma's own rule for collection names
+_VALID_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{1,61}[A-Za-z0-9]")
+
+
+def default_namespace() -> str:
+    return CONFIG["CHROMA"]["DEFAULT_NAMESPACE"]
+
+
+def configured_namespaces() -> Dict[str, str]:
+    """Namespace -> collection name, the default namespace included."""
+    chroma = CONFIG["CHROMA"]
+    return {chroma["DEFAULT_NAMESPACE"]: chroma["COLLECTION_NAME"], **chroma["NAMESPACES"]}
+
+
+def collection_for(namespace: Optional[str] = None) -> str:
+    """
+    The Chroma collection behind ``namespace`` (default DEFAULT_NAMESPACE).
+
+    Namespaces listed in CHROMA.NAMESPACES map to their collection; any
+    other valid name is its own collection, so a new document set can be
+    ingested from the CLI without a config change. Raises ValueError for a
+    name Chroma would reject.
+    """
+    namespace = namespace or default_namespace()
+    configured = configured_namespaces()
+    if namespace in configured:
+        return configured[namespace]
+    if ".." in namespace or not _VALID_NAME.fullmatch(namespace):
+        raise ValueError(
+            f"Invalid namespace {namespace!r}: use 3-63 letters, digits, '.', '_' or '-', "
+            f"starting and ending with a letter or digit."
+        )
+    return namespace
@@ -0,0 +1,217 @@
+# - nlp/embed/runs.py
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Set
+
+from config.defaults import CONFIG
+
+logger = logging.getLogger(__name__)
+
+RUNS_DB = CONFIG["CHROMA"]["RUNS_DB"]
+
+# Most ids SQLite binds in one statement, with room to spare
+_ID_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    collection TEXT NOT NULL,
+    status TEXT NOT NULL,
+    options TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    duration REAL,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    stored INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS run_files (
+    run_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (run_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stored_chunks (
+    run_id TEXT NOT NULL,
+    chunk_id TEXT NOT NULL,
+    PRIMARY KEY (run_id, chunk_id)
+) WITHOUT ROWID;
+"""
+
+
+class IngestRun:
+    """
+    Checkpoint of one ingestion run, backed by the run log.
+
+    Chunk ids are recorded as soon as ChromaBatchWriter has stored them (pass
+    ``mark_stored`` as its ``on_flush``), so a run that dies part-way can be
+    resumed and only the chunks that never reached Chroma are embedded again.
+    ``finish()`` writes the final status record.
+    """
+
+    def __init__(self, log: "RunLog", run_id: str, options: dict, resumed: bool = False):
+        self.log = log
+        self.run_id = run_id
+        self.options = options
+        self.resumed = resumed
+        self._started = time.monotonic()
+
+    @property
+    def files(self) -> List[str]:
+        return self.log._run_files(self.run_id)
+
+    def record_files(self, paths: Iterable):
+        """The files this run ingests, in order (a resumed run re-reads the same ones)."""
+        self.log._execute_many(
+            "INSERT OR REPLACE INTO run_files VALUES (?, ?, ?)",
+            [(self.run_id, position, str(path)) for position, path in enumerate(paths)],
+        )
+
+    def completed_count(self) -> int:
+        return self.log._query(
+            "SELECT COUNT(*) FROM stored_chunks WHERE run_id = ?", (self.run_id,)
+        )[0][0]
+
+    def completed(self, chunk_ids: Iterable[str]) -> Set[str]:
+        """The subset of ``chunk_ids`` this run has already stored."""
+        return self.log._stored(self.run_id, list(chunk_ids))
+
+    def stored_ids(self) -> Set[str]:
+        """Every chunk id this run has stored, over all its attempts."""
+        rows = self.log._query("SELECT chunk_id FROM stored_chunks WHERE run_id = ?", (self.run_id,))
+        return {row[0] for row in rows}
+
+    def mark_stored(self, chunk_ids: List[str]):
+        self.log._execute_many(
+            "INSERT OR IGNORE INTO stored_chunks VALUES (?, ?)",
+            [(self.run_id, chunk_id) for chunk_id in chunk_ids],
+        )
+
+    def update(self, chunks: int = None, skipped: int = None, failed: int = None):
+        """Counts of the current attempt; ``stored`` is kept by mark_stored."""
+        self.log._execute(
+            "UPDATE runs SET chunks = COALESCE(?, chunks), skipped = COALESCE(?, skipped), "
+            "failed = COALESCE(?, failed) WHERE run_id = ?",
+            (chunks, skipped, failed, self.run_id),
+        )
+
+    def finish(self, status: str = "completed", error: Optional[str] = None):
+        """Write the final status record; duration adds up over resumed attempts."""
+        seconds = time.monotonic() - self._started
+        self.log._execute(
+            "UPDATE runs SET status = ?, finished_at = ?, "
+            "duration = COALESCE(duration, 0) + ?, error = ?, "
+            "stored = (SELECT COUNT(*) FROM stored_chunks WHERE run_id = runs.run_id) "
+            "WHERE run_id = ?",
+            (status, time.time(), seconds, error, self.run_id),
+        )
+        record = self.log.get(self.run_id)
+        summary = (
+            f"{record['stored']} stored, {record['skipped']} already done, "
+            f"{record['failed']} failed of {record['chunks']} chunk(s) "
+            f"in {record['duration']:.1f}s"
+        )
+        if status == "completed":
+            logger.info(f"🏁 Run {self.run_id} completed: {summary}.")
+        else:
+            logger.error(
+                f"❌ Run {self.run_id} {status}: {summary}. "
+                f"Resume with --resume {self.run_id}"
+            )
+
+
+class RunLog:
+    """
+    SQLite record of ingestion runs: their options and files, the chunk ids
+    each has stored, and a final status with counts, duration and error.
+    Safe to share between the streaming pipeline's threads.
+    """
+
+    def __init__(self, path: str = RUNS_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+
+    def start(self, collection: str, options: dict) -> IngestRun:
+        run_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        self._execute(
+            "INSERT INTO runs (run_id, collection, status, options, started_at) "
+            "VALUES (?, ?, 'running', ?, ?)",
+            (run_id, collection, json.dumps(options), time.time()),
+        )
+        logger.info(f"🆔 Ingestion run {run_id} (resume with --resume {run_id} if it stops).")
+        return IngestRun(self, run_id, options)
+
+    def resume(self, run_id: str) -> IngestRun:
+        """Reopen an unfinished run; raises ValueError for unknown or completed runs."""
+        record = self.get(run_id)
+        if record is None:
+            raise ValueError(f"No ingestion run {run_id!r} in {self.path}")
+        if record["status"] == "completed":
+            raise ValueError(f"Run {run_id} already completed; nothing to resume.")
+        self._execute(
+            "UPDATE runs SET status = 'running', attempts = attempts + 1, error = NULL "
+            "WHERE run_id = ?",
+            (run_id,),
+        )
+        run = IngestRun(self, run_id, json.loads(record["options"]), resumed=True)
+        logger.info(
+            f"⏯️ Resuming run {run_id}: {run.completed_count()} chunk(s) already stored."
+        )
+        return run
+
+    def get(self, run_id: str) -> Optional[Dict]:
+        rows = self._query("SELECT * FROM runs WHERE run_id = ?", (run_id,))
+        return dict(rows[0]) if rows else None
+
+    def recent(self, limit: int = 10) -> List[Dict]:
+        rows = self._query("SELECT * FROM runs ORDER BY started_at DESC LIMIT ?", (limit,))
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self._db.close()
+
+    def _execute(self, sql: str, params=()):
+        with self._lock, self._db:
+            self._db.execute(sql, params)
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _execute_many(self, sql: str, rows):
+        with self._lock, self._db:
+            self._db.executemany(sql, rows)
+
+    def _run_files(self, run_id: str) -> List[str]:
+        rows = self._query(
+            "SELECT path FROM run_files WHERE run_id = ? ORDER BY position", (run_id,)
+        )
+        return [row[0] for row in rows]
+
+    def _stored(self, run_id: str, chunk_ids: List[str]) -> Set[str]:
+        done = set()
+        for start in range(0, len(chunk_ids), _ID_BATCH):
+            batch = chunk_ids[start : start + _ID_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._query(
+                f"SELECT chunk_id FROM stored_chunks "
+                f"WHERE run_id = ? AND chunk_id IN ({placeholders})",
+                (run_id, *batch),
+            )
+            done.update(row[0] for row in rows)
+        return done
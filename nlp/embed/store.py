@@ -0,0 +1,147 @@
+# - nlp/embed/store.py
+
+import logging
+import time
+from typing import Callable, List, Optional
+
+from config.defaults import CONFIG
+from nlp.utils.metrics import get_metrics
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+WRITE_BATCH_SIZE = CONFIG["CHROMA"]["WRITE_BATCH_SIZE"]
+
+# Collection metadata key counting the writes to it; retrieval caches key on it
+COLLECTION_VERSION_KEY = "version"
+
+
+def bump_collection_version(collection) -> int:
+    """
+    Record that ``collection``'s contents changed, so cached search results
+    for it (nlp.retrieve.cache) are no longer served. Returns the new version.
+    Counts on from the handle's metadata (modify() keeps it current), so pass
+    a handle opened after any other writer's last bump.
+    """
+    metadata = dict(collection.metadata or {})
+    metadata[COLLECTION_VERSION_KEY] = metadata.get(COLLECTION_VERSION_KEY, 0) + 1
+    collection.modify(metadata=metadata)
+    return metadata[COLLECTION_VERSION_KEY]
+
+
+def collection_stamp(collection) -> dict:
+    """What an index was built from: a purge changes the id, a write the version."""
+    return {
+        "collection_id": str(collection.id),
+        "version": (collection.metadata or {}).get(COLLECTION_VERSION_KEY, 0),
+    }
+
+
+class ChromaBatchWriter:
+    """
+    Buffer embedded records and upsert them into a Chroma collection in batches.
+
+    Upserts make reruns idempotent: a record whose id is already stored is
+    overwritten rather than duplicated. If a flush is rejected it is split
+    until the offending record is isolated, so one bad record only drops
+    itself. Use as a context manager, or call ``close()``, to flush the tail.
+    With ``max_delay`` a partial batch is also flushed once its oldest record
+    has waited that many seconds, so a slow trickle still lands promptly.
+    ``on_flush`` is called with the ids of every batch once it is stored.
+    The collection version is bumped once, on ``close()``, if anything was
+    written.
+    """
+
+    def __init__(
+        self,
+        collection,
+        batch_size: int = None,
+        max_delay: float = None,
+        on_flush: Optional[Callable[[List[str]], None]] = None,
+    ):
+        self.collection = collection
+        self.batch_size = batch_size or CONFIG["CHROMA"]["WRITE_BATCH_SIZE"]
+        self.max_delay = max_delay
+        self.on_flush = on_flush
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self._unversioned = False
+        self._buffer = []
+        self._buffered_at = None
+        self._started = time.monotonic()
+
+    def add(self, doc_id: str, content: str, metadata: dict, embedding: List[float]):
+        if not self._buffer:
+            self._buffered_at = time.monotonic()
+        self._buffer.append((doc_id, content, metadata, embedding))
+        if len(self._buffer) >= self.batch_size or self.flush_due():
+            self.flush()
+
+    def flush_due(self) -> bool:
+        return (
+            self.max_delay is not None
+            and bool(self._buffer)
+            and time.monotonic() - self._buffered_at >= self.max_delay
+        )
+
+    def flush(self) -> int:
+        """Upsert everything buffered; returns the number of records written."""
+        if not self._buffer:
+            return 0
+        # Chroma rejects duplicate ids within one call; the last record wins
+        records = list({record[0]: record for record in self._buffer}.values())
+        self._buffer = []
+
+        flush_started = time.monotonic()
+        stored_ids = self._upsert(records)
+        flush_seconds = time.monotonic() - flush_started
+        written = len(stored_ids)
+        self._unversioned = self._unversioned or bool(stored_ids)
+        if self.on_flush is not None and stored_ids:
+            self.on_flush(stored_ids)
+
+        self.flushes += 1
+        self.written += written
+        self.failed += len(records) - written
+        metrics = get_metrics()
+        metrics.observe("store.flush", flush_seconds)
+        metrics.count("store.stored", written)
+        metrics.count("store.failed", len(records) - written)
+        elapsed = time.monotonic() - self._started
+        logger.info(
+            f"💾 Batch {self.flushes}: upserted {written}/{len(records)} record(s) "
+            f"into '{self.collection.name}' in {flush_seconds:.2f}s "
+            f"({self.written} total, {self.written / elapsed if elapsed else 0:.1f} records/s)."
+        )
+        return written
+
+    def _upsert(self, records) -> List[str]:
+        try:
+            self.collection.upsert(
+                ids=[record[0] for record in records],
+                documents=[record[1] for record in records],
+                metadatas=[record[2] for record in records],
+                embeddings=[record[3] for record in records],
+            )
+            return [record[0] for record in records]
+        except Exception as e:
+            if len(records) == 1:
+                logger.warning(f"❌ Dropping record {records[0][0]}: {e}")
+                return []
+            mid = len(records) // 2
+            logger.debug(f"Upsert of {len(records)} record(s) failed, splitting: {e}")
+            return self._upsert(records[:mid]) + self._upsert(records[mid:])
+
+    def close(self) -> int:
+        written = self.flush()
+        if self._unversioned:
+            bump_collection_version(self.collection)
+            self._unversioned = False
+        return written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
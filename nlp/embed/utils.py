@@ -1,12 +1,21 @@
 # - nlp/embed/utils.py
 
+import asyncio
+import json
 import logging
+import os
+import threading
 import uuid
+from itertools import islice
+from typing import Iterable, Set
 
 import chromadb
 
 from config.defaults import CONFIG
-from nlp.embed.model import CloudflareEmbeddings
+from nlp.embed.model import get_embedding_function, model_family
+from nlp.embed.store import WRITE_BATCH_SIZE, ChromaBatchWriter, bump_collection_version
+from nlp.utils.metrics import get_metrics
+from nlp.utils.transport import async_session
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -18,6 +27,23 @@ PERSIST_DIR = CONFIG["CHROMA"]["PERSIST_DIR"]
 COLLECTION_NAME = CONFIG["CHROMA"]["COLLECTION_NAME"]
 EMBED_MODEL_NAME = CONFIG[provider]["EMBED_MODEL"]
 
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(persist_dir=PERSIST_DIR):
+    """
+    The process's Chroma client for ``persist_dir``. Starting one opens its
+    SQLite database and segment manager, so it is done once per directory
+    and shared by every ingest (and every --watch cycle) after that.
+    """
+    key = os.path.abspath(persist_dir)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = chromadb.PersistentClient(path=persist_dir)
+        return client
+
 
 def embed_and_store(
     documents,
@@ -25,12 +51,92 @@ def embed_and_store(
     model_name=EMBED_MODEL_NAME,
     collection_name=COLLECTION_NAME,
     purge=False,
+    concurrency=1,
+    checkpoint=None,
+    embedding_function=None,
 ):
-    """Embed documents and store them in Chroma using Cloudflare Embeddings."""
-    logger.info(f"📦 Using Cloudflare model: {model_name}")
-    embedding_function = CloudflareEmbeddings(model_name=model_name)
+    """
+    Embed documents and store them in Chroma with the configured provider.
+
+    With ``concurrency`` > 1 (Cloudflare only) the embedding requests run on
+    an asyncio engine keeping that many batches in flight; otherwise batches
+    go one at a time. With a ``checkpoint`` (nlp.embed.runs.IngestRun),
+    chunks it has already stored are skipped and every stored batch is
+    recorded in it. Pass a warm ``embedding_function`` to reuse its
+    connections and cache across calls. Returns the run's counts: chunks,
+    stored, skipped, failed.
+    """
+    if embedding_function is None:
+        logger.info(f"📦 Using {provider} model: {model_name}")
+        embedding_function = get_embedding_function(
+            model_name=model_name, concurrency=concurrency
+        )
+
+    collection = open_collection(
+        embedding_function, persist_dir, collection_name, purge=purge
+    )
+    counts = {"chunks": 0, "stored": 0, "skipped": 0, "failed": 0}
+    metrics = get_metrics()
+
+    # Drop empty documents as they stream past so batches only carry real text;
+    # ``documents`` may be a generator (e.g. a chunk store) and is read lazily
+    def valid_documents():
+        pending = iter(documents)
+        while group := list(islice(pending, WRITE_BATCH_SIZE)):
+            counts["chunks"] += len(group)
+            done = set()
+            if checkpoint is not None:
+                done = checkpoint.completed(
+                    document.metadata.get("chunk_id") for document in group
+                )
+                counts["skipped"] += len(done)
+                metrics.count("embed.skipped", len(done))
+            for document in group:
+                if document.metadata.get("chunk_id") in done:
+                    continue
+                content = document.page_content.strip()
+                if not content:
+                    logger.warning(
+                        f"❌ Document {document.metadata.get('chunk_id')} has empty content."
+                    )
+                    continue
+                yield content, document
+
+    on_flush = checkpoint.mark_stored if checkpoint is not None else None
+    writer = ChromaBatchWriter(collection, on_flush=on_flush)
+
+    def store_batch(batch, embeddings):
+        counts["failed"] += store_embedded(writer, batch, embeddings)
+
+    if concurrency > 1 and embedding_function.concurrency > 1:
+        logger.info(f"⚡ Embedding with {concurrency} concurrent request(s).")
+        asyncio.run(
+            _embed_windows_async(embedding_function, valid_documents(), store_batch)
+        )
+    else:
+        pending = valid_documents()
+        while batch := list(islice(pending, embedding_function.batch_size)):
+            with metrics.timer("embed.batch"):
+                embeddings = embedding_function.embed_documents_partial(
+                    [content for content, _ in batch]
+                )
+            store_batch(batch, embeddings)
+    writer.close()
+
+    if counts["skipped"]:
+        logger.info(f"⏭️ Skipped {counts['skipped']} chunk(s) stored by an earlier attempt.")
+    log_store_summary(writer, collection, embedding_function, persist_dir)
+    counts["stored"] = writer.written
+    counts["failed"] += writer.failed
+    return counts
 
-    client = chromadb.PersistentClient(path=persist_dir)
+
+def open_collection(embedding_function, persist_dir, collection_name, purge=False):
+    """
+    Open (optionally purging first) the target collection and check it fits.
+    No other collection is touched.
+    """
+    client = get_client(persist_dir)
 
     # 💣 Optional: Purge collection if requested
     if purge:
@@ -43,51 +149,131 @@ def embed_and_store(
     # (Re)create the target collection
     logger.warning(f"📝💥⚠️ (Re)creating vectorstore collection: '{collection_name}'...")
     collection = client.get_or_create_collection(collection_name)
+    check_embedding_compatibility(collection, embedding_function)
+    # Other collections are other namespaces' document sets; they are left alone
+    return collection
 
-    # Optional cleanup of other collections
-    for c in client.list_collections():
-        if c.name != collection_name:
-            logger.info(f"🗑️ Deleting unused collection: {c.name}")
-            client.delete_collection(c.name)
-
-    successful_additions = 0
-    for document in documents:
-        content = document.page_content.strip()
-        if not content:
-            logger.warning(
-                f"❌ Document {document.metadata.get('chunk_id')} has empty content."
-            )
-            continue
 
-        doc_id = str(document.metadata.get("chunk_id") or uuid.uuid4())
+def delete_sources(
+    sources: Iterable[str],
+    persist_dir=PERSIST_DIR,
+    collection_name=COLLECTION_NAME,
+    on_delete=None,
+) -> Set[str]:
+    """
+    Delete every stored chunk whose ``source`` is one of ``sources``;
+    ``on_delete``, if given, is called with each source's deleted ids.
 
-        try:
-            embedding = embedding_function.embed_documents([content])[0]
-            if not embedding:
-                logger.warning(f"❌ Empty embedding for {doc_id}")
-                continue
-            logger.debug(f"Embedding for {doc_id}: {embedding[:5]}...")
-        except Exception as e:
-            logger.warning(f"❌ Failed to embed {doc_id}: {e}")
+    Returns the other sources that had chunks dropped as duplicates of the
+    deleted ones; their text is gone from the store until they are re-ingested.
+    """
+    client = get_client(persist_dir)
+    try:
+        collection = client.get_collection(collection_name)
+    except ValueError:
+        return set()
+
+    sources = list(sources)
+    deleted = 0
+    orphaned = set()
+    for source in sources:
+        records = collection.get(where={"source": source}, include=["metadatas"])
+        for metadata in records["metadatas"]:
+            orphaned.update(json.loads(metadata.get("duplicate_sources", "[]")))
+        if records["ids"]:
+            collection.delete(ids=records["ids"])
+            deleted += len(records["ids"])
+            if on_delete is not None:
+                on_delete(records["ids"])
+    if deleted:
+        bump_collection_version(collection)
+        logger.info(f"🗑️ Deleted {deleted} stale chunk(s) from {len(sources)} source(s).")
+    return orphaned - set(sources)
+
+
+def store_embedded(writer, batch, embeddings) -> int:
+    """
+    Hand embedded (content, document) pairs to a ChromaBatchWriter; returns
+    how many had no embedding.
+    """
+    missing = 0
+    for (content, document), embedding in zip(batch, embeddings):
+        doc_id = str(document.metadata.get("chunk_id") or uuid.uuid4())
+        if not embedding:
+            logger.warning(f"❌ Failed to embed {doc_id}")
+            missing += 1
             continue
+        logger.debug(f"Embedding for {doc_id}: {embedding[:5]}...")
+        writer.add(doc_id, content, document.metadata, embedding)
+    metrics = get_metrics()
+    metrics.count("embed.chunks", len(batch))
+    metrics.count("embed.failed", missing)
+    return missing
+
 
-        logger.warning(
-            f"✅💥 Adding embed to vectorstore collection: '{collection_name}'..."
+def log_store_summary(writer, collection, embedding_function, persist_dir):
+    if writer.failed:
+        logger.warning(f"⚠️ {writer.failed} record(s) could not be stored.")
+    logger.info(f"✅ Embedded and stored {writer.written} documents in {persist_dir}")
+    logger.info(
+        f"Collection '{collection.name}' now contains {collection.count()} documents."
+    )
+    if embedding_function.cache is not None:
+        stats = embedding_function.cache.stats()
+        logger.info(
+            f"🗃️ Embedding cache: {stats['hits']} hit(s), {stats['misses']} miss(es) "
+            f"({stats['hit_rate']:.1%} hit rate)."
         )
-        collection.add(
-            documents=[content],
-            metadatas=[document.metadata],
-            embeddings=[embedding],
-            ids=[doc_id],
+
+
+def check_embedding_compatibility(collection, embedding_function):
+    """
+    Refuse to mix embedding spaces in one collection.
+
+    The collection's metadata records the model and vector size it was built
+    with. A provider switch that changes either is rejected with a ValueError;
+    a compatible one (e.g. Cloudflare and local bge-small-en-v1.5) is allowed.
+    Collections without a record are checked by vector size, then stamped.
+    """
+    metadata = collection.metadata or {}
+    stored_model = metadata.get("embed_model")
+    stored_dim = metadata.get("embed_dim")
+    if stored_dim is None and collection.count() > 0:
+        stored_dim = len(collection.peek(1)["embeddings"][0])
+
+    model_id = embedding_function.model_id
+    dimension = embedding_function.dimension
+    if stored_dim and dimension and stored_dim != dimension:
+        raise ValueError(
+            f"Collection '{collection.name}' holds {stored_dim}-d vectors but "
+            f"{model_id} produces {dimension}-d vectors; purge it or switch back."
         )
-        logger.warning(
-            f"✅ Added embed to vectorstore collection: '{collection_name}'..."
+    if stored_model and model_family(stored_model) != model_family(model_id):
+        raise ValueError(
+            f"Collection '{collection.name}' was embedded with {stored_model}; "
+            f"refusing to mix in vectors from {model_id}."
         )
-        successful_additions += 1
 
-    logger.info(
-        f"✅ Embedded and stored {successful_additions} documents in {persist_dir}"
-    )
-    logger.info(
-        f"Collection '{collection_name}' now contains {collection.count()} documents."
-    )
+    if not stored_model and dimension:
+        collection.modify(
+            metadata={**metadata, "embed_model": model_id, "embed_dim": dimension}
+        )
+
+
+async def _embed_windows_async(embedding_function, valid_documents, store_batch):
+    """
+    Embed (content, document) pairs window by window on one connection pool.
+
+    A window spans several rounds of in-flight batches so the pool stays busy;
+    each window is stored before the next one starts, which bounds memory.
+    """
+    window = embedding_function.batch_size * embedding_function.concurrency * 4
+    pending = iter(valid_documents)
+    metrics = get_metrics()
+    async with async_session(embedding_function.concurrency) as session:
+        while batch := list(islice(pending, window)):
+            with metrics.timer("embed.window"):
+                embeddings = await embedding_function.aembed_documents_partial(
+                    [content for content, _ in batch], session=session
+                )
+            store_batch(batch, embeddings)
@@ -1,9 +1,9 @@
 # - nlp/llms/cloudflare.py
 
-import requests
 from typing import Optional, List
 from langchain.llms.base import LLM
 from config.defaults import CONFIG
+from nlp.utils.transport import post_json
 
 from pydantic import Field
 
@@ -26,16 +26,11 @@ class CloudflareLLM(LLM):
 
 
     def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-        }
-
         payload = {self.model_input_key: prompt}
         if stop:
             payload["stop"] = stop
 
-        response = requests.post(self.endpoint_url, json=payload, headers=headers)
+        response = post_json(self.endpoint_url, payload, token=self.token)
         response.raise_for_status()
 
         result = response.json()
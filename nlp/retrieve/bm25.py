@@ -0,0 +1,369 @@
+# - nlp/retrieve/bm25.py
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+from array import array
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config.defaults import CONFIG
+from nlp.embed.store import collection_stamp
+
+logger = logging.getLogger(__name__)
+
+BM25_CONFIG = CONFIG["BM25"]
+BM25_DIR = BM25_CONFIG["dir"]
+K1 = BM25_CONFIG["k1"]
+B = BM25_CONFIG["b"]
+MAX_POSTINGS = BM25_CONFIG["max_postings"]
+
+# Words, plus codes that keep their inner punctuation ("SKU-1234", "v2.1", "ISO/IEC")
+_TOKEN = re.compile(r"\w+(?:[-./]\w+)*")
+
+_FILES = ("terms", "offsets", "docs", "impacts", "ids")
+
+# Ids per Chroma get when reading changed chunks back
+_ID_BATCH = 500
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words; a code like "SKU-1234" also yields "sku" and "1234"."""
+    tokens = []
+    for match in _TOKEN.findall(text.lower()):
+        tokens.append(match)
+        if not match.isalnum():
+            tokens.extend(part for part in re.split(r"[-./]", match) if part)
+    return tokens
+
+
+def term_hash(term: str) -> int:
+    """Stable 64-bit term key; the index stores hashes, not strings."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def index_dir(collection_name: str, root: str = BM25_DIR) -> str:
+    return os.path.join(root, collection_name)
+
+
+def build_index(
+    chunks: Iterable[Tuple[str, str]], path: str, meta: Optional[dict] = None
+) -> dict:
+    """
+    Write a BM25 index of ``(chunk id, text)`` pairs to the directory ``path``.
+
+    Postings are grouped by term (sorted by term hash, so a lookup is a
+    binary search) and, within a term, ordered by their BM25 impact, highest
+    first, so a query can stop after a term's best ``max_postings``. Arrays
+    are .npy files for np.load(mmap_mode="r"). The index is built beside
+    ``path`` and swapped in, so readers never see a half-written one.
+    Returns the index's meta record.
+    """
+    vocabulary = {}  # term -> term number
+    term_ids, doc_ids, tfs = array("I"), array("I"), array("H")
+    lengths = array("I")
+    ids = []
+    for chunk_id, text in chunks:
+        doc = len(ids)
+        ids.append(chunk_id)
+        tokens = tokenize(text)
+        lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+            doc_ids.append(doc)
+            tfs.append(min(tf, 65535))
+
+    lengths = np.frombuffer(lengths, dtype=np.uint32).astype(np.float32)
+    avgdl = float(lengths.mean()) if len(lengths) else 0.0
+    term_ids = np.frombuffer(term_ids, dtype=np.uint32)
+    docs = np.frombuffer(doc_ids, dtype=np.uint32)
+    tf = np.frombuffer(tfs, dtype=np.uint16).astype(np.float32)
+    impacts = tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[docs] / (avgdl or 1)))
+
+    hashes = np.fromiter((term_hash(t) for t in vocabulary), dtype=np.uint64, count=len(vocabulary))
+    order = np.lexsort((-impacts, hashes[term_ids]))
+    posting_hashes = hashes[term_ids][order]
+    terms, starts = np.unique(posting_hashes, return_index=True)
+    offsets = np.append(starts, len(order)).astype(np.int64)
+
+    meta = {
+        **(meta or {}),
+        "chunks": len(ids),
+        "terms": len(terms),
+        "postings": len(order),
+        "avgdl": avgdl,
+        "k1": K1,
+        "b": B,
+    }
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    arrays = {
+        "terms": terms,
+        "offsets": offsets,
+        "docs": docs[order],
+        "impacts": impacts[order].astype(np.float32),
+        "ids": np.array(ids, dtype=f"S{max((len(i) for i in ids), default=1)}"),
+    }
+    for name in _FILES:
+        np.save(os.path.join(tmp, f"{name}.npy"), arrays[name])
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    # Readers that still map the old files keep them until they reopen
+    old = f"{path}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return meta
+
+
+class Bm25Index:
+    """
+    A built index, memory-mapped: opening it reads only meta.json and the
+    .npy headers, and a query touches a few pages of the term table plus
+    the postings of its own terms. Each query term reads at most
+    ``max_postings`` of its highest-impact postings, which bounds the work
+    for very common terms at the cost of some of their low-scoring tail.
+
+    ``delta`` is a small index of the chunks written since this one was
+    built and is searched along with it; ``deleted`` ids (its tombstones)
+    are skipped here. Term statistics still count tombstoned chunks until
+    the delta is merged (see update_collection_index).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_postings: int = MAX_POSTINGS,
+        deleted: Iterable[str] = (),
+        delta: Optional["Bm25Index"] = None,
+    ):
+        self.path = path
+        self.max_postings = max_postings
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        for name in _FILES:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        deleted = [chunk_id.encode("utf-8") for chunk_id in deleted]
+        self.dead = np.isin(self.ids, deleted) if deleted else None
+        self.delta = delta
+        self.live = self.meta["chunks"] - (int(self.dead.sum()) if deleted else 0)
+        self.n = self.live + (delta.live if delta is not None else 0)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top ``k`` ``(chunk id, BM25 score)`` pairs for ``query``, best first."""
+        if not self.n:
+            return []
+        hashes = sorted({term_hash(t) for t in tokenize(query)})
+        if not hashes:
+            return []
+        # Doc numbers of the delta follow on from this index's
+        segments = [(self, 0)]
+        if self.delta is not None:
+            segments.append((self.delta, self.meta["chunks"]))
+        spans = [segment._spans(hashes) for segment, _ in segments]
+
+        docs, scores = [], []
+        for term in hashes:
+            found = [(segment, base, span[term]) for (segment, base), span in zip(segments, spans) if term in span]
+            df = sum(end - start for _, _, (start, end) in found)
+            idf = math.log(1 + (self.n - df + 0.5) / (df + 0.5))
+            for segment, base, (start, end) in found:
+                end = min(end, start + self.max_postings)
+                hits = segment.docs[start:end]
+                weights = segment.impacts[start:end] * idf
+                if segment.dead is not None:
+                    keep = ~segment.dead[hits]
+                    hits, weights = hits[keep], weights[keep]
+                docs.append(hits.astype(np.int64) + base)
+                scores.append(weights)
+        if not docs:
+            return []
+
+        docs, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(scores))
+        if not len(totals):
+            return []
+        top = np.argpartition(-totals, k - 1)[:k] if len(totals) > k else np.arange(len(totals))
+        top = top[np.argsort(-totals[top])]
+        return [(self._chunk_id(int(docs[i])), float(totals[i])) for i in top]
+
+    def _spans(self, hashes: List[int]) -> dict:
+        """Posting range of each of ``hashes`` found in this index, by hash."""
+        hashes = np.array(hashes, dtype=np.uint64)
+        slots = np.searchsorted(self.terms, hashes)
+        found = slots < len(self.terms)
+        slots = slots[found]
+        slots = slots[self.terms[slots] == hashes[found]]
+        return {int(self.terms[s]): (int(self.offsets[s]), int(self.offsets[s + 1])) for s in slots}
+
+    def _chunk_id(self, doc: int) -> str:
+        if doc >= self.meta["chunks"]:
+            return self.delta._chunk_id(doc - self.meta["chunks"])
+        return self.ids[doc].decode("utf-8")
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def delta_dir(collection_name: str, root: str = BM25_DIR) -> str:
+    return f"{index_dir(collection_name, root)}.delta"
+
+
+def _read_meta(path: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _stamp_of(meta: Optional[dict]) -> Optional[dict]:
+    if meta is None:
+        return None
+    return {"collection_id": meta.get("collection_id"), "version": meta.get("version")}
+
+
+def _built(collection_name: str, root: str) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Meta records of the main index and of its delta; a delta left over
+    from before the main index was last rebuilt doesn't count.
+    """
+    main = _read_meta(index_dir(collection_name, root))
+    delta = _read_meta(delta_dir(collection_name, root))
+    if main is None or delta is None:
+        return main, None
+    if (delta.get("collection_id"), delta.get("base_version")) != (main.get("collection_id"), main.get("version")):
+        return main, None
+    return main, delta
+
+
+def open_index(collection_name: str, root: str = BM25_DIR) -> Optional[Bm25Index]:
+    """
+    The collection's index, with its delta, or None if none has been built.
+    The handle is shared and reopened when an ingest rebuilds the index or
+    its delta (either meta.json changes).
+    """
+    path = index_dir(collection_name, root)
+    stamps = []
+    for directory in (path, delta_dir(collection_name, root)):
+        try:
+            stamps.append(os.stat(os.path.join(directory, "meta.json")).st_mtime_ns)
+        except OSError:
+            stamps.append(None)
+    if stamps[0] is None:
+        return None
+    with _indexes_lock:
+        cached = _indexes.get(path)
+        if cached is None or cached[0] != stamps:
+            _, delta = _built(collection_name, root)
+            if delta is None:
+                index = Bm25Index(path)
+            else:
+                index = Bm25Index(
+                    path,
+                    deleted=delta["tombstones"],
+                    delta=Bm25Index(delta_dir(collection_name, root)),
+                )
+            cached = _indexes[path] = (stamps, index)
+        return cached[1]
+
+
+def build_collection_index(collection, root: str = BM25_DIR, page_size: int = 5000) -> Optional[dict]:
+    """
+    (Re)build the BM25 index of a Chroma collection from its stored text,
+    merging away any delta.
+
+    Skipped (returns None) when the index already matches the collection's
+    id and version, i.e. nothing was written since it was built. Pass a
+    handle opened after the last write, so its metadata holds the current
+    version.
+    """
+    path = index_dir(collection.name, root)
+    stamp = collection_stamp(collection)
+    main, delta = _built(collection.name, root)
+    if _stamp_of(delta or main) == stamp:
+        return None
+
+    def stored_chunks():
+        offset = 0
+        while True:
+            page = collection.get(include=["documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield from zip(page["ids"], page["documents"])
+            offset += len(page["ids"])
+
+    meta = build_index(stored_chunks(), path, stamp)
+    # Readers check a delta's base_version, so one briefly left beside the new index is ignored
+    shutil.rmtree(delta_dir(collection.name, root), ignore_errors=True)
+    logger.info(
+        f"🔤 BM25 index for '{collection.name}': {meta['chunks']} chunk(s), "
+        f"{meta['terms']} term(s), {meta['postings']} posting(s)."
+    )
+    return meta
+
+
+def update_collection_index(
+    collection,
+    changed_ids: Iterable[str],
+    since: Optional[dict],
+    root: str = BM25_DIR,
+    merge_ratio: Optional[float] = None,
+) -> Optional[dict]:
+    """
+    Bring the BM25 index up to date after writes that stored or deleted
+    ``changed_ids`` and took the collection from ``since`` (its
+    collection_stamp before them) to its current version.
+
+    Only the changed chunks are read back from Chroma. They go into a delta
+    index beside the main one, and their ids become tombstones that hide
+    the main index's postings for them; both accumulate until the next
+    merge. A full rebuild (build_collection_index) is done instead when the
+    index wasn't at ``since`` (a purge, or writes it never saw), and, as the
+    merge, once the delta covers more than ``merge_ratio`` (default
+    BM25.merge_ratio) of the corpus.
+    Skipped (returns None) when the index is already current.
+    """
+    stamp = collection_stamp(collection)
+    main, delta = _built(collection.name, root)
+    indexed = _stamp_of(delta or main)
+    if indexed == stamp:
+        return None
+    if main is None or indexed != since:
+        return build_collection_index(collection, root)
+
+    if merge_ratio is None:
+        merge_ratio = BM25_CONFIG["merge_ratio"]
+    tombstones = sorted(set(delta["tombstones"] if delta else ()) | set(changed_ids))
+    if len(tombstones) > merge_ratio * max(main["chunks"], 1):
+        logger.info(f"🔤 BM25 delta of '{collection.name}' covers {len(tombstones)} chunk(s); merging.")
+        return build_collection_index(collection, root)
+
+    def changed_chunks():
+        # Ids deleted since the last merge are simply not found
+        for start in range(0, len(tombstones), _ID_BATCH):
+            page = collection.get(ids=tombstones[start : start + _ID_BATCH], include=["documents"])
+            yield from zip(page["ids"], page["documents"])
+
+    meta = build_index(
+        changed_chunks(),
+        delta_dir(collection.name, root),
+        {**stamp, "base_version": main["version"], "tombstones": tombstones},
+    )
+    logger.info(
+        f"🔤 BM25 delta for '{collection.name}': {meta['chunks']} changed chunk(s), "
+        f"{len(tombstones) - meta['chunks']} deleted, over {main['chunks']} indexed."
+    )
+    return meta
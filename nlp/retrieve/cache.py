@@ -0,0 +1,169 @@
+# - nlp/retrieve/cache.py
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from langchain.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+from langchain.vectorstores.base import VectorStoreRetriever
+
+from config.defaults import CONFIG
+from nlp.retrieve.vectorstores import store_version
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONFIG = CONFIG["RETRIEVAL_CACHE"]
+
+
+def normalize_query(text: str) -> str:
+    """Case, spacing and trailing punctuation don't change what is being asked."""
+    return " ".join(text.casefold().split()).rstrip(" ?!.")
+
+
+class LRUCache:
+    """
+    Thread-safe LRU map with an optional TTL.
+
+    Keeps hit and miss counts and the time spent computing misses, from
+    which the latency saved by hits is estimated. Two threads missing on
+    the same key may both compute it; the last one stored wins.
+    """
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+        self._entries = OrderedDict()  # key -> (stored at, value)
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute: Callable):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or now - entry[0] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        started = time.perf_counter()
+        value = compute()
+        seconds = time.perf_counter() - started
+        with self._lock:
+            self.misses += 1
+            self.miss_seconds += seconds
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            mean_miss = self.miss_seconds / self.misses if self.misses else 0.0
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "mean_miss_ms": round(mean_miss * 1000, 3),
+                # Each hit skipped a computation that takes a miss's time on average
+                "saved_seconds": round(self.hits * mean_miss, 3),
+            }
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wrap an embedding function with an in-process LRU of query vectors,
+    keyed by model and normalized query text (see normalize_query).
+    Document embedding is passed straight through; other attributes
+    (model_id, dimension, ...) are the wrapped function's.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: LRUCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = (getattr(self.embeddings, "model_id", None), normalize_query(text))
+        return self.cache.get_or_compute(key, lambda: self.embeddings.embed_query(text))
+
+
+def vector_key(vector: List[float]) -> str:
+    """Hash of a query vector (as float32, so equal vectors hash equal)."""
+    return hashlib.sha1(array("f", vector).tobytes()).hexdigest()
+
+
+class CachedVectorStoreRetriever(VectorStoreRetriever):
+    """
+    A similarity retriever whose top-k results are cached.
+
+    The key is (namespace, collection id and version, query vector hash, k,
+    filter). Every ingest that changes the collection bumps its version
+    (see nlp.embed.store.bump_collection_version), so earlier results are
+    never served after the data changed; they just age out of the LRU.
+    Entries also expire after the cache's TTL.
+    """
+
+    namespace: str
+    results: LRUCache
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if self.search_type != "similarity":
+            return super()._get_relevant_documents(query, run_manager=run_manager)
+
+        vector = self.vectorstore.embeddings.embed_query(query)
+        k = self.search_kwargs.get("k", 4)
+        search_filter = self.search_kwargs.get("filter")
+        key = (
+            self.namespace,
+            *store_version(self.vectorstore),
+            vector_key(vector),
+            k,
+            json.dumps(search_filter, sort_keys=True),
+        )
+        documents = self.results.get_or_compute(
+            key,
+            lambda: self.vectorstore.similarity_search_by_vector(
+                vector, k=k, filter=search_filter
+            ),
+        )
+        # Callers may edit what they get back; the cached copies stay as stored
+        return [Document(page_content=d.page_content, metadata=dict(d.metadata)) for d in documents]
+
+
+query_embeddings = LRUCache(CACHE_CONFIG["query_embeddings"])
+results = LRUCache(CACHE_CONFIG["results"], ttl=CACHE_CONFIG["result_ttl"])
+
+
+def cache_stats() -> Dict:
+    return {
+        "enabled": CACHE_CONFIG["enabled"],
+        "query_embeddings": query_embeddings.stats(),
+        "results": results.stats(),
+    }
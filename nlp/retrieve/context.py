@@ -0,0 +1,223 @@
+# - nlp/retrieve/context.py
+
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from langchain.schema import Document
+
+from config.defaults import CONFIG
+from nlp.retrieve.bm25 import tokenize
+from nlp.utils.tokenizer import encode_with_offsets, resolve_encoding
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_CONFIG = CONFIG["CONTEXT"]
+# Chunks carry token_count in this encoding when CHUNK_UNIT is "tokens"
+CHUNK_ENCODING = CONFIG["GENERAL"]["tokenizer_encoding"]
+
+# Metadata key under which a retriever reports a result's score, higher = better
+SCORE_KEY = "retrieval_score"
+
+# The stuff chain joins chunks with a blank line
+SEPARATOR = "\n\n"
+# Sentence ends a trimmed chunk is cut back to
+_SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+
+def budget_for(model_id: Optional[str] = None) -> int:
+    """Context tokens allowed for ``model_id`` (CONTEXT.budget_tokens, else its "default")."""
+    budgets = CONTEXT_CONFIG["budget_tokens"]
+    return budgets.get(model_id or CONFIG["CLOUDFLARE"]["llm_model"], budgets["default"])
+
+
+def encoding_for(model_id: Optional[str] = None) -> str:
+    """
+    Tokenizer ``model_id``'s prompt is counted in (CONTEXT.encodings, else
+    its "default", else GENERAL.tokenizer_encoding).
+    """
+    encodings = CONTEXT_CONFIG["encodings"]
+    name = encodings.get(model_id or CONFIG["CLOUDFLARE"]["llm_model"]) or encodings["default"]
+    return name or CHUNK_ENCODING
+
+
+@lru_cache(maxsize=None)
+def _encoding(name: str):
+    try:
+        return resolve_encoding(name)
+    except Exception as e:
+        # tiktoken downloads vocabularies on first use, a tokenizer.json may not be there yet
+        logger.warning(f"⚠️ Tokenizer '{name}' unavailable ({e}); estimating 4 characters per token.")
+        return None
+
+
+class TokenCounter:
+    """
+    Count tokens with an encoding (see nlp.utils.tokenizer.get_tokenizer:
+    a tokenizer.json path or a tiktoken name, or a built one), caching
+    counts per text. A chunk's precomputed ``token_count`` is used when it
+    was counted in the same encoding. Without a loadable encoding, counts
+    are estimated at 4 characters per token.
+    """
+
+    def __init__(self, encoding=None, cache_size: int = None):
+        self.encoding_name = encoding if isinstance(encoding, str) else getattr(encoding, "name", None)
+        self.encoding = _encoding(encoding) if isinstance(encoding, str) else encoding
+        self.count = lru_cache(maxsize=cache_size or CONTEXT_CONFIG["token_cache"])(self._count)
+
+    def _count(self, text: str) -> int:
+        if self.encoding is None:
+            return math.ceil(len(text) / 4)
+        return len(self.encoding.encode_ordinary(text))
+
+    def count_document(self, document: Document) -> int:
+        precomputed = document.metadata.get("token_count")
+        if precomputed is not None and self.encoding_name == CHUNK_ENCODING:
+            return precomputed
+        return self.count(document.page_content)
+
+    def truncate(self, text: str, tokens: int) -> str:
+        """The longest prefix of ``text`` within ``tokens``, cut back to a sentence end if one is near."""
+        if self.encoding is None:
+            prefix = text[: tokens * 4]
+        else:
+            # Cut the text where the first token past the limit starts; decoding
+            # would respace it with WordPiece and SentencePiece vocabularies
+            text, ids, starts = encode_with_offsets(self.encoding, text)
+            prefix = text[: starts[tokens]] if len(ids) > tokens else text
+        ends = [m.end() for m in _SENTENCE_END.finditer(prefix + " ")]
+        if ends and ends[-1] >= len(prefix) // 2:
+            prefix = prefix[: ends[-1]]
+        return prefix.rstrip()
+
+
+_counters: Dict[str, TokenCounter] = {}
+
+
+def get_token_counter(encoding_name: Optional[str] = None) -> TokenCounter:
+    """Shared counter (and count cache) per encoding name; default the LLM's (see encoding_for)."""
+    name = encoding_name or encoding_for()
+    if name not in _counters:
+        _counters[name] = TokenCounter(name)
+    return _counters[name]
+
+
+def _term_vector(text: str) -> Counter:
+    return Counter(tokenize(text))
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[term] for term, count in a.items() if term in b)
+    return dot / math.sqrt(sum(v * v for v in a.values()) * sum(v * v for v in b.values()))
+
+
+@dataclass
+class PackedContext:
+    documents: List[Document]
+    budget: int
+    used_tokens: int
+    naive_tokens: int  # every candidate joined, as before
+    dropped: int = 0
+    trimmed: int = 0
+    duplicates: int = 0
+    order: List[int] = field(default_factory=list)  # candidate index of each document
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(self.naive_tokens - self.used_tokens, 0)
+
+
+def _relevance(documents: List[Document]) -> List[float]:
+    """
+    Each document's retrieval score (SCORE_KEY) relative to the best one,
+    or, unless every document has a positive score, its rank.
+    """
+    scores = [document.metadata.get(SCORE_KEY) for document in documents]
+    if documents and all(isinstance(score, (int, float)) and score > 0 for score in scores):
+        best = max(scores)
+        return [score / best for score in scores]
+    return [1 - i / len(documents) for i in range(len(documents))]
+
+
+def build_context(
+    question: str,
+    documents: List[Document],
+    chat_history: str = "",
+    budget: Optional[int] = None,
+    counter: Optional[TokenCounter] = None,
+    mmr_lambda: Optional[float] = None,
+    model_id: Optional[str] = None,
+) -> PackedContext:
+    """
+    Choose which retrieved chunks go into the answer prompt of LLM
+    ``model_id`` (default CLOUDFLARE.llm_model).
+
+    ``documents`` are ranked best first. They are picked with maximal
+    marginal relevance: relevance from the retriever's scores (e.g. the
+    hybrid retriever's fused scores, see SCORE_KEY) or else from the rank,
+    redundancy as the term-vector cosine to the chunks already picked,
+    weighed by ``mmr_lambda`` (1 = relevance only). Chunks at least
+    CONTEXT.duplicate_threshold similar to a picked one are dropped. Picks
+    fill ``budget`` tokens (default: the model's CONTEXT.budget_tokens),
+    counted in the model's CONTEXT.encodings, less the question and
+    ``chat_history``. The first pick that doesn't fit is trimmed if at
+    least CONTEXT.min_trim_tokens remain; everything after that is
+    dropped, so the lowest-value material goes first.
+    """
+    counter = counter or get_token_counter(encoding_for(model_id))
+    budget = budget_for(model_id) if budget is None else budget
+    mmr_lambda = CONTEXT_CONFIG["mmr_lambda"] if mmr_lambda is None else mmr_lambda
+    threshold = CONTEXT_CONFIG["duplicate_threshold"]
+
+    counts = [counter.count_document(d) for d in documents]
+    separator = counter.count(SEPARATOR)
+    naive = sum(counts) + separator * max(len(documents) - 1, 0)
+    remaining = budget - counter.count(question) - (counter.count(chat_history) if chat_history else 0)
+
+    vectors = [_term_vector(d.page_content) for d in documents]
+    relevance = _relevance(documents)
+    redundancy = [0.0] * len(documents)
+    candidates = list(range(len(documents)))
+    packed = PackedContext(documents=[], budget=budget, used_tokens=0, naive_tokens=naive)
+    used = 0
+
+    while candidates:
+        best = max(candidates, key=lambda i: mmr_lambda * relevance[i] - (1 - mmr_lambda) * redundancy[i])
+        candidates.remove(best)
+        if redundancy[best] >= threshold:
+            packed.duplicates += 1
+            continue
+
+        cost = counts[best] + (separator if packed.documents else 0)
+        document = documents[best]
+        if used + cost > remaining:
+            room = remaining - used - (separator if packed.documents else 0)
+            if room < CONTEXT_CONFIG["min_trim_tokens"]:
+                packed.dropped += 1 + len(candidates)
+                break
+            text = counter.truncate(document.page_content, room)
+            document = Document(page_content=text, metadata={**document.metadata, "trimmed": True})
+            cost = counter.count(text) + (separator if packed.documents else 0)
+            packed.trimmed += 1
+            packed.dropped += len(candidates)
+            candidates = []
+
+        packed.documents.append(document)
+        packed.order.append(best)
+        used += cost
+        for i in candidates:
+            redundancy[i] = max(redundancy[i], _cosine(vectors[i], vectors[best]))
+
+    packed.used_tokens = used
+    logger.info(
+        f"📦 Context: {len(packed.documents)}/{len(documents)} chunk(s), {used}/{max(remaining, 0)} tokens "
+        f"({packed.duplicates} near-duplicate(s), {packed.trimmed} trimmed, {packed.dropped} dropped); "
+        f"{packed.saved_tokens} token(s) saved vs. joining all ({naive})."
+    )
+    return packed
@@ -0,0 +1,598 @@
+# - nlp/retrieve/hnsw_store.py
+
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import hnswlib
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+from langchain.vectorstores.base import VectorStore
+
+from config.defaults import CONFIG
+from nlp.embed.model import model_family
+from nlp.embed.store import COLLECTION_VERSION_KEY, collection_stamp
+
+logger = logging.getLogger(__name__)
+
+HNSW_CONFIG = CONFIG["HNSW"]
+
+# Rows scored per block by the exact search (float16 rows are widened per block)
+_EXACT_BLOCK = 65536
+
+# Ids per Chroma get when reading changed vectors back
+_ID_BATCH = 500
+
+
+def snapshot_dir(collection_name: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or HNSW_CONFIG["PERSIST_DIR"], collection_name)
+
+
+def _self_distances(vectors: np.ndarray, space: str) -> np.ndarray:
+    """Each vector's distance to itself in ``space``: 0, except for inner product."""
+    if space == "ip":
+        return 1 - np.einsum("ij,ij->i", vectors, vectors)
+    return np.zeros(len(vectors), dtype=np.float32)
+
+
+def _page_vectors(collection, page, space: str) -> np.ndarray:
+    """
+    The page's embeddings in the order of its ids. Chroma 0.4.0's get()
+    lists the embeddings of recently written ids (still in its brute-force
+    buffer) ahead of the others, out of line with the ids. So each vector
+    is looked up: its nearest stored neighbour must be its own id, at its
+    self-distance. Rows where it isn't are re-read one id at a time, which
+    get() always answers in line.
+    """
+    vectors = np.asarray(page["embeddings"], dtype=np.float32)
+    if not len(vectors):
+        return vectors
+    nearest = collection.query(query_embeddings=vectors.tolist(), n_results=1, include=["distances"])
+    expected = _self_distances(vectors, space)
+    for row, chunk_id in enumerate(page["ids"]):
+        found, distances = nearest["ids"][row], nearest["distances"][row]
+        tolerance = 1e-4 * max(1.0, abs(float(expected[row])))
+        if found[:1] != [chunk_id] or abs(distances[0] - expected[row]) > tolerance:
+            single = collection.get(ids=[chunk_id], include=["embeddings"])
+            vectors[row] = single["embeddings"][0]
+    return vectors
+
+
+def delta_dir(collection_name: str, root: Optional[str] = None) -> str:
+    return f"{snapshot_dir(collection_name, root)}.delta"
+
+
+def _read_meta(path: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _built(collection_name: str, root: Optional[str]) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Meta records of the snapshot and of its delta; a delta left over from
+    before the snapshot was last exported doesn't count.
+    """
+    main = _read_meta(snapshot_dir(collection_name, root))
+    delta = _read_meta(delta_dir(collection_name, root))
+    if main is None or delta is None or delta.get("base_snapshot") != main.get("snapshot_id"):
+        return main, None
+    return main, delta
+
+
+def _stamp_of(meta: Optional[dict]) -> Optional[dict]:
+    if meta is None:
+        return None
+    return {"collection_id": meta.get("collection_id"), "version": meta.get(COLLECTION_VERSION_KEY)}
+
+
+def _write_snapshot(
+    collection,
+    pages: Iterable[dict],
+    count: int,
+    path: str,
+    meta: dict,
+    m: int,
+    ef_construction: int,
+    dtype: str,
+) -> dict:
+    """
+    Write the rows of ``pages`` (Chroma get() results, at most ``count``
+    rows in all) as a snapshot at ``path``, built beside it and swapped in.
+    """
+    space = (collection.metadata or {}).get("hnsw:space", "l2")
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    vectors = None
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    ids = []
+    row = 0
+    with open(os.path.join(tmp, "records.jsonl"), "wb") as records:
+        for page in pages:
+            block = _page_vectors(collection, page, space)[: count - row]
+            if not len(block):
+                continue
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(
+                    os.path.join(tmp, "vectors.npy"), mode="w+", dtype=dtype, shape=(count, block.shape[1])
+                )
+            vectors[row : row + len(block)] = block
+            for chunk_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                line = json.dumps({"id": chunk_id, "document": text, "metadata": metadata}).encode("utf-8")
+                records.write(line + b"\n")
+                offsets[row + 1] = offsets[row] + len(line) + 1
+                ids.append(chunk_id)
+                row += 1
+                if row == count:
+                    break
+    if vectors is None or row < count:
+        # Empty, or rows were deleted while we read: store only what was read
+        kept = np.array(vectors[:row]) if vectors is not None else np.zeros((0, 0), dtype=dtype)
+        del vectors
+        np.save(os.path.join(tmp, "vectors.npy"), kept)
+        vectors = kept
+    dim = vectors.shape[1]
+
+    # Squared norms, for the exact search's l2 and cosine distances
+    norms = np.empty(row, dtype=np.float32)
+    graph = hnswlib.Index(space=space, dim=dim or 1)
+    graph.init_index(max_elements=max(row, 1), ef_construction=ef_construction, M=m)
+    for start in range(0, row, _EXACT_BLOCK):
+        block = np.asarray(vectors[start : start + _EXACT_BLOCK], dtype=np.float32)
+        norms[start : start + len(block)] = np.einsum("ij,ij->i", block, block)
+        graph.add_items(block, np.arange(start, start + len(block)))
+    graph.save_index(os.path.join(tmp, "graph.bin"))
+    if isinstance(vectors, np.memmap):
+        vectors.flush()
+
+    order = np.argsort(np.array(ids, dtype=object)).astype(np.int64)
+    width = max((len(i.encode("utf-8")) for i in ids), default=1)
+    np.save(os.path.join(tmp, "offsets.npy"), offsets[: row + 1])
+    np.save(os.path.join(tmp, "norms.npy"), norms)
+    np.save(os.path.join(tmp, "ids.npy"), np.array(ids, dtype=f"S{width}")[order])
+    np.save(os.path.join(tmp, "id_rows.npy"), order)
+
+    meta = {
+        **meta,
+        "collection": collection.name,
+        "collection_metadata": collection.metadata or {},
+        "count": row,
+        "dim": dim,
+        "dtype": dtype,
+        "space": space,
+        "M": m,
+        "ef_construction": ef_construction,
+        # Changes on every export, so open stores know to reload
+        "snapshot_id": uuid.uuid4().hex,
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    old = f"{path}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return meta
+
+
+def export_collection(
+    collection,
+    root: Optional[str] = None,
+    m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    dtype: Optional[str] = None,
+    page_size: int = 5000,
+    force: bool = False,
+) -> Optional[dict]:
+    """
+    Build an HNSW snapshot of a Chroma collection under ``root/<name>/``,
+    merging away any delta (see update_snapshot).
+
+    The snapshot holds the vectors as a .npy matrix (``dtype`` float16 halves
+    it), the hnswlib graph, and a sidecar of ids, documents and metadata
+    (records.jsonl plus row offsets and a sorted id table). It is written
+    beside the old one and swapped in. Skipped (returns None) when the
+    existing snapshot was built from the collection's current id and
+    version, unless ``force``. Pass a handle opened after the last write,
+    so its metadata holds the current version.
+    """
+    m = m or HNSW_CONFIG["M"]
+    ef_construction = ef_construction or HNSW_CONFIG["EF_CONSTRUCTION"]
+    dtype = dtype or HNSW_CONFIG["DTYPE"]
+    path = snapshot_dir(collection.name, root)
+
+    stamp = collection_stamp(collection)
+    main, delta = _built(collection.name, root)
+    if not force and _stamp_of(delta or main) == stamp:
+        return None
+
+    started = time.perf_counter()
+    count = collection.count()
+
+    def stored_pages():
+        row = 0
+        while row < count:
+            page = collection.get(
+                include=["embeddings", "documents", "metadatas"], limit=page_size, offset=row
+            )
+            if not page["ids"]:
+                return
+            yield page
+            row += len(page["ids"])
+
+    meta = _write_snapshot(collection, stored_pages(), count, path, stamp, m, ef_construction, dtype)
+    # Readers check a delta's base_snapshot, so one briefly left beside the new snapshot is ignored
+    shutil.rmtree(delta_dir(collection.name, root), ignore_errors=True)
+    logger.info(
+        f"🧭 HNSW snapshot of '{collection.name}': {meta['count']} vector(s) x {meta['dim']} ({dtype}, M={m}) "
+        f"in {time.perf_counter() - started:.1f}s."
+    )
+    return meta
+
+
+def update_snapshot(
+    collection,
+    changed_ids: Iterable[str],
+    since: Optional[dict],
+    root: Optional[str] = None,
+    merge_ratio: Optional[float] = None,
+) -> Optional[dict]:
+    """
+    Bring the snapshot up to date after writes that stored or deleted
+    ``changed_ids`` and took the collection from ``since`` (its
+    collection_stamp before them) to its current version.
+
+    Only the changed vectors are read back from Chroma, into a delta
+    snapshot (``root/<name>.delta/``) searched alongside the main one. Their
+    ids become tombstones, marked deleted in the main graph when it loads.
+    Both accumulate until the next merge. A full export is done instead
+    when the snapshot wasn't at ``since`` (a purge, or writes it never saw),
+    and, as the merge, once the delta covers more than ``merge_ratio``
+    (default HNSW.MERGE_RATIO) of the collection. Skipped (returns None)
+    when the snapshot is already current.
+    """
+    stamp = collection_stamp(collection)
+    main, delta = _built(collection.name, root)
+    indexed = _stamp_of(delta or main)
+    if indexed == stamp:
+        return None
+    if main is None or indexed != since:
+        return export_collection(collection, root)
+
+    if merge_ratio is None:
+        merge_ratio = HNSW_CONFIG["MERGE_RATIO"]
+    tombstones = sorted(set(delta["tombstones"] if delta else ()) | set(changed_ids))
+    if len(tombstones) > merge_ratio * max(main["count"], 1):
+        logger.info(f"🧭 HNSW delta of '{collection.name}' covers {len(tombstones)} vector(s); merging.")
+        return export_collection(collection, root)
+
+    def changed_pages():
+        # Ids deleted since the last merge are simply not found
+        for start in range(0, len(tombstones), _ID_BATCH):
+            yield collection.get(
+                ids=tombstones[start : start + _ID_BATCH], include=["embeddings", "documents", "metadatas"]
+            )
+
+    meta = _write_snapshot(
+        collection,
+        changed_pages(),
+        len(tombstones),
+        delta_dir(collection.name, root),
+        {**stamp, "base_snapshot": main["snapshot_id"], "tombstones": tombstones},
+        main["M"],
+        main["ef_construction"],
+        main["dtype"],
+    )
+    logger.info(
+        f"🧭 HNSW delta of '{collection.name}': {meta['count']} changed vector(s), "
+        f"{len(tombstones) - meta['count']} deleted, over {main['count']} in the snapshot."
+    )
+    return meta
+
+
+class HnswSnapshot:
+    """
+    One exported snapshot, opened read-only.
+
+    Opening maps the vector matrix and the sidecar files and returns in
+    milliseconds; the hnswlib graph is loaded on a background thread.
+    Until it is ready, searches are exact over the mapped matrix, so the
+    store can serve as soon as it is opened.
+
+    ``delta`` is a snapshot of the vectors written since this one was
+    exported, searched along with it; its rows follow on from this one's.
+    ``deleted`` ids (its tombstones) are left out of searches and lookups.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ef_search: Optional[int] = None,
+        preload: bool = True,
+        deleted: Sequence[str] = (),
+        delta: Optional["HnswSnapshot"] = None,
+    ):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.count = self.meta["count"]
+        self.space = self.meta["space"]
+        self.ef_search = ef_search or HNSW_CONFIG["EF_SEARCH"]
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.norms = np.load(os.path.join(path, "norms.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self.id_rows = np.load(os.path.join(path, "id_rows.npy"), mmap_mode="r")
+        with open(os.path.join(path, "records.jsonl"), "rb") as f:
+            self.records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.count else b""
+        self.dead = self.delta = None
+        if deleted and self.count:
+            dead = np.zeros(self.count, dtype=bool)
+            dead[[row for row in self.rows_for(deleted) if row is not None]] = True
+            self.dead = dead
+        self.live = self.count - (int(self.dead.sum()) if self.dead is not None else 0)
+        self.delta = delta
+
+        self.graph = None
+        self._ready = threading.Event()
+        if preload and self.count:
+            threading.Thread(target=self._load_graph, daemon=True).start()
+        elif not self.count:
+            self._ready.set()
+
+    def _load_graph(self):
+        try:
+            started = time.perf_counter()
+            graph = hnswlib.Index(space=self.space, dim=self.meta["dim"])
+            graph.load_index(os.path.join(self.path, "graph.bin"), max_elements=self.count)
+            graph.set_ef(self.ef_search)
+            if self.dead is not None:
+                for row in np.flatnonzero(self.dead):
+                    graph.mark_deleted(int(row))
+            self.graph = graph
+            logger.info(
+                f"🧭 HNSW graph for '{self.meta['collection']}' loaded in "
+                f"{time.perf_counter() - started:.2f}s."
+            )
+        except Exception as e:
+            logger.error(f"❌ Failed to load HNSW graph at {self.path}; searches stay exact: {e}")
+        finally:
+            self._ready.set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the graph is loaded (or failed to load)."""
+        if self.delta is not None and not self.delta.wait_ready(timeout):
+            return False
+        return self._ready.wait(timeout)
+
+    def search(self, queries: np.ndarray, k: int, exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and distances of the ``k`` nearest vectors to each query row."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        rows, distances = self._search(queries, min(k, self.live), exact)
+        if self.delta is not None and self.delta.count:
+            delta_rows, delta_distances = self.delta.search(queries, k, exact)
+            rows = np.concatenate([rows, delta_rows + self.count], axis=1)
+            distances = np.concatenate([distances, delta_distances], axis=1)
+            order = np.argsort(distances, axis=1)[:, :k]
+            rows = np.take_along_axis(rows, order, axis=1)
+            distances = np.take_along_axis(distances, order, axis=1)
+        return rows, distances
+
+    def _search(self, queries: np.ndarray, k: int, exact: bool) -> Tuple[np.ndarray, np.ndarray]:
+        if not k:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+        if self.graph is not None and not exact:
+            rows, distances = self.graph.knn_query(queries, k=k)
+            return rows.astype(np.int64), distances
+        return self._exact(queries, k)
+
+    def _exact(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        q_norms = np.einsum("ij,ij->i", queries, queries)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, self.count, _EXACT_BLOCK):
+            block = np.asarray(self.vectors[start : start + _EXACT_BLOCK], dtype=np.float32)
+            dots = queries @ block.T
+            if self.space == "ip":
+                distances = 1 - dots
+            elif self.space == "cosine":
+                norms = np.sqrt(np.asarray(self.norms[start : start + len(block)]))
+                distances = 1 - dots / np.maximum(np.outer(np.sqrt(q_norms), norms), 1e-12)
+            else:
+                distances = self.norms[start : start + len(block)] - 2 * dots + q_norms[:, None]
+            if self.dead is not None:
+                distances[:, self.dead[start : start + len(block)]] = np.inf
+            rows = np.broadcast_to(np.arange(start, start + len(block)), distances.shape)
+            best = np.concatenate([best, distances.astype(np.float32)], axis=1)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            if best.shape[1] > k:
+                keep = np.argpartition(best, k - 1, axis=1)[:, :k]
+                best = np.take_along_axis(best, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+        order = np.argsort(best, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best, order, axis=1)
+
+    def record(self, row: int) -> dict:
+        if row >= self.count:
+            return self.delta.record(row - self.count)
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(self.records[start : end - 1])
+
+    def document(self, row: int) -> Document:
+        record = self.record(row)
+        return Document(page_content=record["document"], metadata=record["metadata"] or {})
+
+    def rows_for(self, ids: Sequence[str]) -> List[Optional[int]]:
+        """Row of each id, or None for ids not in the snapshot."""
+        delta_rows = self.delta.rows_for(ids) if self.delta is not None else [None] * len(ids)
+        keys = np.array([i.encode("utf-8") for i in ids], dtype=self.ids.dtype)
+        slots = np.searchsorted(self.ids, keys)
+        rows = []
+        for key, slot, delta_row in zip(keys, slots, delta_rows):
+            if delta_row is not None:
+                rows.append(self.count + delta_row)
+                continue
+            found = slot < len(self.ids) and self.ids[slot] == key
+            row = int(self.id_rows[slot]) if found else None
+            rows.append(None if row is None or (self.dead is not None and self.dead[row]) else row)
+        return rows
+
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def open_snapshot(path: str) -> Optional[HnswSnapshot]:
+    """
+    The snapshot at ``path`` with its delta, or None if none was exported.
+    Shared per path, and reopened when an export or update replaces either
+    (a meta.json changes).
+    """
+    stamps = []
+    for directory in (path, f"{path}.delta"):
+        try:
+            stamps.append(os.stat(os.path.join(directory, "meta.json")).st_mtime_ns)
+        except OSError:
+            stamps.append(None)
+    if stamps[0] is None:
+        return None
+    with _snapshots_lock:
+        cached = _snapshots.get(path)
+        if cached is None or cached[0] != stamps:
+            delta = _read_meta(f"{path}.delta")
+            if delta is None or delta.get("base_snapshot") != _read_meta(path).get("snapshot_id"):
+                snapshot = HnswSnapshot(path)
+            else:
+                snapshot = HnswSnapshot(path, deleted=delta["tombstones"], delta=HnswSnapshot(f"{path}.delta"))
+            cached = _snapshots[path] = (stamps, snapshot)
+        return cached[1]
+
+
+def _matches(metadata: dict, where: Optional[dict]) -> bool:
+    if not where:
+        return True
+    for key, value in where.items():
+        if key.startswith("$") or isinstance(value, dict):
+            raise ValueError(f"Unsupported filter {key!r}: the HNSW store only filters on metadata equality.")
+        if metadata.get(key) != value:
+            return False
+    return True
+
+
+class HnswVectorStore(VectorStore):
+    """
+    Read-only LangChain vector store over an HNSW snapshot of a collection
+    (see export_collection). Ingest keeps writing to Chroma; a new export
+    is picked up by the next search. Filters are metadata equality only and
+    are applied to ``HNSW.FILTER_OVERFETCH`` times k candidates.
+
+    Being read-only, it can't be written through LangChain: add_texts and
+    from_texts raise ValueError. Snapshots are built with export_collection.
+    """
+
+    def __init__(self, collection_name: str, embedding_function: Embeddings, root: Optional[str] = None):
+        self.collection_name = collection_name
+        self._embedding_function = embedding_function
+        self.path = snapshot_dir(collection_name, root)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    @property
+    def snapshot(self) -> HnswSnapshot:
+        snapshot = open_snapshot(self.path)
+        if snapshot is None:
+            raise ValueError(
+                f"Collection '{self.collection_name}' has no HNSW snapshot; "
+                f"ingest it or run python -m scripts.migrate_hnsw."
+            )
+        return snapshot
+
+    def version(self) -> Tuple[str, Any]:
+        """(collection id, version) the current snapshot and its delta were built from."""
+        snapshot = self.snapshot
+        meta = (snapshot.delta or snapshot).meta
+        return meta["collection_id"], (meta[COLLECTION_VERSION_KEY], meta["snapshot_id"])
+
+    def check_compatibility(self):
+        """Refuse a query model that doesn't match the vectors (see check_embedding_compatibility)."""
+        meta = self.snapshot.meta
+        stored_model = meta["collection_metadata"].get("embed_model")
+        stored_dim = meta["collection_metadata"].get("embed_dim") or meta["dim"]
+        model_id = getattr(self._embedding_function, "model_id", None)
+        dimension = getattr(self._embedding_function, "dimension", None)
+        if stored_dim and dimension and stored_dim != dimension:
+            raise ValueError(
+                f"Snapshot '{self.collection_name}' holds {stored_dim}-d vectors but "
+                f"{model_id} produces {dimension}-d vectors."
+            )
+        if stored_model and model_id and model_family(stored_model) != model_family(model_id):
+            raise ValueError(
+                f"Snapshot '{self.collection_name}' was embedded with {stored_model}, not {model_id}."
+            )
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs) -> List[str]:
+        raise ValueError("HNSW snapshots are read-only; ingest into Chroma and export again.")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise ValueError("HNSW snapshots are read-only; build one with export_collection.")
+
+    def batch_search_by_vector(
+        self, embeddings: Sequence[List[float]], k: int = 4, filter: Optional[dict] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """(document, distance) lists for many query vectors in one graph call."""
+        snapshot = self.snapshot
+        fetch = k * HNSW_CONFIG["FILTER_OVERFETCH"] if filter else k
+        rows, distances = snapshot.search(np.asarray(embeddings, dtype=np.float32), fetch)
+        results = []
+        for row_ids, row_distances in zip(rows, distances):
+            hits = []
+            for row, distance in zip(row_ids, row_distances):
+                document = snapshot.document(int(row))
+                if _matches(document.metadata, filter):
+                    hits.append((document, float(distance)))
+                    if len(hits) == k:
+                        break
+            results.append(hits)
+        return results
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs
+    ) -> List[Tuple[Document, float]]:
+        return self.batch_search_by_vector([embedding], k=k, filter=filter)[0]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs
+    ) -> List[Tuple[Document, float]]:
+        vector = self._embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_score(vector, k, filter)
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def get_documents(self, ids: Sequence[str]) -> List[Document]:
+        """Stored documents for ``ids``; ids not in the snapshot are skipped."""
+        snapshot = self.snapshot
+        return [snapshot.document(row) for row in snapshot.rows_for(ids) if row is not None]
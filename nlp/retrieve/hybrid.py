@@ -0,0 +1,88 @@
+# - nlp/retrieve/hybrid.py
+
+import logging
+from typing import Dict, List, Sequence
+
+from langchain.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain.schema import BaseRetriever, Document
+from langchain.vectorstores.base import VectorStore
+
+from config.defaults import CONFIG
+from nlp.retrieve import bm25
+from nlp.retrieve.context import SCORE_KEY
+from nlp.retrieve.vectorstores import get_documents
+
+logger = logging.getLogger(__name__)
+
+BM25_CONFIG = CONFIG["BM25"]
+
+
+def fused_scores(rankings: Sequence[Sequence[str]], k: int = 60) -> Dict[str, float]:
+    """
+    Reciprocal-rank fusion scores of ranked id lists: each id scores
+    sum(1 / (k + rank)) over the lists it appears in. Only ranks count, so
+    BM25 and cosine scores never need to be put on one scale.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[str]:
+    """Merge ranked id lists, best fused score (see fused_scores) first."""
+    scores = fused_scores(rankings, k)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def _key(document: Document) -> str:
+    return document.metadata.get("chunk_id") or document.page_content
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense and BM25 retrieval, fused with reciprocal-rank fusion.
+
+    ``dense`` returns the vector side's candidates (its search_kwargs k
+    should be ``candidates``). The lexical side searches the collection's
+    BM25 index (see nlp.retrieve.bm25), which catches exact names, codes and
+    acronyms that embeddings blur. Lexical-only hits are fetched from the
+    vector store by id. Until an ingest has built the index, results are the
+    dense ones. Each result carries its fused score in its metadata under
+    SCORE_KEY, which context packing uses as its relevance.
+    """
+
+    dense: BaseRetriever
+    vectorstore: VectorStore
+    collection_name: str
+    candidates: int = BM25_CONFIG["candidates"]
+    rrf_k: int = BM25_CONFIG["rrf_k"]
+    k: int = BM25_CONFIG["k"]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense = self.dense.get_relevant_documents(
+            query, callbacks=run_manager.get_child()
+        )
+        index = bm25.open_index(self.collection_name)
+        lexical = [chunk_id for chunk_id, _ in index.search(query, self.candidates)] if index else []
+
+        documents = {_key(d): d for d in dense}
+        scores = fused_scores([list(documents), lexical], k=self.rrf_k)
+        ranked = sorted(scores, key=scores.get, reverse=True)[: self.k]
+        missing = [key for key in ranked if key not in documents]
+        if missing:
+            # The index may be older than a delete; ids no longer stored just drop out
+            for document in get_documents(self.vectorstore, missing):
+                documents[_key(document)] = document
+        # Copies: the dense side's documents may be shared with its cache
+        return [
+            Document(
+                page_content=documents[key].page_content,
+                metadata={**documents[key].metadata, SCORE_KEY: scores[key]},
+            )
+            for key in ranked
+            if key in documents
+        ]
@@ -1,15 +1,23 @@
 # - nlp/retrieve/retrieval_chain.py
 
 import logging
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
 
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.callbacks.manager import AsyncCallbackManagerForChainRun, CallbackManagerForChainRun
 from langchain.chains import ConversationalRetrievalChain
+from langchain.chains.combine_documents.stuff import StuffDocumentsChain
 from langchain.memory import (
     ConversationBufferMemory,
     ConversationBufferWindowMemory,
     ConversationSummaryBufferMemory,
 )
+from langchain.pydantic_v1 import PrivateAttr
+from langchain.schema import BaseMessage, Document
 
 from config.defaults import CONFIG
+from nlp.retrieve.context import build_context
 from nlp.llms.cloudflare import CloudflareLLM
 from nlp.retrieve.retriever_setup import get_retriever
 
@@ -41,19 +49,173 @@ def get_memory():
         )
 
 
-def create_retrieval_qa_chain():
-    retriever = get_retriever()
+def format_chat_history(chat_history: List[Any]) -> str:
+    """
+    Chat history as prompt text, one "Human: " / "Assistant: " line per
+    turn. Turns are messages (from memory) or (question, answer) pairs.
+    """
+    lines = []
+    for turn in chat_history:
+        if isinstance(turn, BaseMessage):
+            role = {"human": "Human: ", "ai": "Assistant: "}.get(turn.type, f"{turn.type}: ")
+            lines.append(f"{role}{turn.content}")
+        elif isinstance(turn, (tuple, list)) and len(turn) == 2:
+            lines += [f"Human: {turn[0]}", f"Assistant: {turn[1]}"]
+        else:
+            raise ValueError(f"Unsupported chat history turn: {turn!r}")
+    return "".join(f"\n{line}" for line in lines)
+
+
+class PackedRetrievalChain(ConversationalRetrievalChain):
+    """
+    ConversationalRetrievalChain whose retrieved chunks are packed into the
+    answer model's token budget (see nlp.retrieve.context, with CONTEXT
+    enabled) before they are stuffed into the prompt. The packing stats are
+    returned under "context" (None with CONTEXT disabled).
+
+    A ``chat_history`` input is used while the memory is still empty, so a
+    client can seed a new chat with earlier turns.
+    """
+
+    _packed: Dict[UUID, Any] = PrivateAttr(default_factory=dict)
+
+    @property
+    def output_keys(self) -> List[str]:
+        return super().output_keys + ["context"]
+
+    def prep_inputs(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        seed = inputs.get("chat_history") if isinstance(inputs, dict) else None
+        inputs = super().prep_inputs(inputs)
+        if seed and not inputs.get("chat_history"):
+            inputs["chat_history"] = seed
+        return inputs
+
+    def _call(self, inputs: Dict[str, Any], run_manager: Optional[CallbackManagerForChainRun] = None) -> Dict[str, Any]:
+        try:
+            output = super()._call(inputs, run_manager=run_manager)
+        finally:
+            context = self._packed.pop(run_manager.run_id, None) if run_manager else None
+        return {**output, "context": context}
+
+    async def _acall(
+        self, inputs: Dict[str, Any], run_manager: Optional[AsyncCallbackManagerForChainRun] = None
+    ) -> Dict[str, Any]:
+        try:
+            output = await super()._acall(inputs, run_manager=run_manager)
+        finally:
+            context = self._packed.pop(run_manager.run_id, None) if run_manager else None
+        return {**output, "context": context}
+
+    def _get_docs(
+        self, question: str, inputs: Dict[str, Any], *, run_manager: CallbackManagerForChainRun
+    ) -> List[Document]:
+        documents = self.retriever.get_relevant_documents(question, callbacks=run_manager.get_child())
+        return self._pack(documents, question, inputs, run_manager)
+
+    async def _aget_docs(
+        self, question: str, inputs: Dict[str, Any], *, run_manager: AsyncCallbackManagerForChainRun
+    ) -> List[Document]:
+        documents = await self.retriever.aget_relevant_documents(question, callbacks=run_manager.get_child())
+        return self._pack(documents, question, inputs, run_manager)
+
+    def _pack(self, documents: List[Document], question: str, inputs: Dict[str, Any], run_manager) -> List[Document]:
+        documents = self._within_token_limit(documents)
+        if not CONFIG["CONTEXT"]["enabled"]:
+            return documents
+        llm_chain = self.combine_docs_chain.llm_chain
+        # History only costs prompt tokens if the answer prompt includes it
+        chat_history = ""
+        if "chat_history" in llm_chain.prompt.input_variables:
+            chat_history = (self.get_chat_history or format_chat_history)(inputs["chat_history"])
+        context = build_context(
+            question if self.rephrase_question else inputs["question"],
+            documents,
+            chat_history=chat_history,
+            model_id=getattr(llm_chain.llm, "model_id", None),
+        )
+        self._packed[run_manager.run_id] = {
+            "budget": context.budget,
+            "used_tokens": context.used_tokens,
+            "naive_tokens": context.naive_tokens,
+            "saved_tokens": context.saved_tokens,
+            "duplicates": context.duplicates,
+            "trimmed": context.trimmed,
+            "dropped": context.dropped,
+        }
+        return context.documents
+
+    def _within_token_limit(self, documents: List[Document]) -> List[Document]:
+        """Drop trailing chunks until the rest fit ``max_tokens_limit`` (stuff chains only)."""
+        if not self.max_tokens_limit or not isinstance(self.combine_docs_chain, StuffDocumentsChain):
+            return documents
+        llm = self.combine_docs_chain.llm_chain.llm
+        tokens = [llm.get_num_tokens(document.page_content) for document in documents]
+        kept, total = len(documents), sum(tokens)
+        while kept and total > self.max_tokens_limit:
+            kept -= 1
+            total -= tokens[kept]
+        return documents[:kept]
+
+
+def create_retrieval_qa_chain(namespace=None):
+    """A chain with its own memory over the (shared, cached) retriever of ``namespace``."""
+    retriever = get_retriever(namespace)
     llm = CloudflareLLM()
     memory = get_memory()
 
-    qa_chain = ConversationalRetrievalChain.from_llm(
+    # answer_question reports the chunks and standalone question; CHAIN.return_source_documents only sets logging
+    qa_chain = PackedRetrievalChain.from_llm(
         llm=llm,
         retriever=retriever,
         memory=memory,
-        return_source_documents=CONFIG.get("CHAIN", {}).get(
-            "return_source_documents", False
-        ),
+        get_chat_history=format_chat_history,
+        return_source_documents=True,
+        return_generated_question=True,
     )
 
     logger.info("✅ ConversationalRetrievalChain created successfully.")
     return qa_chain
+
+
+class RetrievalCounter(BaseCallbackHandler):
+    """
+    Count the retrievals made by the calls it is passed to. A retriever
+    that calls another one (e.g. the hybrid retriever's vector side) is
+    one retrieval.
+    """
+
+    def __init__(self):
+        self.retrievals = 0
+        self._runs = set()
+
+    def on_retriever_start(
+        self, serialized: Dict[str, Any], query: str, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs
+    ):
+        if parent_run_id not in self._runs:
+            self.retrievals += 1
+        self._runs.add(run_id)
+
+
+def answer_question(qa_chain, question: str, chat_history: Optional[List[Tuple[str, str]]] = None) -> Dict[str, Any]:
+    """
+    Answer ``question`` with ``qa_chain`` (see PackedRetrievalChain),
+    retrieving exactly once.
+
+    The chain condenses the question against the chat history (its memory,
+    or ``chat_history`` while the memory is empty), retrieves for it, packs
+    the chunks into the model's token budget and answers from them.
+    Returns the answer, the chunks used, the standalone question, how many
+    retrievals ran and the packing stats (None with CONTEXT disabled).
+    Only the original question and the answer are saved to memory.
+    """
+    counter = RetrievalCounter()
+    result = qa_chain.invoke(
+        {"question": question, "chat_history": chat_history or []}, config={"callbacks": [counter]}
+    )
+    return {
+        "answer": result["answer"],
+        "source_documents": result["source_documents"],
+        "generated_question": result["generated_question"],
+        "retrievals": counter.retrievals,
+        "context": result["context"],
+    }
@@ -1,27 +1,86 @@
 # - nlp/retrieve/retriever_setup.py
 
 import logging
-from langchain.vectorstores import Chroma
+import threading
+
 from config.defaults import CONFIG
-from nlp.embed.model import CloudflareEmbeddings
+from nlp.embed.model import get_embedding_function
+from nlp.embed.namespaces import collection_for, default_namespace
+from nlp.retrieve import cache
+from nlp.retrieve.hybrid import HybridRetriever
+from nlp.retrieve.vectorstores import open_vectorstore
 
 # Configs
 provider = CONFIG["DEFAULT_PROVIDER"]
-vectordb = CONFIG["DEFAULT_VECTORDB"]
 
-PERSIST_DIR = CONFIG[vectordb]["PERSIST_DIR"]
-COLLECTION_NAME = CONFIG[vectordb]["COLLECTION_NAME"]
+CACHE_ENABLED = CONFIG["RETRIEVAL_CACHE"]["enabled"]
+BM25_CONFIG = CONFIG["BM25"]
+
+_retrievers = {}  # namespace -> retriever, built once per process
+_embedding_function = None
+_lock = threading.Lock()
+
+
+def get_retriever(namespace=None):
+    """
+    The retriever for ``namespace`` (default CHROMA.DEFAULT_NAMESPACE).
+
+    Built on first use and cached, so every request for a namespace shares
+    one vector store handle (on the DEFAULT_VECTORDB backend, see
+    nlp.retrieve.vectorstores); all namespaces share the embedding function. With RETRIEVAL_CACHE enabled, query vectors and
+    top-k results are cached too (see nlp.retrieve.cache). With BM25
+    enabled, vector hits are fused with the collection's lexical index (see
+    nlp.retrieve.hybrid). Raises ValueError for an invalid namespace, or for
+    one other than the default whose collection doesn't exist yet.
+    """
+    namespace = namespace or default_namespace()
+    with _lock:
+        retriever = _retrievers.get(namespace)
+        if retriever is None:
+            retriever = _retrievers[namespace] = _build_retriever(namespace)
+        return retriever
 
-def get_retriever():
-    logging.info("📂 Loading vector store and initializing retriever...")
 
-    embedding_function = CloudflareEmbeddings()  # Only one provider in beta
+def _build_retriever(namespace):
+    global _embedding_function
+    collection_name = collection_for(namespace)
+    logging.info(
+        f"📂 Loading collection '{collection_name}' for namespace '{namespace}' "
+        f"from {CONFIG['DEFAULT_VECTORDB']}..."
+    )
+
+    if _embedding_function is None:
+        _embedding_function = get_embedding_function()  # DEFAULT_PROVIDER decides
+        if CACHE_ENABLED:
+            _embedding_function = cache.CachedQueryEmbeddings(
+                _embedding_function, cache.query_embeddings
+            )
 
-    vectordb = Chroma(
-        collection_name=COLLECTION_NAME,
-        persist_directory=PERSIST_DIR,
-        embedding_function=embedding_function,
+    # A request must not create collections by naming them
+    vectordb = open_vectorstore(
+        collection_name, _embedding_function, must_exist=namespace != default_namespace()
     )
 
     logging.info("✅ Retriever is ready.")
-    return vectordb.as_retriever()
+    # The vector side of a hybrid search returns more candidates for fusion
+    search_kwargs = {"k": BM25_CONFIG["candidates"]} if BM25_CONFIG["enabled"] else {}
+    if CACHE_ENABLED:
+        retriever = cache.CachedVectorStoreRetriever(
+            vectorstore=vectordb,
+            namespace=namespace,
+            results=cache.results,
+            search_kwargs=search_kwargs,
+        )
+    else:
+        retriever = vectordb.as_retriever(search_kwargs=search_kwargs)
+    if not BM25_CONFIG["enabled"]:
+        return retriever
+    return HybridRetriever(
+        dense=retriever, vectorstore=vectordb, collection_name=collection_name
+    )
+
+
+def clear_retrievers():
+    """Forget cached retrievers, e.g. after a namespace was purged and rebuilt."""
+    with _lock:
+        _retrievers.clear()
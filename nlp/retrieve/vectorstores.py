@@ -0,0 +1,71 @@
+# - nlp/retrieve/vectorstores.py
+
+import logging
+from typing import List, Sequence
+
+from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
+from langchain.vectorstores import Chroma
+from langchain.vectorstores.base import VectorStore
+
+from config.defaults import CONFIG
+from nlp.embed.store import COLLECTION_VERSION_KEY
+from nlp.embed.utils import check_embedding_compatibility, get_client
+from nlp.retrieve.hnsw_store import HnswVectorStore
+
+logger = logging.getLogger(__name__)
+
+# DEFAULT_VECTORDB values retrieval can serve from
+BACKENDS = ("CHROMA", "HNSW")
+
+
+def open_vectorstore(collection_name: str, embedding_function: Embeddings, must_exist: bool = False) -> VectorStore:
+    """
+    The LangChain vector store for ``collection_name`` on the DEFAULT_VECTORDB
+    backend:
+
+    - "CHROMA": the Chroma collection ingest writes to.
+    - "HNSW": a read-only hnswlib snapshot of that collection (see
+      nlp.retrieve.hnsw_store), exported by ingest or scripts.migrate_hnsw.
+
+    Raises ValueError for an unknown backend, a query model that doesn't
+    match the stored vectors, or, with ``must_exist``, a missing collection.
+    """
+    backend = CONFIG["DEFAULT_VECTORDB"]
+    if backend == "HNSW":
+        store = HnswVectorStore(collection_name, embedding_function)
+        store.check_compatibility()  # ValueError too if it was never exported
+        return store
+    if backend != "CHROMA":
+        raise ValueError(f"Unknown DEFAULT_VECTORDB '{backend}'; expected one of {BACKENDS}.")
+
+    client = get_client(CONFIG["CHROMA"]["PERSIST_DIR"])
+    if must_exist:
+        try:
+            client.get_collection(collection_name)
+        except ValueError:
+            raise ValueError(f"Collection '{collection_name}' doesn't exist; ingest it first.")
+    store = Chroma(client=client, collection_name=collection_name, embedding_function=embedding_function)
+    check_embedding_compatibility(store._collection, embedding_function)
+    return store
+
+
+def store_version(vectorstore: VectorStore):
+    """(collection id, version) of the data a store serves; a purge changes the id."""
+    if isinstance(vectorstore, HnswVectorStore):
+        return vectorstore.version()
+    # Re-read: the handle's metadata is as of when it was opened
+    name = vectorstore._collection.name
+    current = get_client(CONFIG["CHROMA"]["PERSIST_DIR"]).get_collection(name)
+    return str(current.id), (current.metadata or {}).get(COLLECTION_VERSION_KEY, 0)
+
+
+def get_documents(vectorstore: VectorStore, ids: Sequence[str]) -> List[Document]:
+    """Stored chunks by id; ids no longer stored are skipped."""
+    if isinstance(vectorstore, HnswVectorStore):
+        return vectorstore.get_documents(ids)
+    found = vectorstore._collection.get(ids=list(ids), include=["documents", "metadatas"])
+    return [
+        Document(page_content=text, metadata=metadata or {})
+        for text, metadata in zip(found["documents"], found["metadatas"])
+    ]
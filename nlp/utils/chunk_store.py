@@ -0,0 +1,276 @@
+# - nlp/utils/chunk_store.py
+
+import json
+import logging
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+from langchain.schema import Document
+
+from nlp.utils.io_jsonl import iter_jsonl
+
+logger = logging.getLogger(__name__)
+
+# The metadata column holds every metadata key as JSON; chunk_id and source
+# are repeated as columns so they can be scanned without parsing it
+SCHEMA = pa.schema(
+    [
+        ("chunk_id", pa.string()),
+        ("source", pa.string()),
+        ("page_content", pa.large_string()),
+        ("metadata", pa.string()),
+        ("embedding", pa.list_(pa.float32())),
+    ]
+)
+
+WRITE_BATCH_ROWS = 2048
+
+# Chunk file name used before the Arrow store; read when no store exists yet
+LEGACY_CHUNK_FILE = "chunked_docs.jsonl"
+
+
+class ChunkStoreWriter:
+    """
+    Append chunks to an Arrow IPC file, one record batch at a time.
+
+    Only the current batch is held in memory. The file is written under a
+    temporary name and moved into place on close, so readers never see a
+    half-written store. Use as a context manager, or call close().
+    """
+
+    def __init__(self, path: str, batch_rows: int = WRITE_BATCH_ROWS):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.written = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._tmp_path = f"{path}.tmp"
+        self._sink = pa.OSFile(self._tmp_path, "wb")
+        self._writer = pa.ipc.new_file(self._sink, SCHEMA)
+        self._rows = {name: [] for name in SCHEMA.names}
+
+    def write(self, chunk: Dict, embedding: Optional[List[float]] = None):
+        """Add a ``{"page_content", "metadata"}`` chunk dict, optionally with its vector."""
+        metadata = chunk.get("metadata", {})
+        self._rows["chunk_id"].append(metadata.get("chunk_id"))
+        self._rows["source"].append(metadata.get("source"))
+        self._rows["page_content"].append(chunk.get("page_content", ""))
+        self._rows["metadata"].append(json.dumps(metadata))
+        self._rows["embedding"].append(
+            embedding if embedding is not None else chunk.get("embedding")
+        )
+        if len(self._rows["chunk_id"]) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        rows = len(self._rows["chunk_id"])
+        if not rows:
+            return
+        self._writer.write_batch(pa.record_batch(self._rows, schema=SCHEMA))
+        self.written += rows
+        self._rows = {name: [] for name in SCHEMA.names}
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+        self._sink.close()
+        self._writer = None
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Discard everything written so far."""
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = None
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ChunkStore:
+    """
+    A memory-mapped Arrow chunk file.
+
+    Opening it reads only the footer; record batches are paged in by the OS
+    as they are touched, so a multi-GB store can be counted, scanned or
+    streamed through with a small resident set.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._source = pa.memory_map(path, "r")
+        self._reader = pa.ipc.open_file(self._source)
+
+    def __len__(self) -> int:
+        return sum(
+            self._reader.get_batch(i).num_rows
+            for i in range(self._reader.num_record_batches)
+        )
+
+    @property
+    def has_embeddings(self) -> bool:
+        for batch in self.batches():
+            if batch.column("embedding").null_count < batch.num_rows:
+                return True
+        return False
+
+    def batches(self) -> Iterator[pa.RecordBatch]:
+        """Zero-copy record batches, in write order."""
+        for i in range(self._reader.num_record_batches):
+            yield self._reader.get_batch(i)
+
+    def table(self, columns: Optional[List[str]] = None) -> pa.Table:
+        """The whole store as a Table backed by the memory map (no copy)."""
+        table = self._reader.read_all()
+        return table.select(columns) if columns else table
+
+    def iter_chunks(self, with_embeddings: bool = False) -> Iterator[Dict]:
+        """Chunk dicts, as the chunker produces them, one batch in Python at a time."""
+        for batch in self.batches():
+            contents = batch.column("page_content").to_pylist()
+            metadatas = batch.column("metadata").to_pylist()
+            embeddings = (
+                batch.column("embedding").to_pylist()
+                if with_embeddings
+                else [None] * len(contents)
+            )
+            for content, metadata, embedding in zip(contents, metadatas, embeddings):
+                chunk = {"page_content": content, "metadata": json.loads(metadata)}
+                if embedding is not None:
+                    chunk["embedding"] = embedding
+                yield chunk
+
+    def iter_documents(self) -> Iterator[Document]:
+        for chunk in self.iter_chunks():
+            yield Document(page_content=chunk["page_content"], metadata=chunk["metadata"])
+
+    def close(self):
+        self._source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _JsonlChunkWriter:
+    """
+    ChunkStoreWriter's interface over the legacy .jsonl format, with the
+    same temporary file and move into place on a clean close.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.written = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+
+    def write(self, chunk: Dict, embedding: Optional[List[float]] = None):
+        if embedding is not None:
+            chunk = {**chunk, "embedding": embedding}
+        self._file.write(json.dumps(chunk) + "\n")
+        self.written += 1
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Discard everything written so far."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def is_jsonl(path: str) -> bool:
+    return str(path).endswith(".jsonl")
+
+
+def open_chunk_writer(path: str):
+    """A chunk writer for ``path``: JSON lines for .jsonl, Arrow IPC otherwise."""
+    return _JsonlChunkWriter(path) if is_jsonl(path) else ChunkStoreWriter(path)
+
+
+def write_chunks(chunks: Iterable[Dict], path: str) -> int:
+    """Write chunk dicts to ``path`` (format by extension); returns the count."""
+    with open_chunk_writer(path) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    logger.info(f"✅ Saved {writer.written} chunks to {path}")
+    return writer.written
+
+
+def readable_chunk_file(path: str) -> str:
+    """
+    ``path``, or the chunked_docs.jsonl beside it when ``path`` doesn't
+    exist yet: chunks saved before the Arrow store became the default.
+    """
+    if os.path.exists(path) or is_jsonl(path):
+        return path
+    legacy = os.path.join(os.path.dirname(path), LEGACY_CHUNK_FILE)
+    if os.path.exists(legacy):
+        logger.info(f"📄 {path} not found; reading chunks from {legacy}.")
+        return legacy
+    return path
+
+
+def iter_chunk_file(path: str) -> Iterator[Dict]:
+    """
+    Stream chunk dicts from a .jsonl file or an Arrow chunk store (see
+    readable_chunk_file for the fallback when the store is missing).
+    """
+    path = readable_chunk_file(path)
+    if is_jsonl(path):
+        yield from iter_jsonl(path)
+        return
+    with ChunkStore(path) as store:
+        yield from store.iter_chunks()
+
+
+def iter_chunk_documents(path: str) -> Iterator[Document]:
+    for chunk in iter_chunk_file(path):
+        yield Document(page_content=chunk["page_content"], metadata=chunk["metadata"])
+
+
+def jsonl_to_chunk_store(jsonl_path: str, store_path: str) -> int:
+    """Convert a chunked_docs.jsonl file, streaming, into an Arrow chunk store."""
+    with ChunkStoreWriter(store_path) as writer:
+        for chunk in iter_jsonl(jsonl_path):
+            writer.write(chunk)
+    logger.info(f"📦 Imported {writer.written} chunks from {jsonl_path} into {store_path}")
+    return writer.written
+
+
+def chunk_store_to_jsonl(store_path: str, jsonl_path: str) -> int:
+    """Export an Arrow chunk store (embeddings included, if stored) as JSON lines."""
+    with ChunkStore(store_path) as store, _JsonlChunkWriter(jsonl_path) as writer:
+        for chunk in store.iter_chunks(with_embeddings=True):
+            writer.write(chunk)
+    logger.info(f"📤 Exported {writer.written} chunks from {store_path} to {jsonl_path}")
+    return writer.written
+
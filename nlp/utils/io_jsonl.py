@@ -37,3 +37,11 @@ def save_to_jsonl(chunked_documents, filename_or_path="test_chunks.jsonl"):
 def load_from_jsonl(filepath):
     with open(filepath, "r") as f:
         return [json.loads(line) for line in f]
+
+
+def iter_jsonl(filepath):
+    """Yield one parsed line at a time instead of loading the whole file."""
+    with open(filepath, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
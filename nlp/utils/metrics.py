@@ -0,0 +1,249 @@
+# - nlp/utils/metrics.py
+
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Observations kept per timing for percentiles; count, total and max stay exact
+RESERVOIR_SIZE = 10_000
+
+
+class Timing:
+    """Durations of one kind (seconds), summarised as count, total and percentiles."""
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = []
+        self._reservoir_size = reservoir_size
+        self._random = random.Random(0)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self._samples) < self._reservoir_size:
+            self._samples.append(seconds)
+        else:
+            # Reservoir sampling keeps percentiles honest on very long runs
+            slot = self._random.randrange(self.count)
+            if slot < self._reservoir_size:
+                self._samples[slot] = seconds
+
+    def percentile(self, fraction: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+    def summary(self) -> Dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "total": round(self.total, 4),
+            "mean": round(self.total / self.count, 6),
+            "p50": round(self.percentile(0.50), 6),
+            "p95": round(self.percentile(0.95), 6),
+            "p99": round(self.percentile(0.99), 6),
+            "max": round(self.max, 6),
+        }
+
+
+class _Timer:
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self._started)
+
+
+class Metrics:
+    """
+    Counters, gauges and timings for one ingestion run.
+
+    Names are dotted by stage (``parse.files``, ``embed.request``,
+    ``store.flush``). Safe to update from the streaming pipeline's threads.
+    Worker processes don't report back: the parent process counts their
+    results (see get_metrics).
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.timings: Dict[str, Timing] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = Timing()
+            timing.add(seconds)
+
+    def timer(self, name: str):
+        """Context manager that observes its block's duration under ``name``."""
+        return _Timer(self, name)
+
+    def get(self, name: str, default=0):
+        with self._lock:
+            return self.counters.get(name, self.gauges.get(name, default))
+
+    def report(self) -> Dict:
+        with self._lock:
+            return {
+                "seconds": round(time.time() - self.started, 3),
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+                "timings": {
+                    name: timing.summary() for name, timing in sorted(self.timings.items())
+                },
+            }
+
+
+class NullMetrics:
+    """Stand-in used while nothing is collecting; every call is a no-op."""
+
+    enabled = False
+    _timer = nullcontext()
+
+    def count(self, name, value=1):
+        pass
+
+    def set(self, name, value):
+        pass
+
+    def observe(self, name, seconds):
+        pass
+
+    def timer(self, name):
+        return self._timer
+
+    def get(self, name, default=0):
+        return default
+
+    def report(self) -> Dict:
+        return {}
+
+
+NULL_METRICS = NullMetrics()
+_current = NULL_METRICS
+
+
+def get_metrics():
+    """The collector in use: a Metrics inside collect_metrics(), else NULL_METRICS."""
+    return _current
+
+
+@contextmanager
+def collect_metrics(metrics: Optional[Metrics] = None):
+    """Record ingestion metrics for the duration of the block."""
+    global _current
+    previous, _current = _current, metrics or Metrics()
+    try:
+        yield _current
+    finally:
+        _current = previous
+
+
+def _reset_in_child():
+    # A forked worker inherits the collector (and possibly a held lock); its
+    # counts would be lost anyway, so it records nothing
+    global _current
+    _current = NULL_METRICS
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_in_child)
+
+
+def _format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class Progress:
+    """
+    A live progress line (files parsed, chunks stored, throughput, ETA),
+    redrawn every ``interval`` seconds from a background thread. It only
+    reads the counters, so the pipeline pays nothing for it.
+    """
+
+    def __init__(self, metrics: Metrics, interval: float = 1.0, stream=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._started = time.monotonic()
+        self._width = 0
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        get = self.metrics.get
+        files, files_total = get("parse.files"), get("files.total")
+        chunks = get("chunk.chunks")
+        done = get("store.stored") + get("embed.skipped") + get("embed.failed")
+        parts = [f"files {files}/{files_total}" if files_total else f"files {files}"]
+        parts.append(f"chunks {chunks}")
+        parts.append(f"stored {get('store.stored')} ({get('store.stored') / elapsed:.0f}/s)")
+
+        eta = None
+        if files_total and files < files_total and files:
+            eta = (files_total - files) * elapsed / files
+        elif chunks > done and done:
+            eta = (chunks - done) * elapsed / done
+        if eta is not None:
+            parts.append(f"ETA {_format_eta(eta)}")
+        return "⏳ " + " · ".join(parts)
+
+    def _draw(self, end=""):
+        line = self.line()
+        if self.stream.isatty():
+            self.stream.write("\r" + line.ljust(self._width) + end)
+            self._width = len(line)
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._draw()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._draw(end="\n")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
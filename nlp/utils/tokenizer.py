@@ -1,12 +1,114 @@
 # - splitters/tokenizer.py
 
 import logging
+import os
+from functools import lru_cache
+from typing import List, Tuple
+
 import tiktoken
 from langchain.schema import Document
 
+from config.defaults import CONFIG
+from nlp.embed.model import model_family
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# tokenizer_encoding value naming the embedding model's own tokenizer.json
+EMBEDDING_TOKENIZER = "embedding"
+# Stand-in when that tokenizer.json hasn't been downloaded
+FALLBACK_ENCODING = "gpt2"
+
+
+class TokenizerJsonEncoding:
+    """
+    A Hugging Face tokenizer.json (e.g. the WordPiece vocabulary of
+    bge-small / MiniLM) behind the parts of tiktoken's Encoding that the
+    chunker and the context builder use. Special tokens are not added.
+    """
+
+    def __init__(self, path: str, name: str = None):
+        from tokenizers import Tokenizer
+
+        self._tokenizer = Tokenizer.from_file(path)
+        self._tokenizer.no_truncation()
+        self._tokenizer.no_padding()
+        self.name = name or path
+
+    def encode_ordinary(self, text: str) -> List[int]:
+        return self._tokenizer.encode(text, add_special_tokens=False).ids
+
+    def encode_with_offsets(self, text: str) -> Tuple[str, List[int], List[int]]:
+        encoded = self._tokenizer.encode(text, add_special_tokens=False)
+        return text, encoded.ids, [start for start, _ in encoded.offsets]
+
+    def decode(self, tokens: List[int]) -> str:
+        return self._tokenizer.decode(tokens)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str) -> tiktoken.Encoding:
+    """The tiktoken encoding ``name``, built once per process."""
+    return tiktoken.get_encoding(name)
+
+
+@lru_cache(maxsize=None)
+def encoding_for_model(model: str) -> tiktoken.Encoding:
+    """The tiktoken encoding a model uses, built once per process."""
+    return tiktoken.encoding_for_model(model)
+
+
+def embedding_tokenizer_path(model_id: str = None) -> str:
+    """Where the embedding model's tokenizer.json lives (the LOCAL provider's model dir)."""
+    if model_id is None:
+        provider = "LOCAL" if CONFIG["DEFAULT_PROVIDER"] == "LOCAL" else "CLOUDFLARE"
+        model_id = CONFIG[provider]["EMBED_MODEL"]
+    return os.path.join(CONFIG["LOCAL"]["MODEL_DIR"], model_family(model_id), "tokenizer.json")
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(name: str):
+    """
+    The encoding for a ``tokenizer_encoding`` value, built once per process:
+    "embedding" (the embedding model's tokenizer.json, or gpt2 until it is
+    downloaded), a path to a tokenizer.json, or a tiktoken encoding name.
+    """
+    if name == EMBEDDING_TOKENIZER:
+        path = embedding_tokenizer_path()
+        if os.path.exists(path):
+            return TokenizerJsonEncoding(path, name)
+        logger.warning(
+            f"⚠️ {path} not found; counting {FALLBACK_ENCODING} tokens as a stand-in "
+            f"for the embedding model's."
+        )
+        return get_encoding(FALLBACK_ENCODING)
+    if name.endswith(".json"):
+        return TokenizerJsonEncoding(name)
+    return get_encoding(name)
+
+
+def resolve_encoding(encoding):
+    """Accept a ``tokenizer_encoding`` value (see get_tokenizer) or an already-built encoding."""
+    if isinstance(encoding, str):
+        return get_tokenizer(encoding)
+    return encoding
+
+
+def encode_with_offsets(encoding, text: str) -> Tuple[str, List[int], List[int]]:
+    """
+    ``(text, token ids, offset in text where each token starts)``. For
+    tiktoken the text is the decoded tokens, which equals the input unless
+    it held invalid UTF-8.
+    """
+    if hasattr(encoding, "encode_with_offsets"):
+        return encoding.encode_with_offsets(text)
+    tokens = encoding.encode_ordinary(text)
+    if not tokens:
+        return text, tokens, []
+    decoded, offsets = encoding.decode_with_offsets(tokens)
+    return decoded, tokens, offsets
+
+
 def count_tokens(doc: Document, model: str = "gpt-3.5-turbo") -> int:
     """
     Counts the number of tokens in the input document using tiktoken.
@@ -19,7 +121,7 @@ def count_tokens(doc: Document, model: str = "gpt-3.5-turbo") -> int:
         int: The number of tokens in the document content.
     """
     try:
-        encoding = tiktoken.encoding_for_model(model)
+        encoding = encoding_for_model(model)
         tokens = encoding.encode(doc.page_content)
         token_count = len(tokens)
         logger.info(
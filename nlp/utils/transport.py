@@ -0,0 +1,230 @@
+# - nlp/utils/transport.py
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.defaults import CONFIG
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Statuses that blame the request body rather than the service's load
+PAYLOAD_ERROR_STATUSES = (400, 413)
+
+
+class PostRetry(Retry):
+    """
+    The retries that are safe for a POST at the transport level: connection
+    errors (nothing was sent) and 429s carrying Retry-After (nothing was
+    done). A 5xx or a dropped read may come after the gateway ran a paid
+    generation, so those go back to the caller, which decides whether to
+    try again (the embedders have their own backoff loop).
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        return status_code == 429 and has_retry_after and super().is_retry(method, status_code, has_retry_after)
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Return the process-wide pooled session, creating it on first use.
+
+    The session only carries the connection pool (no cookies or auth state),
+    so sharing it across FastAPI's threadpool is safe: urllib3's pool hands
+    each thread its own connection and blocks when all of them are busy.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def close_session():
+    """Close the shared session and its pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _reset_after_fork():
+    # Pooled sockets must not be shared between a parent and a forked worker
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _build_session() -> requests.Session:
+    http_cfg = CONFIG["HTTP"]
+    retry = PostRetry(
+        total=http_cfg["max_retries"],
+        read=False,  # the request may have been processed; never resend it
+        other=0,
+        backoff_factor=http_cfg["backoff_factor"],
+        status_forcelist=(429,),
+        allowed_methods=frozenset({"POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=http_cfg["pool_connections"],
+        pool_maxsize=http_cfg["pool_maxsize"],
+        pool_block=True,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    logger.info(
+        f"🔌 HTTP transport ready (pool {http_cfg['pool_maxsize']} per host, "
+        f"timeouts {http_cfg['connect_timeout']}s/{http_cfg['read_timeout']}s)."
+    )
+    return session
+
+
+def default_timeout():
+    """(connect, read) timeout tuple from CONFIG["HTTP"]."""
+    http_cfg = CONFIG["HTTP"]
+    return (http_cfg["connect_timeout"], http_cfg["read_timeout"])
+
+
+def _encode_json(payload: dict, token: Optional[str] = None):
+    """Build (body, headers) for a JSON POST, gzipping large bodies if enabled."""
+    http_cfg = CONFIG["HTTP"]
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    body = json.dumps(payload).encode("utf-8")
+    if http_cfg["gzip_requests"] and len(body) >= http_cfg["gzip_min_bytes"]:
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+def post_json(
+    url: str,
+    payload: dict,
+    token: Optional[str] = None,
+    timeout=None,
+) -> requests.Response:
+    """
+    POST a JSON payload over the shared session.
+
+    Bodies above ``gzip_min_bytes`` are gzip-compressed when ``gzip_requests``
+    is enabled. The response is returned as-is; callers decide how to treat
+    error statuses (usually ``response.raise_for_status()``).
+    """
+    body, headers = _encode_json(payload, token)
+    return get_session().post(
+        url, data=body, headers=headers, timeout=timeout or default_timeout()
+    )
+
+
+# ----- Async transport (asyncio callers such as aembed_documents) -----
+
+
+def async_session(limit: int) -> aiohttp.ClientSession:
+    """
+    Create a keep-alive aiohttp session holding at most ``limit`` connections.
+
+    aiohttp sessions are bound to the event loop that uses them, so unlike the
+    sync session this is not a process-wide singleton; open one per run.
+    """
+    http_cfg = CONFIG["HTTP"]
+    timeout = aiohttp.ClientTimeout(
+        sock_connect=http_cfg["connect_timeout"], sock_read=http_cfg["read_timeout"]
+    )
+    connector = aiohttp.TCPConnector(limit=limit)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        headers={"Accept-Encoding": "gzip, deflate"},
+    )
+
+
+async def async_post_json(
+    session: aiohttp.ClientSession,
+    url: str,
+    payload: dict,
+    token: Optional[str] = None,
+):
+    """POST a JSON payload; returns (status, headers, parsed body or None)."""
+    body, headers = _encode_json(payload, token)
+    async with session.post(url, data=body, headers=headers) as response:
+        try:
+            data = await response.json(content_type=None)
+        except ValueError:
+            data = None
+        return response.status, response.headers, data
+
+
+def is_retryable_status(status: Optional[int]) -> bool:
+    """429 and 5xx are worth retrying; ``None`` stands for a connection error."""
+    return status is None or status == 429 or status >= 500
+
+
+def is_payload_error(status: Optional[int]) -> bool:
+    """400 and 413 reject the request body itself; a smaller one may pass."""
+    return status in PAYLOAD_ERROR_STATUSES
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after=None) -> float:
+    """Full-jitter exponential backoff, deferring to a Retry-After header."""
+    if retry_after is not None:
+        try:
+            return min(cap, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class AsyncRateLimiter:
+    """Token bucket capping request starts at ``rate`` per second (0 = unlimited)."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = max(1.0, rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                capacity = max(1.0, self.rate)
+                self._tokens = min(
+                    capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
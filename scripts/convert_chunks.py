@@ -0,0 +1,29 @@
+# scripts/convert_chunks.py
+"""
+Convert chunk files between the legacy JSON lines format and Arrow chunk stores.
+
+    python -m scripts.convert_chunks outputs/chunked_docs.jsonl outputs/chunks.arrow
+    python -m scripts.convert_chunks outputs/chunks.arrow outputs/chunked_docs.jsonl
+"""
+
+import argparse
+import logging
+
+from nlp.utils.chunk_store import chunk_store_to_jsonl, is_jsonl, jsonl_to_chunk_store
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s"
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="A .jsonl chunk file or an Arrow chunk store.")
+    parser.add_argument("target", help="Output path; .jsonl exports, anything else imports.")
+    args = parser.parse_args()
+
+    if is_jsonl(args.source) == is_jsonl(args.target):
+        parser.error("Convert from .jsonl to an Arrow store, or the other way round.")
+    if is_jsonl(args.target):
+        chunk_store_to_jsonl(args.source, args.target)
+    else:
+        jsonl_to_chunk_store(args.source, args.target)
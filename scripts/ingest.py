@@ -1,15 +1,29 @@
 # scripts/ingest.py
 
+import json
 import logging
 import os
+import time
+from contextlib import nullcontext
 from pathlib import Path
 
 from config.defaults import CONFIG
-from input.get_files import load_documents_from_cli
+from input.get_files import get_files, load_documents
+from input.manifest import IngestManifest
+from input.watcher import DirectoryWatcher
 from nlp.chunk.chunker import chunker
-from nlp.embed.utils import embed_and_store
+from nlp.chunk.dedup import dedup_chunks
+from nlp.embed.model import get_embedding_function
+from nlp.embed.namespaces import collection_for, default_namespace
+from nlp.embed.runs import RunLog
+from nlp.embed.store import collection_stamp
+from nlp.embed.utils import delete_sources, embed_and_store, get_client
+from nlp.retrieve.bm25 import build_collection_index, update_collection_index
+from nlp.retrieve.hnsw_store import export_collection, update_snapshot
+from nlp.utils.chunk_store import iter_chunk_documents, write_chunks
 from nlp.utils.converter import dicts_to_documents
-from nlp.utils.io_jsonl import load_from_jsonl, save_to_jsonl
+from nlp.utils.metrics import Progress, collect_metrics, get_metrics
+from scripts.streaming import StreamingPipeline
 
 # no spies
 os.environ["CHROMA_TELEMETRY_ENABLED"] = "false"
@@ -22,8 +36,48 @@ logging.basicConfig(
 
 # Config
 CHUNK_FILE = CONFIG["GENERAL"]["CHUNK_FILE"]
-CHUNK_SIZE = CONFIG["GENERAL"]["CHUNK_SIZE"]
-CHUNK_OVERLAP = CONFIG["GENERAL"]["CHUNK_OVERLAP"]
+DEDUP_ENABLED = CONFIG["DEDUP"]["enabled"]
+MANIFEST_DIR = CONFIG["CHROMA"]["MANIFEST_DIR"]
+REPORT_DIR = CONFIG["METRICS"]["report_dir"]
+PROGRESS_INTERVAL = CONFIG["METRICS"]["progress_interval"]
+
+
+def stored_stamp(collection):
+    """collection_stamp of the stored ``collection``, or None if it doesn't exist yet."""
+    try:
+        return collection_stamp(get_client(CONFIG["CHROMA"]["PERSIST_DIR"]).get_collection(collection))
+    except ValueError:
+        return None
+
+
+def update_indexes(collection, changed=None, since=None):
+    """
+    Bring what retrieval reads besides Chroma up to date, if the run changed
+    the collection: its BM25 index and, when serving from HNSW, its snapshot.
+
+    ``changed`` holds the chunk ids the run stored or deleted and ``since``
+    the collection's stored_stamp before it; with them, only those chunks
+    are indexed, as deltas (see nlp.retrieve.bm25.update_collection_index
+    and nlp.retrieve.hnsw_store.update_snapshot). Without, both are rebuilt
+    from the whole collection.
+    """
+    try:
+        stored = get_client(CONFIG["CHROMA"]["PERSIST_DIR"]).get_collection(collection)
+    except ValueError:
+        return  # nothing stored yet
+    metrics = get_metrics()
+    if CONFIG["BM25"]["enabled"]:
+        with metrics.timer("bm25.stage"):
+            if changed is None:
+                build_collection_index(stored)
+            else:
+                update_collection_index(stored, changed, since)
+    if CONFIG["DEFAULT_VECTORDB"] == "HNSW":
+        with metrics.timer("hnsw.stage"):
+            if changed is None:
+                export_collection(stored)
+            else:
+                update_snapshot(stored, changed, since)
 
 
 def chunk_documents(documents):
@@ -31,19 +85,30 @@ def chunk_documents(documents):
         logger.warning("⚠️ No documents provided for chunking.")
         return []
     logger.info("✂️ Chunking documents...")
-    chunks = chunker(documents, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+    with get_metrics().timer("chunk.stage"):
+        chunks = chunker(documents)
     logger.info(f"✅ Chunked into {len(chunks)} chunk(s).")
     return chunks
 
 
-def save_chunks_to_file(chunks):
+def dedup_chunk_list(chunks):
+    if not chunks:
+        return []
+    logger.info("🧹 Removing duplicate chunks...")
+    metrics = get_metrics()
+    with metrics.timer("dedup.stage"):
+        kept = dedup_chunks(chunks)
+    metrics.count("dedup.removed", len(chunks) - len(kept))
+    return kept
+
+
+def save_chunks_to_file(chunks, chunk_file=CHUNK_FILE):
     if not chunks:
         logger.warning("⚠️ No chunks to save.")
         return
     try:
         logger.info("💾 Saving chunks to file...")
-        save_to_jsonl(chunks, CHUNK_FILE)
-        logger.info(f"✅ Saved chunks to {CHUNK_FILE}.")
+        write_chunks(chunks, chunk_file)
     except Exception as e:
         logger.error(f"Failed to save chunks: {e}")
 
@@ -58,48 +123,490 @@ def convert_chunks_to_documents(chunks):
     return documents
 
 
+def open_manifest(collection: str) -> IngestManifest:
+    return IngestManifest(os.path.join(MANIFEST_DIR, f"{collection}.json"))
+
+
+def plan_ingest(
+    source_path: Path,
+    full: bool = False,
+    purge: bool = False,
+    collection: str = None,
+    on_delete=None,
+    paths=None,
+):
+    """
+    Compare the source directory with the manifest of ``collection``
+    (default: the default namespace's). Given ``paths``, only those are
+    compared (e.g. what a DirectoryWatcher saw change) and the directory
+    isn't listed; see IngestManifest.plan.
+
+    Returns the manifest and the list of files to (re)ingest. Vectors of
+    changed and removed files are deleted here (``on_delete`` is handed
+    their ids, see delete_sources); with ``purge`` the whole collection is
+    rebuilt later, so the manifest simply starts over.
+    """
+    collection = collection or collection_for()
+    manifest = open_manifest(collection)
+    if purge:
+        manifest.clear()
+    if paths is None:
+        files = get_files(source_path)
+        logger.info(f"📂 Found {len(files)} supported file(s).")
+        plan = manifest.plan(files)
+    else:
+        plan = manifest.plan([Path(path) for path in paths], complete=False)
+    if full:
+        plan.changed += plan.unchanged
+        plan.unchanged = []
+    plan.log()
+
+    if not purge:
+        # New files too: their vectors may predate the manifest (random chunk ids)
+        stale = plan.stale_sources + [str(path) for path in plan.new]
+        orphaned = (
+            delete_sources(stale, collection_name=collection, on_delete=on_delete)
+            if stale
+            else set()
+        )
+        # Files whose chunks only survived as duplicates of deleted ones
+        planned = {str(path) for path in plan.to_ingest}
+        reingest = [
+            Path(source)
+            for source in sorted(orphaned)
+            if source in manifest.files and source not in planned and Path(source).exists()
+        ]
+        if reingest:
+            logger.info(f"♻️ Re-ingesting {len(reingest)} file(s) that shared deleted chunks.")
+            plan.changed += reingest
+            plan.unchanged = [path for path in plan.unchanged if str(path) not in orphaned]
+    for source in plan.removed:
+        manifest.forget(source)
+    return manifest, plan.to_ingest
+
+
+def write_run_report(path, record, metrics):
+    """
+    Write a run's status record (see RunLog) and its metrics as JSON, with
+    throughput worked out over the whole run. Returns the path.
+    """
+    report = metrics.report()
+    seconds = report["seconds"] or None
+    counters = report["counters"]
+    report["throughput"] = {
+        name: round(counters.get(counter, 0) / seconds, 2) if seconds else None
+        for name, counter in (
+            ("files_per_sec", "parse.files"),
+            ("bytes_per_sec", "parse.bytes"),
+            ("chunks_per_sec", "chunk.chunks"),
+            ("stored_per_sec", "store.stored"),
+        )
+    }
+    if record is not None:
+        record = {**record, "options": json.loads(record["options"])}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"run": record, **report}, f, indent=2)
+    logger.info(f"📊 Run report written to {path}")
+    return path
+
+
+def finish_manifest(manifest, files, parse_summary):
+    """Record files whose vectors are now stored; failed ones are retried next run."""
+    failed = {path for path, _ in parse_summary.failed} | set(parse_summary.timed_out)
+    for path in files:
+        if str(path) not in failed:
+            manifest.record(path)
+    manifest.save()
+
+
 def run_pipeline(
-    source_path: Path, from_disk: bool = False, purge_vectorstore: bool = False
+    source_path: Path,
+    from_disk: bool = False,
+    purge_vectorstore: bool = False,
+    concurrency: int = 1,
+    dedup: bool = DEDUP_ENABLED,
+    workers: int = None,
+    full: bool = False,
+    chunk_file: str = CHUNK_FILE,
+    stream: bool = False,
+    resume: str = None,
+    report: str = None,
+    progress: bool = False,
+    embedding_function=None,
+    namespace: str = None,
+    paths=None,
+    runs: RunLog = None,
+):
+    """
+    Ingest ``source_path`` (or the saved chunk file, with ``from_disk``) into
+    the collection of ``namespace`` (see nlp.embed.namespaces; default
+    CHROMA.DEFAULT_NAMESPACE). Other namespaces' collections are untouched.
+
+    Every run is checkpointed in the run log (CHROMA.RUNS_DB): the files it
+    covers, each chunk id once Chroma has stored it, and a final status with
+    counts, duration and error. ``resume`` takes the id of an unfinished run
+    and repeats it with its recorded options and files. Stale vectors aren't
+    deleted again, the collection is only purged if nothing was stored yet,
+    and chunks already stored are not re-embedded. Chunk ids are
+    deterministic, so re-chunking the same files reproduces them.
+
+    ``report`` writes the run's metrics (counts, per-stage timings, embed
+    and store latency, retries, failures) as JSON to that path, or to
+    METRICS.report_dir/<run id>.json when it is "". ``progress`` shows a
+    live progress line. Without either, nothing is recorded.
+    ``paths`` limits the run to those files (see plan_ingest).
+    ``embedding_function`` and ``runs`` reuse a warm embedder and run log
+    (see watch_and_ingest).
+    """
+    owned = runs is None
+    runs = runs or RunLog()
+    if resume:
+        run = runs.resume(resume)
+        options = run.options
+        source_path = Path(options["source_path"])
+        from_disk = options["from_disk"]
+        purge_vectorstore = options["purge"]
+        dedup = options["dedup"]
+        chunk_file = options["chunk_file"]
+        stream = options["stream"]
+        namespace = options.get("namespace")
+    namespace = namespace or default_namespace()
+    collection = collection_for(namespace)
+    if not resume:
+        run = runs.start(
+            collection,
+            {
+                "namespace": namespace,
+                "source_path": str(source_path),
+                "from_disk": from_disk,
+                "purge": purge_vectorstore,
+                "dedup": dedup,
+                "full": full,
+                "chunk_file": chunk_file,
+                "stream": stream,
+            },
+        )
+
+    recording = report is not None or progress
+    with collect_metrics() if recording else nullcontext(get_metrics()) as metrics:
+        try:
+            since = stored_stamp(collection)
+            deleted = set()
+            with Progress(metrics, PROGRESS_INTERVAL) if progress else nullcontext():
+                _ingest(
+                    run,
+                    collection,
+                    source_path,
+                    from_disk=from_disk,
+                    purge=purge_vectorstore,
+                    concurrency=concurrency,
+                    dedup=dedup,
+                    workers=workers,
+                    full=full,
+                    chunk_file=chunk_file,
+                    stream=stream,
+                    embedding_function=embedding_function,
+                    deleted=deleted,
+                    paths=paths,
+                )
+            update_indexes(collection, deleted | run.stored_ids(), since)
+        except BaseException as e:
+            run.finish("failed", error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            if report is not None:
+                path = report or os.path.join(REPORT_DIR, f"{run.run_id}.json")
+                write_run_report(path, runs.get(run.run_id), metrics)
+            if owned:
+                runs.close()
+    return run.run_id
+
+
+def _ingest(
+    run,
+    collection,
+    source_path,
+    from_disk,
+    purge,
+    concurrency,
+    dedup,
+    workers,
+    full,
+    chunk_file,
+    stream,
+    embedding_function=None,
+    deleted=None,
+    paths=None,
 ):
-    logger.info("🚀 Starting the ingestion pipeline...")
+    logger.info(f"🚀 Starting the ingestion pipeline into '{collection}'...")
+    metrics = get_metrics()
+    # A resumed run that already stored something has been purged before
+    purge_now = purge and not (run.resumed and run.completed_count())
 
     # Step 1: Load chunks
     if from_disk:
-        logger.info(f"📥 Loading chunks from {CHUNK_FILE}...")
-        chunks = load_from_jsonl(CHUNK_FILE)
+        # Streamed straight into the embedder; the file is never loaded whole
+        logger.info(f"📥 Streaming chunks from {chunk_file}...")
+        with metrics.timer("embed.stage"):
+            counts = embed_and_store(
+                iter_chunk_documents(chunk_file),
+                collection_name=collection,
+                purge=purge_now,
+                concurrency=concurrency,
+                checkpoint=run,
+                embedding_function=embedding_function,
+            )
+        run.update(counts["chunks"], counts["skipped"], counts["failed"])
+        run.finish()
+        logger.info("✅ Ingestion pipeline completed.")
+        return
+
+    if run.resumed:
+        manifest = open_manifest(collection)
+        if purge:
+            manifest.clear()
+        files = [Path(path) for path in run.files]
     else:
-        documents = load_documents_from_cli(source_path)
-        chunks = chunk_documents(documents)
-        save_chunks_to_file(chunks)
+        manifest, files = plan_ingest(
+            source_path,
+            full=full,
+            purge=purge,
+            collection=collection,
+            on_delete=deleted.update if deleted is not None else None,
+            paths=paths,
+        )
+        run.record_files(files)
+    metrics.set("files.total", len(files))
+    if not files and not purge:
+        manifest.save()
+        run.finish()
+        logger.info("✅ Nothing new or changed; the vectorstore is up to date.")
+        return
+
+    if stream:
+        pipeline = StreamingPipeline(
+            source_path,
+            files=files,
+            collection_name=collection,
+            purge=purge_now,
+            concurrency=concurrency,
+            dedup=dedup,
+            workers=workers,
+            chunk_file=chunk_file,
+            checkpoint=run,
+            embedding_function=embedding_function,
+        )
+        with metrics.timer("stream.stage"):
+            pipeline.run()
+        finish_manifest(manifest, files, pipeline.parse_summary)
+        run.update(pipeline.chunks, pipeline.skipped, pipeline.failed)
+        run.finish()
+        return
+
+    with metrics.timer("parse.stage"):
+        documents, parse_summary = load_documents(files, workers=workers)
+    chunks = chunk_documents(documents)
+    if dedup:
+        chunks = dedup_chunk_list(chunks)
+    save_chunks_to_file(chunks, chunk_file)
 
     # Step 2: Convert and embed
     documents = convert_chunks_to_documents(chunks)
-    embed_and_store(documents, purge=purge_vectorstore)
+    with metrics.timer("embed.stage"):
+        counts = embed_and_store(
+            documents,
+            collection_name=collection,
+            purge=purge_now,
+            concurrency=concurrency,
+            checkpoint=run,
+            embedding_function=embedding_function,
+        )
+    finish_manifest(manifest, files, parse_summary)
+    run.update(counts["chunks"], counts["skipped"], counts["failed"])
+    run.finish()
 
     logger.info("✅ Ingestion pipeline completed.")
 
 
+def watch_and_ingest(source_path: Path, stop=None, watcher=None, purge_vectorstore=False, **options):
+    """
+    Ingest ``source_path``, then keep ingesting whatever changes in it.
+
+    One embedder, run log and Chroma client stay warm for the whole
+    session, so an update costs only its own files: each debounced batch of
+    changes (see input.watcher.DirectoryWatcher) runs run_pipeline on just
+    the changed paths, with no rescan of the directory. It ingests new and
+    changed files, deletes the vectors of changed and removed ones, and
+    adds only those chunks to the BM25 index and HNSW snapshot deltas. A
+    failed update is logged and left resumable, and the watch goes on;
+    since its files may not change again, the next update rescans the
+    directory. ``options`` are passed to run_pipeline. Returns when
+    ``stop`` (a threading.Event) is set.
+    """
+    embedding_function = get_embedding_function(concurrency=options.get("concurrency", 1))
+    watcher = watcher or DirectoryWatcher(source_path)
+    runs = RunLog()
+
+    def ingest(purge=False, paths=None):
+        try:
+            run_pipeline(
+                source_path,
+                purge_vectorstore=purge,
+                embedding_function=embedding_function,
+                paths=paths,
+                runs=runs,
+                **options,
+            )
+            return True
+        except Exception as e:
+            logger.error(f"❌ Update failed, still watching: {e}")
+            return False
+
+    # Catch up on whatever changed while nobody was watching
+    caught_up = ingest(purge=purge_vectorstore)
+    logger.info(f"👀 Watching {source_path} for changes (Ctrl+C to stop)...")
+    try:
+        while (changed := watcher.wait(stop)) is not None:
+            logger.info(f"🔔 {len(changed)} file(s) changed; updating the vectorstore.")
+            started = time.monotonic()
+            caught_up = ingest(paths=changed if caught_up else None)
+            if caught_up:
+                logger.info(f"✅ Update applied in {time.monotonic() - started:.1f}s.")
+    finally:
+        runs.close()
+
+
 if __name__ == "__main__":
     import argparse
 
     # Argument parsing
     parser = argparse.ArgumentParser(description="Ingest and process documents.")
-    parser.add_argument("source_path", type=str, help="Path to source documents.")
+    parser.add_argument(
+        "source_path", type=str, nargs="?", help="Path to source documents."
+    )
     parser.add_argument(
         "--from-disk",
         action="store_true",
-        help="Load chunks from existing .jsonl file.",
+        help="Embed the chunks already saved in the chunk file.",
+    )
+    parser.add_argument(
+        "--chunk-file",
+        default=CHUNK_FILE,
+        help="Chunk file to write, or read with --from-disk (.jsonl or Arrow).",
     )
     parser.add_argument("--debug", action="store_true", help="Enable debug logging.")
     parser.add_argument(
         "--purge", action="store_true", help="Flush VectorDB - for new docs."
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Embedding requests in flight at once (>1 uses the async engine).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Parser processes (0 = one per CPU; default from config).",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-ingest every file, not only new or changed ones.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Run discovery, parsing, chunking, embedding and storing concurrently.",
+    )
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Keep duplicate chunks (skip the dedup stage).",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Finish an interrupted run with its original options, skipping stored chunks.",
+    )
+    parser.add_argument(
+        "--runs", action="store_true", help="List recent ingestion runs and exit."
+    )
+    parser.add_argument(
+        "--report",
+        nargs="?",
+        const="",
+        metavar="PATH",
+        help=f"Write a JSON run report with per-stage metrics (default {REPORT_DIR}/<run id>.json).",
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Show a live progress line with throughput and ETA.",
+    )
+    parser.add_argument(
+        "--namespace",
+        help="Document set to ingest into; each has its own collection (default from config).",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and ingest files as they are added, changed or removed.",
+    )
     args = parser.parse_args()
 
     if args.debug:
         logging.getLogger().setLevel(logging.DEBUG)
 
+    if args.runs:
+        for record in RunLog().recent():
+            print(
+                f"{record['run_id']}  {record['collection']:<20}  {record['status']:<9}  "
+                f"{record['stored']:>7} stored  "
+                f"{record['failed']:>5} failed  {record['duration'] or 0:>8.1f}s  "
+                f"{record['error'] or ''}"
+            )
+        raise SystemExit(0)
+    if not args.resume and not args.source_path:
+        parser.error("source_path is required unless --resume or --runs is given.")
+    if args.stream and args.from_disk:
+        parser.error("--stream reads the source directory; drop --from-disk.")
+    if args.watch and (args.from_disk or args.resume or args.full):
+        parser.error("--watch ingests changes as they happen; drop --from-disk, --resume and --full.")
+
+    if args.watch:
+        try:
+            watch_and_ingest(
+                Path(args.source_path),
+                purge_vectorstore=args.purge,
+                concurrency=args.concurrency,
+                dedup=DEDUP_ENABLED and not args.no_dedup,
+                workers=args.workers,
+                chunk_file=args.chunk_file,
+                stream=args.stream,
+                report=args.report,
+                progress=args.progress,
+                namespace=args.namespace,
+            )
+        except KeyboardInterrupt:
+            logger.info("👋 Stopped watching.")
+        raise SystemExit(0)
+
     # Run the pipeline with --purge logic added
     run_pipeline(
-        Path(args.source_path), from_disk=args.from_disk, purge_vectorstore=args.purge
+        Path(args.source_path or "."),
+        from_disk=args.from_disk,
+        purge_vectorstore=args.purge,
+        concurrency=args.concurrency,
+        dedup=DEDUP_ENABLED and not args.no_dedup,
+        workers=args.workers,
+        full=args.full,
+        chunk_file=args.chunk_file,
+        stream=args.stream,
+        resume=args.resume,
+        report=args.report,
+        progress=args.progress,
+        namespace=args.namespace,
     )
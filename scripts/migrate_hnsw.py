@@ -0,0 +1,69 @@
+# scripts/migrate_hnsw.py
+"""
+Build HNSW snapshots of existing Chroma collections, for DEFAULT_VECTORDB = "HNSW".
+
+    python -m scripts.migrate_hnsw                       # the default namespace
+    python -m scripts.migrate_hnsw --namespace handbook --M 32 --dtype float32
+    python -m scripts.migrate_hnsw --all
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from config.defaults import CONFIG
+from nlp.embed.namespaces import collection_for
+from nlp.embed.utils import get_client
+from nlp.retrieve.hnsw_store import HnswSnapshot, export_collection, snapshot_dir
+
+# no spies
+os.environ["CHROMA_TELEMETRY_ENABLED"] = "false"
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+HNSW_CONFIG = CONFIG["HNSW"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--namespace", action="append", help="Namespace to export (repeatable; default: the default namespace)."
+    )
+    parser.add_argument("--all", action="store_true", help="Export every collection in the store.")
+    parser.add_argument("--M", type=int, default=HNSW_CONFIG["M"], help="Graph degree.")
+    parser.add_argument(
+        "--ef-construction", type=int, default=HNSW_CONFIG["EF_CONSTRUCTION"], help="Build-time beam width."
+    )
+    parser.add_argument(
+        "--dtype", choices=("float16", "float32"), default=HNSW_CONFIG["DTYPE"], help="Stored vector type."
+    )
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the snapshot is current.")
+    args = parser.parse_args()
+
+    client = get_client(CONFIG["CHROMA"]["PERSIST_DIR"])
+    if args.all:
+        names = [c.name for c in client.list_collections()]
+    else:
+        names = [collection_for(namespace) for namespace in args.namespace or [None]]
+
+    for name in names:
+        try:
+            collection = client.get_collection(name)
+        except ValueError:
+            parser.error(f"Collection '{name}' doesn't exist; ingest it first.")
+        meta = export_collection(
+            collection, m=args.M, ef_construction=args.ef_construction, dtype=args.dtype, force=args.force
+        )
+        if meta is None:
+            logger.info(f"✅ Snapshot of '{name}' is already current (use --force to rebuild).")
+            continue
+        started = time.perf_counter()
+        snapshot = HnswSnapshot(snapshot_dir(name), preload=False)
+        logger.info(
+            f"✅ '{name}' is ready to serve from {snapshot.path} "
+            f"(opens in {(time.perf_counter() - started) * 1000:.1f} ms)."
+        )
@@ -9,12 +9,13 @@ from pathlib import Path
 from typing import List
 
 import chromadb
-import tiktoken
 from bs4 import BeautifulSoup
 from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from nlp.utils.tokenizer import get_encoding
+
 # Logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,6 +27,7 @@ CHUNKS_FILE = "outputs/chunked_docs.jsonl"
 PERSIST_DIR = "persist/db/chroma"
 EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 COLLECTION_NAME = "document_collection"
+EMBED_BATCH_SIZE = 64
 
 
 def get_files(source_path: Path) -> List[Path]:
@@ -92,7 +94,7 @@ def chunker(documents, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
 
 
 def compute_token_length(text):
-    encoding = tiktoken.get_encoding("cl100k_base")
+    encoding = get_encoding("cl100k_base")
     tokens = encoding.encode(text)
     return len(tokens)
 
@@ -127,17 +129,17 @@ def embed_and_store(
             logger.info(f"🗑️ Deleting unused collection: {c.name}")
             client.delete_collection(c.name)
 
-    for document in documents:
-        content = document.page_content.strip()
-        if len(content) < 50:
-            continue
-        doc_id = str(uuid.uuid4())
-        embedding = embedding_function.embed_documents([content])[0]
+    kept = [doc for doc in documents if len(doc.page_content.strip()) >= 50]
+
+    # embed_documents batches internally; one add per batch instead of per doc
+    for start in range(0, len(kept), EMBED_BATCH_SIZE):
+        batch = kept[start : start + EMBED_BATCH_SIZE]
+        contents = [doc.page_content.strip() for doc in batch]
         collection.add(
-            documents=[content],
-            metadatas=[document.metadata],
-            embeddings=[embedding],
-            ids=[doc_id],
+            documents=contents,
+            metadatas=[doc.metadata for doc in batch],
+            embeddings=embedding_function.embed_documents(contents),
+            ids=[str(uuid.uuid4()) for _ in batch],
         )
 
     logger.info(
@@ -0,0 +1,269 @@
+# - scripts/streaming.py
+
+import logging
+import queue
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable
+
+from langchain.schema import Document
+
+from config.defaults import CONFIG
+from input.get_files import iter_files
+from input.parser import ParseSummary, iter_parsed
+from input.utils.filtering import keep_document
+from nlp.chunk.chunker import iter_chunks
+from nlp.chunk.dedup import ChunkDeduplicator
+from nlp.embed.model import get_embedding_function
+from nlp.embed.store import ChromaBatchWriter, bump_collection_version
+from nlp.embed.utils import log_store_summary, open_collection, store_embedded
+from nlp.utils.chunk_store import open_chunk_writer
+from nlp.utils.metrics import get_metrics
+
+# Logging setup
+logger = logging.getLogger(__name__)
+
+# Config
+provider = CONFIG["DEFAULT_PROVIDER"]
+CHUNK_FILE = CONFIG["GENERAL"]["CHUNK_FILE"]
+PERSIST_DIR = CONFIG["CHROMA"]["PERSIST_DIR"]
+COLLECTION_NAME = CONFIG["CHROMA"]["COLLECTION_NAME"]
+EMBED_MODEL_NAME = CONFIG[provider]["EMBED_MODEL"]
+QUEUE_SIZE = CONFIG["STREAM"]["queue_size"]
+FLUSH_INTERVAL = CONFIG["STREAM"]["flush_interval"]
+
+_DONE = object()  # end-of-stream marker passed between stages
+
+
+class _Stopped(Exception):
+    """Another stage failed; unwind this one quietly."""
+
+
+class StreamingPipeline:
+    """
+    Ingest a directory (or just ``files`` from it) with every stage running at once.
+
+    Discovery and parsing feed a document queue, chunking and dedup feed a
+    queue of embedding batches, ``concurrency`` embedding threads feed the
+    store queue, and the calling thread writes to Chroma. Each queue holds at
+    most ``queue_size`` items, so a slow stage holds back the ones before it
+    and memory stays flat however large the corpus is. Partial write batches
+    are flushed every ``flush_interval`` seconds, so the first vectors land
+    shortly after the run starts. If any stage fails, the others stop and the
+    error is re-raised from ``run()``. With a ``checkpoint``
+    (nlp.embed.runs.IngestRun) chunks stored by an earlier attempt are not
+    embedded again, and each stored batch is recorded. ``embedding_function``
+    reuses an already warm embedder instead of building one. A file that
+    parses for longer than ``timeout`` seconds is skipped (see iter_parsed).
+    """
+
+    def __init__(
+        self,
+        source_path: Path,
+        files: Iterable[Path] = None,
+        persist_dir: str = PERSIST_DIR,
+        model_name: str = EMBED_MODEL_NAME,
+        collection_name: str = COLLECTION_NAME,
+        chunk_file: str = CHUNK_FILE,
+        purge: bool = False,
+        dedup: bool = True,
+        workers: int = None,
+        timeout: float = None,
+        concurrency: int = 1,
+        queue_size: int = QUEUE_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        checkpoint=None,
+        embedding_function=None,
+    ):
+        self.source_path = Path(source_path)
+        self.files = files
+        self.persist_dir = persist_dir
+        self.model_name = model_name
+        self.collection_name = collection_name
+        self.chunk_file = chunk_file
+        self.purge = purge
+        self.workers = workers
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.flush_interval = flush_interval
+        self.checkpoint = checkpoint
+        self.embedding_function = embedding_function
+
+        self.deduplicator = ChunkDeduplicator() if dedup else None
+        self.parse_summary = ParseSummary()
+        self.chunks = 0
+        self.skipped = 0
+        self.failed = 0
+
+        self._documents = queue.Queue(maxsize=queue_size)
+        self._batches = queue.Queue(maxsize=queue_size)
+        self._embedded = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._error = None
+
+    def _put(self, q, item):
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q):
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _guard(self, stage, *args):
+        try:
+            stage(*args)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            logger.error(f"❌ Streaming stage {stage.__name__} failed: {e}")
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+
+    def _parse_stage(self):
+        files = self.files if self.files is not None else iter_files(self.source_path)
+        # Parsed off the main thread: iter_parsed keeps the timeout by using a worker process
+        parsed = iter_parsed(
+            files, self.parse_summary, workers=self.workers, timeout=self.timeout
+        )
+        with closing(parsed):
+            for _, documents in parsed:
+                for document in documents:
+                    if keep_document(document):
+                        self._put(self._documents, document)
+        self._put(self._documents, _DONE)
+
+    def _chunk_stage(self, batch_size, embed_threads):
+        batch = []
+        metrics = get_metrics()
+        with open_chunk_writer(self.chunk_file) as chunk_out:
+            while (document := self._get(self._documents)) is not _DONE:
+                for chunk in iter_chunks([document]):
+                    if self.deduplicator and self.deduplicator.add(chunk) is None:
+                        metrics.count("dedup.removed")
+                        continue
+                    self.chunks += 1
+                    chunk_out.write(chunk)
+                    content = chunk["page_content"]
+                    chunk_doc = Document(page_content=content, metadata=chunk["metadata"])
+                    batch.append((content, chunk_doc))
+                    if len(batch) >= batch_size:
+                        self._put_batch(batch)
+                        batch = []
+        if batch:
+            self._put_batch(batch)
+        for _ in range(embed_threads):
+            self._put(self._batches, _DONE)
+
+    def _put_batch(self, batch):
+        if self.checkpoint is not None:
+            # Stored by an earlier attempt of this run: nothing to embed
+            done = self.checkpoint.completed(doc.metadata["chunk_id"] for _, doc in batch)
+            if done:
+                self.skipped += len(done)
+                get_metrics().count("embed.skipped", len(done))
+                batch = [item for item in batch if item[1].metadata["chunk_id"] not in done]
+        if batch:
+            self._put(self._batches, batch)
+
+    def _embed_stage(self, embedding_function):
+        metrics = get_metrics()
+        while (batch := self._get(self._batches)) is not _DONE:
+            with metrics.timer("embed.batch"):
+                embeddings = embedding_function.embed_documents_partial(
+                    [content for content, _ in batch]
+                )
+            self._put(self._embedded, (batch, embeddings))
+        self._put(self._embedded, _DONE)
+
+    def _store_stage(self, writer, embed_threads):
+        finished = 0
+        while finished < embed_threads:
+            if self._stop.is_set():
+                raise _Stopped()
+            first = writer.written == 0
+            try:
+                item = self._embedded.get(timeout=0.1)
+            except queue.Empty:
+                if writer.flush_due():
+                    writer.flush()
+            else:
+                if item is _DONE:
+                    finished += 1
+                else:
+                    self.failed += store_embedded(writer, *item)
+            if first and writer.written:
+                elapsed = time.monotonic() - self._started
+                logger.info(f"⏱️ First vectors stored {elapsed:.1f}s after start.")
+        writer.flush()
+
+    def run(self):
+        logger.info(f"🚀 Streaming ingestion from {self.source_path}...")
+        self._started = time.monotonic()
+        embedding_function = self.embedding_function
+        if embedding_function is None:
+            logger.info(f"📦 Using {provider} model: {self.model_name}")
+            embedding_function = get_embedding_function(
+                model_name=self.model_name, concurrency=self.concurrency
+            )
+        collection = open_collection(
+            embedding_function, self.persist_dir, self.collection_name, purge=self.purge
+        )
+        embed_threads = max(1, min(self.concurrency, embedding_function.concurrency))
+        on_flush = self.checkpoint.mark_stored if self.checkpoint is not None else None
+        writer = ChromaBatchWriter(
+            collection, max_delay=self.flush_interval, on_flush=on_flush
+        )
+
+        stages = [
+            (self._parse_stage,),
+            (self._chunk_stage, embedding_function.batch_size, embed_threads),
+        ] + [(self._embed_stage, embedding_function)] * embed_threads
+        threads = [
+            threading.Thread(target=self._guard, args=stage, daemon=True)
+            for stage in stages
+        ]
+        for thread in threads:
+            thread.start()
+        self._guard(self._store_stage, writer, embed_threads)
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        self.failed += writer.failed
+        if self._error is not None:
+            raise self._error
+
+        self.parse_summary.log()
+        if self.deduplicator:
+            self.deduplicator.log_summary()
+            # Survivors that gained duplicates after they were stored
+            updated = self.deduplicator.updated_metadata()
+            if updated:
+                collection.update(ids=[m["chunk_id"] for m in updated], metadatas=updated)
+                bump_collection_version(collection)
+        log_store_summary(writer, collection, embedding_function, self.persist_dir)
+        if self.skipped:
+            logger.info(f"⏭️ Skipped {self.skipped} chunk(s) stored by an earlier attempt.")
+        logger.info(
+            f"✅ Streamed {self.chunks} chunk(s) in {time.monotonic() - self._started:.1f}s."
+        )
+        return writer.written
+
+
+def run_streaming_pipeline(source_path: Path, **kwargs) -> int:
+    """Run a StreamingPipeline over ``source_path``; returns the records stored."""
+    return StreamingPipeline(source_path, **kwargs).run()
@@ -0,0 +1,41 @@
+# - tests/conftest.py
+
+import os
+
+# config.defaults refuses to import without these; the mock gateway ignores them
+for var in ("CLOUDFLARE_API_TOKEN", "CLOUDFLARE_ACCOUNT_ID", "CLOUDFLARE_GATEWAY_ID", "OPENAI_API_KEY"):
+    os.environ.setdefault(var, "test")
+
+import pytest
+
+from config.defaults import CONFIG
+from tests.mock_gateway import MockGateway
+
+
+def write_page(path, name, extra=""):
+    """An HTML page of five paragraphs, each long enough to be a chunk of its own."""
+    paragraphs = "".join(
+        f"<p>{name} paragraph {j} has enough words to be worth a chunk of its own.</p>"
+        for j in range(5)
+    )
+    if extra:
+        paragraphs += f"<p>{extra}</p>"
+    path.write_text(f"<html><body>{paragraphs}</body></html>")
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """A MockGateway every Cloudflare request goes to, with the embedding cache off."""
+    with MockGateway() as gw:
+        monkeypatch.setitem(CONFIG["CLOUDFLARE"], "gateway_endpoint", gw.endpoint)
+        monkeypatch.setitem(CONFIG["EMBED_CACHE"], "enabled", False)
+        yield gw
+
+
+@pytest.fixture
+def source_dir(tmp_path, monkeypatch):
+    """An empty source directory, run from tmp_path: CONFIG's persist paths are relative."""
+    monkeypatch.chdir(tmp_path)
+    source = tmp_path / "source"
+    source.mkdir()
+    return source
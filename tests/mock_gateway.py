@@ -0,0 +1,148 @@
+# - tests/mock_gateway.py
+
+import gzip
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+def fake_embedding(text: str, dim: int = 8):
+    """Deterministic pseudo-embedding so tests can check vectors against inputs."""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [digest[i % len(digest)] / 255.0 for i in range(dim)]
+
+
+class MockGateway:
+    """
+    Local stand-in for the Cloudflare AI Gateway / Workers AI endpoints.
+
+    Embedding models answer ``{"text": str | [str]}`` with one vector per text;
+    any other model answers ``{"prompt": str}`` with a canned response. A batch
+    or prompt containing ``fail_marker`` gets a ``fail_status`` (500) so
+    callers can exercise retry paths.
+    ``latency`` delays every response, and the first ``rate_limit_first``
+    requests are answered with 429 + Retry-After. ``error_rate`` answers that
+    fraction of embedding requests, at random (seeded), with a 500.
+    """
+
+    def __init__(
+        self,
+        dim: int = 8,
+        fail_marker: str = "__FAIL__",
+        fail_status: int = 500,
+        latency: float = 0.0,
+        rate_limit_first: int = 0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.dim = dim
+        self.fail_marker = fail_marker
+        self.fail_status = fail_status
+        self.latency = latency
+        self.rate_limit_first = rate_limit_first
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.request_times = []  # monotonic arrival time per request
+        self.requests = []  # (model_id, payload) per request received
+        self.connections = []  # client (host, port) per request, to observe keep-alive
+        self.headers = []  # request headers per request
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def endpoint(self) -> str:
+        """Gateway endpoint template in the same shape as CONFIG's."""
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1/{{account_id}}/{{gateway_id}}/workers-ai/{{model_id}}"
+
+    def start(self):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real gateway
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                payload = json.loads(body or b"{}")
+                model_id = self.path.split("/workers-ai/", 1)[-1]
+                with gateway._lock:
+                    gateway.requests.append((model_id, payload))
+                    gateway.connections.append(self.client_address)
+                    gateway.headers.append(dict(self.headers))
+                    gateway.request_times.append(time.monotonic())
+                    gateway.in_flight += 1
+                    gateway.max_in_flight = max(gateway.max_in_flight, gateway.in_flight)
+                    rate_limited = len(gateway.requests) <= gateway.rate_limit_first
+                try:
+                    if gateway.latency:
+                        time.sleep(gateway.latency)
+                    if rate_limited:
+                        status, body = 429, {"success": False, "errors": [{"message": "rate limited"}]}
+                    else:
+                        status, body = gateway.handle(model_id, payload)
+                finally:
+                    with gateway._lock:
+                        gateway.in_flight -= 1
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                if rate_limited:
+                    self.send_header("Retry-After", "0")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def handle(self, model_id: str, payload: dict):
+        """Return (status, body) for a request."""
+        if "text" in payload:
+            texts = payload["text"]
+            texts = [texts] if isinstance(texts, str) else texts
+            if any(self.fail_marker in text for text in texts):
+                return self.fail_status, {"success": False, "errors": [{"message": "mock failure"}]}
+            if self._random_error():
+                return 500, {"success": False, "errors": [{"message": "mock failure"}]}
+            data = [fake_embedding(text, self.dim) for text in texts]
+            return 200, {
+                "success": True,
+                "result": {"shape": [len(data), self.dim], "data": data},
+            }
+        if self.fail_marker in payload.get("prompt", ""):
+            return self.fail_status, {"success": False, "errors": [{"message": "mock failure"}]}
+        return 200, {"success": True, "result": {"response": "mock answer"}}
+
+    def _random_error(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,52 @@
+# - tests/test_bench_ingest.py
+
+import logging
+
+import pytest
+
+from benchmarks.bench_ingest import percentile, run_benchmark
+from benchmarks.corpus import generate_corpus
+from config.defaults import CONFIG
+from tests.mock_gateway import MockGateway
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def test_corpus_is_reproducible(tmp_path):
+    first = generate_corpus(tmp_path / "a", docs=30, seed=7)
+    second = generate_corpus(tmp_path / "b", docs=30, seed=7)
+
+    files = sorted(p.relative_to(first) for p in first.rglob("*.*"))
+    assert len(files) == 30
+    assert {p.suffix for p in files} == {".html", ".txt"}
+    assert all((first / p).read_text() == (second / p).read_text() for p in files)
+
+
+def test_every_stage_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG["EMBED_CACHE"], "enabled", False)
+    monkeypatch.setitem(CONFIG["CLOUDFLARE"], "embed_backoff_base", 0.01)
+    source = generate_corpus(tmp_path / "corpus", docs=20, duplicate_ratio=0.3)
+
+    with MockGateway(error_rate=0.2, seed=1) as gateway:
+        monkeypatch.setitem(CONFIG["CLOUDFLARE"], "gateway_endpoint", gateway.endpoint)
+        stages, docs, chunks = run_benchmark(source, str(tmp_path / "chroma"), workers=1)
+
+    assert list(stages) == ["discovery", "parse", "chunk", "dedup", "embed", "store"]
+    assert docs == 20 and stages["store"]["items"] == chunks
+    assert stages["dedup"]["items"] > chunks  # duplicated pages were dropped
+    assert stages["embed"]["latency_ms"]["p99"] >= stages["embed"]["latency_ms"]["p50"]
+    assert stages["parse"]["items"] == 20 and stages["parse"]["unit"] == "docs"
+    assert all(stage["peak_rss_mb"]["self"] > 0 for stage in stages.values())
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([3.0], 0.99) == 3.0
+    assert percentile([], 0.5) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
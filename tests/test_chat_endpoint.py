@@ -0,0 +1,83 @@
+# - tests/test_chat_endpoint.py
+
+import logging
+
+import pytest
+
+from api import serve
+from config.defaults import CONFIG
+from nlp.retrieve import retriever_setup
+from scripts.ingest import run_pipeline
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+EMBED_MODEL = CONFIG["CLOUDFLARE"]["EMBED_MODEL"]
+
+
+@pytest.fixture
+def gateway(source_dir, monkeypatch, gateway):
+    monkeypatch.setitem(CONFIG["RETRIEVAL_CACHE"], "enabled", False)
+    monkeypatch.setattr(retriever_setup, "_retrievers", {})
+    monkeypatch.setattr(retriever_setup, "_embedding_function", None)
+    monkeypatch.setattr(serve, "qa_chain_map", {})
+    paragraphs = "".join(
+        f"<p>Gearbox note {j}: the ZX-9000 replaces the ZX-8000 in every assembly.</p>" for j in range(5)
+    )
+    (source_dir / "parts.html").write_text(f"<html><body>{paragraphs}</body></html>")
+    run_pipeline(source_dir)
+    return gateway
+
+
+def ask(gateway, question, chat_history=()):
+    sent = len(gateway.requests)
+    response = serve.chat_endpoint(
+        serve.QueryRequest(question=question, chat_history=list(chat_history), chat_id="c1")
+    )
+    return response, gateway.requests[sent:]
+
+
+def test_chat_retrieves_once_and_answers_from_those_documents(gateway):
+    response, requests = ask(gateway, "What replaces the ZX-8000?")
+    assert response["answer"] == "mock answer"
+    assert response["retrievals"] == 1 and response["single_retrieval"]
+
+    embeds = [payload for model, payload in requests if model == EMBED_MODEL]
+    prompts = [payload["prompt"] for model, payload in requests if model != EMBED_MODEL]
+    assert len(embeds) == 1 and len(prompts) == 1
+    documents = response["source_documents"]
+    assert documents
+    # The question and each chunk appear in the prompt once
+    assert prompts[0].count("What replaces the ZX-8000?") == 1
+    for document in documents:
+        assert prompts[0].count(document.page_content) == 1
+
+    # Memory holds the question and answer, not the stuffed prompt
+    history = serve.qa_chain_map[("default", "c1")].memory.chat_memory.messages
+    assert [m.content for m in history] == ["What replaces the ZX-8000?", "mock answer"]
+
+
+def test_follow_up_condenses_then_retrieves_once(gateway):
+    ask(gateway, "What replaces the ZX-8000?")
+    response, requests = ask(gateway, "And in which assemblies?")
+
+    assert response["single_retrieval"]
+    assert sum(model == EMBED_MODEL for model, _ in requests) == 1
+    # One call to condense the question, one to answer it
+    assert sum(model != EMBED_MODEL for model, _ in requests) == 2
+    assert len(response["chat_history"]) == 4
+
+
+def test_a_new_chat_is_seeded_from_the_requests_history(gateway):
+    earlier = [("What replaces the ZX-8000?", "The ZX-9000.")]
+    response, requests = ask(gateway, "And in which assemblies?", chat_history=earlier)
+
+    prompts = [payload["prompt"] for model, payload in requests if model != EMBED_MODEL]
+    assert len(prompts) == 2 and "Human: What replaces the ZX-8000?" in prompts[0]
+    assert response["retrievals"] == 1 and response["context"]["used_tokens"] > 0
+    # Only this turn is saved; the seed came from the client
+    assert len(response["chat_history"]) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,57 @@
+# - tests/test_chroma_writer.py
+
+import logging
+
+import chromadb
+import pytest
+
+from nlp.embed.store import ChromaBatchWriter
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def collection(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    return client.get_or_create_collection("writer_test")
+
+
+def write(collection, records, batch_size=4):
+    with ChromaBatchWriter(collection, batch_size=batch_size) as writer:
+        for doc_id, metadata in records:
+            writer.add(doc_id, f"text {doc_id}", metadata, [0.1, 0.2, 0.3])
+    return writer
+
+
+def test_records_are_flushed_in_batches(collection):
+    writer = write(collection, [(f"id{i}", {"source": "a"}) for i in range(10)])
+
+    assert writer.flushes == 3
+    assert writer.written == 10
+    assert collection.count() == 10
+    # One version bump for the whole writer, not one per flush
+    assert collection.metadata["version"] == 1
+
+
+def test_rerun_is_idempotent(collection):
+    records = [(f"id{i}", {"source": "a"}) for i in range(6)]
+    write(collection, records)
+    write(collection, records)
+
+    assert collection.count() == 6
+
+
+def test_bad_record_only_drops_itself(collection):
+    records = [(f"id{i}", {"source": "a"}) for i in range(8)]
+    records[5] = ("id5", {"source": ["not", "a", "scalar"]})
+
+    writer = write(collection, records, batch_size=8)
+
+    assert writer.written == 7
+    assert writer.failed == 1
+    assert collection.get(ids=["id5"])["ids"] == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
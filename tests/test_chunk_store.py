@@ -0,0 +1,130 @@
+# - tests/test_chunk_store.py
+
+import json
+import logging
+
+import chromadb
+import pytest
+
+from config.defaults import CONFIG
+from nlp.utils.chunk_store import (
+    ChunkStore,
+    ChunkStoreWriter,
+    chunk_store_to_jsonl,
+    iter_chunk_file,
+    jsonl_to_chunk_store,
+    write_chunks,
+)
+from scripts.ingest import run_pipeline
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def make_chunks(n):
+    return [
+        {
+            "page_content": f"Chunk {i} text, with a comma and ünïcode.",
+            "metadata": {
+                "chunk_id": f"id-{i}",
+                "source": f"docs/{i % 3}.pdf",
+                "title": "Doc",
+                "page": i % 7 + 1,
+                "token_count": 12,
+            },
+        }
+        for i in range(n)
+    ]
+
+
+def test_round_trip_across_record_batches(tmp_path):
+    chunks = make_chunks(25)
+    path = str(tmp_path / "chunks.arrow")
+
+    with ChunkStoreWriter(path, batch_rows=10) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    with ChunkStore(path) as store:
+        assert len(store) == 25
+        assert sum(1 for _ in store.batches()) == 3
+        assert list(store.iter_chunks()) == chunks
+        assert not store.has_embeddings
+        assert store.table(["source"]).column("source")[4].as_py() == "docs/1.pdf"
+
+
+def test_embeddings_are_optional_per_row(tmp_path):
+    chunks = make_chunks(3)
+    path = str(tmp_path / "chunks.arrow")
+
+    with ChunkStoreWriter(path) as writer:
+        writer.write(chunks[0], embedding=[0.5, 0.25])
+        writer.write(chunks[1])
+        writer.write({**chunks[2], "embedding": [1.0, 2.0]})
+
+    with ChunkStore(path) as store:
+        assert store.has_embeddings
+        stored = list(store.iter_chunks(with_embeddings=True))
+    assert [chunk.get("embedding") for chunk in stored] == [[0.5, 0.25], None, [1.0, 2.0]]
+
+
+def test_failed_write_leaves_no_store(tmp_path):
+    path = tmp_path / "chunks.arrow"
+
+    with pytest.raises(RuntimeError):
+        with ChunkStoreWriter(str(path)) as writer:
+            writer.write(make_chunks(1)[0])
+            raise RuntimeError("chunking failed")
+
+    assert list(tmp_path.iterdir()) == []
+
+    with pytest.raises(RuntimeError):
+        write_chunks(failing_chunks(), str(tmp_path / "chunked_docs.jsonl"))
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def failing_chunks():
+    yield from make_chunks(2)
+    raise RuntimeError("chunking failed")
+
+
+def test_missing_store_falls_back_to_the_legacy_jsonl(tmp_path):
+    chunks = make_chunks(3)
+    write_chunks(chunks, str(tmp_path / "chunked_docs.jsonl"))
+
+    assert list(iter_chunk_file(str(tmp_path / "chunks.arrow"))) == chunks
+
+
+def test_jsonl_import_and_export(tmp_path):
+    chunks = make_chunks(5)
+    jsonl_path = str(tmp_path / "chunked_docs.jsonl")
+    store_path = str(tmp_path / "chunks.arrow")
+    write_chunks(chunks, jsonl_path)
+
+    assert jsonl_to_chunk_store(jsonl_path, store_path) == 5
+    assert list(iter_chunk_file(store_path)) == chunks
+
+    exported = str(tmp_path / "exported.jsonl")
+    assert chunk_store_to_jsonl(store_path, exported) == 5
+    assert [json.loads(line) for line in open(exported)] == chunks
+
+
+def test_from_disk_reembeds_the_saved_store(source_dir, gateway):
+    for name in ("alpha", "beta"):
+        paragraphs = "".join(f"<p>{name} paragraph {j} has a few words in it.</p>" for j in range(20))
+        (source_dir / f"{name}.html").write_text(f"<html><body>{paragraphs}</body></html>")
+
+    run_pipeline(source_dir)
+    with ChunkStore(CONFIG["GENERAL"]["CHUNK_FILE"]) as store:
+        saved = len(store)
+    assert saved > 0
+
+    run_pipeline(source_dir, from_disk=True, purge_vectorstore=True)
+
+    client = chromadb.PersistentClient(path=CONFIG["CHROMA"]["PERSIST_DIR"])
+    assert client.get_collection(CONFIG["CHROMA"]["COLLECTION_NAME"]).count() == saved
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,136 @@
+# - tests/test_context_builder.py
+
+import logging
+from pathlib import Path
+
+import pytest
+import tiktoken
+from langchain.schema import Document
+from tokenizers import Tokenizer, models, pre_tokenizers
+
+from config.defaults import CONFIG
+from nlp.retrieve import context
+from nlp.retrieve.context import TokenCounter, build_context
+from nlp.utils import tokenizer
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope="module")
+def counter():
+    # Byte-level BPE built locally, so no vocabulary download
+    ranks = {bytes([i]): i for i in range(256)}
+    for merged in (b"th", b"he", b" t", b" th", b"the", b" the", b"in", b"er", b"an"):
+        ranks[merged] = len(ranks)
+    encoding = tiktoken.Encoding(
+        name="test-bytes",
+        pat_str=r"""'s|'t| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+        mergeable_ranks=ranks,
+        special_tokens={},
+    )
+    return TokenCounter(encoding)
+
+
+def chunk(text, **metadata):
+    return Document(page_content=text, metadata=metadata)
+
+
+REFUND = "Refunds are issued within fourteen days of the return reaching the warehouse."
+SHIPPING = "Orders ship from Leeds on weekdays and arrive in two to three days."
+
+
+def test_near_duplicates_give_way_to_diverse_chunks(counter):
+    candidates = [
+        chunk(REFUND),
+        chunk(REFUND.replace("fourteen", "14")),
+        chunk(SHIPPING),
+    ]
+    packed = build_context("How do refunds work?", candidates, budget=10_000, counter=counter)
+
+    assert [d.page_content for d in packed.documents] == [REFUND, SHIPPING]
+    assert packed.duplicates == 1
+    assert packed.saved_tokens == packed.naive_tokens - packed.used_tokens > 0
+
+
+def test_budget_is_filled_best_first_and_the_tail_trimmed(counter, monkeypatch):
+    monkeypatch.setitem(context.CONTEXT_CONFIG, "min_trim_tokens", 20)
+    candidates = [chunk(f"Fact {i}. " + " ".join(f"Detail {i}.{j} holds." for j in range(20))) for i in range(5)]
+    question = "What are the facts?"
+    sizes = [counter.count(d.page_content) for d in candidates]
+    budget = counter.count(question) + sizes[0] + sizes[1] + 60
+
+    packed = build_context(question, candidates, budget=budget, counter=counter)
+
+    assert packed.order == [0, 1, 2]
+    assert packed.documents[:2] == candidates[:2]
+    last = packed.documents[2]
+    assert last.metadata["trimmed"] and candidates[2].page_content.startswith(last.page_content)
+    assert last.page_content.endswith(".")
+    assert (packed.trimmed, packed.dropped) == (1, 2)
+    assert packed.used_tokens <= budget - counter.count(question)
+
+
+def test_history_counts_against_the_budget_and_precomputed_counts_are_used(counter, monkeypatch):
+    monkeypatch.setattr(context, "CHUNK_ENCODING", "test-bytes")
+    candidates = [chunk(REFUND, token_count=500), chunk(SHIPPING, token_count=5)]
+
+    packed = build_context("Shipping?", candidates, budget=1000, counter=counter)
+    assert packed.naive_tokens == packed.used_tokens == 505 + counter.count("\n\n")
+
+    history = "Human: hi\nAssistant: " + "hello " * 400
+    assert build_context("Shipping?", candidates, chat_history=history, budget=1000, counter=counter).documents == []
+
+
+def test_retrieval_scores_set_relevance_when_every_chunk_has_one(counter):
+    damaged = "Refunds for damaged items are issued within fourteen days once photos arrive."
+    texts = [REFUND, damaged, SHIPPING]
+
+    by_rank = build_context("Refunds?", [chunk(t) for t in texts], budget=10_000, counter=counter)
+    assert by_rank.order == [0, 1, 2]
+
+    # Fused scores: the second chunk is barely ahead of the third, so diversity wins
+    scored = [chunk(t, retrieval_score=s) for t, s in zip(texts, (0.032, 0.0165, 0.016))]
+    packed = build_context("Refunds?", scored, budget=10_000, counter=counter)
+    assert packed.order == [0, 2, 1]
+
+
+def test_each_model_counts_in_its_own_tokenizer(monkeypatch):
+    monkeypatch.setitem(context.CONTEXT_CONFIG, "encodings", {"default": None, "@cf/some/model": "cl100k_base"})
+    assert context.encoding_for("@cf/some/model") == "cl100k_base"
+    assert context.encoding_for("@cf/other/model") == context.CHUNK_ENCODING
+
+
+@pytest.fixture
+def embedding_tokenizer(tmp_path, monkeypatch):
+    """The embedding model's tokenizer.json, where a download leaves it."""
+    monkeypatch.setitem(CONFIG["LOCAL"], "MODEL_DIR", str(tmp_path))
+    path = Path(tokenizer.embedding_tokenizer_path())
+    path.parent.mkdir(parents=True)
+    vocab = {"[UNK]": 0, **{word: i + 1 for i, word in enumerate(sorted(set(REFUND.split())))}}
+    words = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    words.pre_tokenizer = pre_tokenizers.Whitespace()
+    words.save(str(path))
+    monkeypatch.setattr(context, "_counters", {})
+    tokenizer.get_tokenizer.cache_clear()
+    context._encoding.cache_clear()
+    yield
+    tokenizer.get_tokenizer.cache_clear()
+    context._encoding.cache_clear()
+
+
+def test_default_config_packs_in_the_chunk_encoding(embedding_tokenizer, caplog):
+    counter = context.get_token_counter()
+    assert counter.encoding_name == context.CHUNK_ENCODING and counter.encoding is not None
+
+    chunks = [chunk(REFUND, token_count=7), chunk(SHIPPING)]
+    packed = build_context("Refunds?", chunks)
+
+    assert "unavailable" not in caplog.text  # no fallback to the 4 characters per token estimate
+    assert packed.documents == chunks
+    # The refund chunk's precomputed count is reused; the other is counted
+    assert packed.naive_tokens == 7 + counter.count(SHIPPING) + counter.count("\n\n")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
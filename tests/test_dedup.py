@@ -0,0 +1,57 @@
+# - tests/test_dedup.py
+
+import json
+import logging
+
+import pytest
+
+from nlp.chunk.dedup import ChunkDeduplicator, dedup_chunks
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+NAV = (
+    "Skip to content News USA Canada Catholic Abortion Faith Family Todays News "
+    "Last 10 Days Language Espaol Portugus Italiano Franais Polski Magyar Opinion "
+    "Editorials Analysis Blogs Shows Breaking News Video Home Most Watched"
+)
+
+
+def chunk(text, source):
+    return {"page_content": text, "metadata": {"source": source}}
+
+
+def test_exact_and_near_duplicates_are_removed():
+    chunks = [
+        chunk(NAV, "a.html"),
+        chunk("The council met on Tuesday to discuss the budget for next year.", "a.html"),
+        chunk(NAV.replace("News", "news"), "b.html"),  # differs only in case
+        chunk(NAV + " Subscribe", "c.html"),  # one extra word
+        chunk("An entirely different paragraph about gardening in the spring.", "c.html"),
+    ]
+
+    kept = dedup_chunks(chunks, threshold=0.8)
+
+    assert [c["page_content"][:10] for c in kept] == [NAV[:10], "The counci", "An entirel"]
+    survivor = kept[0]["metadata"]
+    assert survivor["duplicate_count"] == 2
+    assert json.loads(survivor["duplicate_sources"]) == ["b.html", "c.html"]
+    assert "duplicate_count" not in kept[1]["metadata"]
+
+
+def test_threshold_controls_near_duplicate_detection():
+    first = " ".join(f"word{i}" for i in range(40))
+    second = " ".join(f"word{i}" for i in range(30)) + " " + " ".join(f"other{i}" for i in range(10))
+
+    strict = ChunkDeduplicator(threshold=0.95)
+    loose = ChunkDeduplicator(threshold=0.5)
+    for dedup in (strict, loose):
+        dedup.add(chunk(first, "a"))
+        dedup.add(chunk(second, "b"))
+
+    assert strict.kept == 2
+    assert loose.kept == 1 and loose.near_duplicates == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
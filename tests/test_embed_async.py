@@ -0,0 +1,90 @@
+# - tests/test_embed_async.py
+
+import asyncio
+import logging
+import time
+
+import pytest
+
+from config.defaults import CONFIG
+from nlp.embed.model import CloudflareEmbeddings
+from tests.mock_gateway import fake_embedding
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setitem(CONFIG["CLOUDFLARE"], "embed_backoff_base", 0.01)
+
+
+def test_results_keep_input_order_with_requests_in_flight(gateway):
+    gateway.latency = 0.05
+    texts = [f"document {i}" for i in range(40)]
+    embedder = CloudflareEmbeddings(batch_size=2, concurrency=5)
+
+    started = time.monotonic()
+    embeddings = asyncio.run(embedder.aembed_documents(texts))
+    elapsed = time.monotonic() - started
+
+    assert embeddings == [fake_embedding(text) for text in texts]
+    assert 1 < gateway.max_in_flight <= 5
+    # 20 batches at 50ms each: sequential would take ~1s
+    assert elapsed < 0.6
+
+
+def test_rate_limited_batches_are_retried(gateway):
+    gateway.rate_limit_first = 3
+    texts = [f"document {i}" for i in range(6)]
+
+    embeddings = asyncio.run(
+        CloudflareEmbeddings(batch_size=2, concurrency=1).aembed_documents(texts)
+    )
+
+    assert embeddings == [fake_embedding(text) for text in texts]
+    assert len(gateway.requests) == 6
+
+
+def test_requests_per_second_cap(gateway):
+    texts = [f"document {i}" for i in range(10)]
+    embedder = CloudflareEmbeddings(batch_size=1, concurrency=10, max_rps=5)
+
+    asyncio.run(embedder.aembed_documents(texts))
+
+    # A burst of 5, then the remaining 5 at 5 per second
+    span = gateway.request_times[-1] - gateway.request_times[0]
+    assert span >= 0.9
+
+
+def test_rejected_text_only_loses_itself(gateway, monkeypatch):
+    gateway.fail_status = 400
+    monkeypatch.setitem(CONFIG["CLOUDFLARE"], "embed_max_retries", 1)
+    texts = [f"chunk {i}" for i in range(8)]
+    texts[3] = "chunk __FAIL__"
+
+    embeddings = asyncio.run(
+        CloudflareEmbeddings(batch_size=8, concurrency=4).aembed_documents_partial(texts)
+    )
+
+    assert embeddings[3] is None
+    assert all(embeddings[i] == fake_embedding(texts[i]) for i in range(8) if i != 3)
+
+
+def test_server_errors_fail_the_batch_without_splitting(gateway, monkeypatch):
+    monkeypatch.setitem(CONFIG["CLOUDFLARE"], "embed_max_retries", 1)
+    texts = [f"chunk {i}" for i in range(8)]
+    texts[3] = "chunk __FAIL__"
+
+    embeddings = asyncio.run(
+        CloudflareEmbeddings(batch_size=4, concurrency=4).aembed_documents_partial(texts)
+    )
+
+    # The failing batch comes back empty, to be embedded on a resumed run
+    assert embeddings[:4] == [None] * 4
+    assert embeddings[4:] == [fake_embedding(text) for text in texts[4:]]
+    assert sorted(len(payload["text"]) for _, payload in gateway.requests) == [4, 4, 4]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
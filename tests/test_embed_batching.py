@@ -0,0 +1,69 @@
+# - tests/test_embed_batching.py
+
+import logging
+
+import pytest
+
+from config.defaults import CONFIG
+from nlp.embed.model import CloudflareEmbeddings
+from tests.mock_gateway import fake_embedding
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def test_embed_documents_batches_by_size(gateway):
+    texts = [f"document number {i}" for i in range(10)]
+    embeddings = CloudflareEmbeddings(batch_size=4).embed_documents(texts)
+
+    assert [len(payload["text"]) for _, payload in gateway.requests] == [4, 4, 2]
+    assert embeddings == [fake_embedding(text) for text in texts]
+
+
+def test_embed_documents_batches_by_bytes(gateway):
+    texts = [str(i) + "x" * 59 for i in range(5)]
+    CloudflareEmbeddings(batch_size=100, batch_max_bytes=130).embed_documents(texts)
+
+    assert [len(payload["text"]) for _, payload in gateway.requests] == [2, 2, 1]
+
+
+def test_rejected_batch_is_split_and_retried(gateway):
+    gateway.fail_status = 413
+    texts = [f"chunk {i}" for i in range(8)]
+    texts[5] = "chunk __FAIL__"
+    embedder = CloudflareEmbeddings(batch_size=8)
+
+    embeddings = embedder.embed_documents_partial(texts)
+
+    assert embeddings[5] is None
+    for i, text in enumerate(texts):
+        if i != 5:
+            assert embeddings[i] == fake_embedding(text)
+
+    with pytest.raises(ValueError):
+        embedder.embed_documents(texts)
+
+
+def test_throttled_batch_backs_off_and_fails_without_splitting(gateway, monkeypatch):
+    monkeypatch.setitem(CONFIG["CLOUDFLARE"], "embed_max_retries", 2)
+    monkeypatch.setitem(CONFIG["CLOUDFLARE"], "embed_backoff_base", 0.01)
+    gateway.fail_status = 503
+    texts = [f"chunk {i}" for i in range(8)]
+    texts[5] = "chunk __FAIL__"
+
+    embeddings = CloudflareEmbeddings(batch_size=8).embed_documents_partial(texts)
+
+    assert embeddings == [None] * 8
+    # One request and two retries of the whole batch, no halves
+    assert [len(payload["text"]) for _, payload in gateway.requests] == [8, 8, 8]
+
+
+def test_embed_query_sends_single_text(gateway):
+    vector = CloudflareEmbeddings().embed_query("What is LangChain?")
+
+    assert vector == fake_embedding("What is LangChain?")
+    assert gateway.requests[-1][1] == {"text": ["What is LangChain?"]}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,64 @@
+# - tests/test_embed_cache.py
+
+import asyncio
+import logging
+
+import pytest
+
+from nlp.embed.cache import EmbeddingCache
+from nlp.embed.model import CloudflareEmbeddings
+from tests.mock_gateway import fake_embedding
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def embedded_texts(gateway):
+    return [text for _, payload in gateway.requests for text in payload["text"]]
+
+
+def test_only_changed_texts_reach_the_network(gateway, tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"))
+    texts = [f"chunk {i}" for i in range(5)]
+
+    first = CloudflareEmbeddings(cache=cache).embed_documents(texts)
+    texts[2] = "chunk 2, edited"
+    second = CloudflareEmbeddings(cache=cache).embed_documents(texts)
+
+    assert embedded_texts(gateway) == [f"chunk {i}" for i in range(5)] + ["chunk 2, edited"]
+    assert second[2] == pytest.approx(fake_embedding("chunk 2, edited"))
+    assert second[0] == pytest.approx(first[0])
+    assert cache.stats()["hits"] == 4
+
+
+def test_async_path_uses_cache_and_whitespace_is_normalized(gateway, tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"))
+    CloudflareEmbeddings(cache=cache).embed_documents(["alpha beta"])
+
+    embeddings = asyncio.run(
+        CloudflareEmbeddings(cache=cache).aembed_documents(["alpha   beta\n", "gamma"])
+    )
+
+    assert embedded_texts(gateway) == ["alpha beta", "gamma"]
+    assert embeddings[0] == pytest.approx(fake_embedding("alpha beta"))
+
+
+def test_cache_persists_and_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    vector = [0.5] * 8  # 32 bytes as float32
+    cache = EmbeddingCache(path=path, max_bytes=100)
+    cache.put_many("model", ["a", "b", "c"], [vector] * 3)
+    cache.get_many("model", ["a"])  # "a" is now more recent than "b"
+    cache.put_many("model", ["d"], [vector])
+    cache.close()
+
+    reopened = EmbeddingCache(path=path, max_bytes=100)
+    hits = reopened.get_many("model", ["a", "b", "c", "d"])
+
+    assert hits[0] == vector and hits[3] == vector
+    assert hits[1] is None
+    assert reopened.get_many("other-model", ["a"]) == [None]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,149 @@
+# - tests/test_hnsw_store.py
+
+import logging
+import os
+
+import numpy as np
+import pytest
+
+from config.defaults import CONFIG
+from nlp.embed.store import bump_collection_version, collection_stamp
+from nlp.embed.utils import get_client
+from nlp.retrieve import retriever_setup
+from nlp.retrieve.hnsw_store import (
+    HnswSnapshot,
+    HnswVectorStore,
+    delta_dir,
+    export_collection,
+    open_snapshot,
+    snapshot_dir,
+    update_snapshot,
+)
+from scripts.ingest import run_pipeline
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def collection(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(500, 16)).astype(np.float32)
+    stored = get_client(CONFIG["CHROMA"]["PERSIST_DIR"]).get_or_create_collection("vectors")
+    stored.add(
+        ids=[f"chunk-{i:03d}" for i in range(len(vectors))],
+        embeddings=vectors.tolist(),
+        documents=[f"text {i}" for i in range(len(vectors))],
+        metadatas=[{"source": f"file{i % 5}.txt"} for i in range(len(vectors))],
+    )
+    # Rewritten rows sit in Chroma's write buffer, where get() lists their vectors first
+    vectors[:10] += 0.5
+    stored.upsert(ids=[f"chunk-{i:03d}" for i in range(10)], embeddings=vectors[:10].tolist())
+    return stored, vectors
+
+
+def test_snapshot_matches_exact_search(collection):
+    stored, vectors = collection
+    meta = export_collection(stored, dtype="float32")
+    assert (meta["count"], meta["dim"], meta["space"]) == (500, 16, "l2")
+    assert export_collection(stored) is None  # already current
+
+    snapshot = HnswSnapshot(snapshot_dir("vectors"))
+    queries = vectors[:10] + 0.01
+    exact_rows, exact_distances = snapshot.search(queries, k=5, exact=True)
+    assert list(exact_rows[:, 0]) == list(range(10))
+    assert snapshot.wait_ready(10) and snapshot.graph is not None
+    rows, distances = snapshot.search(queries, k=5)  # one batched graph query
+    assert rows.shape == (10, 5)
+    assert list(rows[:, 0]) == list(range(10))
+    np.testing.assert_allclose(distances[:, 0], exact_distances[:, 0], rtol=1e-3, atol=1e-4)
+
+    assert snapshot.rows_for(["chunk-042", "missing"]) == [42, None]
+    assert snapshot.document(42).page_content == "text 42"
+
+
+def test_store_serves_float16_snapshot_and_reloads_after_export(collection):
+    stored, vectors = collection
+    export_collection(stored)  # float16 by default
+    store = HnswVectorStore("vectors", embedding_function=None)
+    assert store.snapshot.vectors.dtype == np.float16
+
+    hits = store.similarity_search_by_vector(vectors[3].tolist(), k=3, filter={"source": "file3.txt"})
+    assert hits[0].page_content == "text 3"
+    assert all(d.metadata["source"] == "file3.txt" for d in hits)
+    assert [d.page_content for d in store.get_documents(["chunk-007", "gone"])] == ["text 7"]
+    with pytest.raises(ValueError):
+        store.similarity_search_by_vector(vectors[3].tolist(), filter={"source": {"$ne": "file3.txt"}})
+
+    # A write bumps the version; the next export is picked up without reopening the store
+    version = store.version()
+    stored.add(ids=["chunk-new"], embeddings=[[9.0] * 16], documents=["new"], metadatas=[{"source": "n"}])
+    bump_collection_version(stored)
+    export_collection(stored)
+    assert store.version() != version
+    assert store.similarity_search_by_vector([9.0] * 16, k=1)[0].page_content == "new"
+
+
+def test_changes_go_to_a_delta_with_tombstones_until_merged(collection):
+    stored, vectors = collection
+    export_collection(stored, dtype="float32")
+    built = open_snapshot(snapshot_dir("vectors")).meta
+    store = HnswVectorStore("vectors", embedding_function=None)
+    version = store.version()
+
+    since = collection_stamp(stored)
+    stored.delete(ids=["chunk-020"])
+    stored.upsert(ids=["chunk-021"], embeddings=[[7.0] * 16], documents=["moved"], metadatas=[{"source": "m"}])
+    stored.add(ids=["chunk-new"], embeddings=[[-7.0] * 16], documents=["new"], metadatas=[{"source": "n"}])
+    bump_collection_version(stored)
+    meta = update_snapshot(stored, ["chunk-020", "chunk-021", "chunk-new"], since)
+    assert meta["count"] == 2 and meta["tombstones"] == ["chunk-020", "chunk-021", "chunk-new"]
+
+    snapshot = store.snapshot
+    assert snapshot.meta == built and snapshot.live == 498
+    assert store.version() != version
+    assert snapshot.wait_ready(10) and snapshot.graph is not None
+    for exact in (True, False):
+        rows, _ = snapshot.search(vectors[20:22], k=3, exact=exact)
+        found = {snapshot.record(int(row))["id"] for row in rows.ravel()}
+        assert not found & {"chunk-020", "chunk-021"}
+    assert store.similarity_search_by_vector([7.0] * 16, k=1)[0].page_content == "moved"
+    assert store.similarity_search_by_vector([-7.0] * 16, k=1)[0].page_content == "new"
+    assert [d.page_content for d in store.get_documents(["chunk-020", "chunk-021", "chunk-022"])] == [
+        "moved",
+        "text 22",
+    ]
+
+    # Once the delta covers more than MERGE_RATIO of the collection, it is merged
+    assert update_snapshot(stored, [], since) is None  # already current
+    since = collection_stamp(stored)
+    stored.delete(ids=["chunk-022"])
+    bump_collection_version(stored)
+    meta = update_snapshot(stored, ["chunk-022"], since, merge_ratio=0.0)
+    assert meta["count"] == 499 and not os.path.exists(delta_dir("vectors"))
+    assert store.snapshot.delta is None
+
+
+def test_retrieval_serves_from_hnsw_after_ingest(source_dir, monkeypatch, gateway):
+    monkeypatch.setitem(CONFIG, "DEFAULT_VECTORDB", "HNSW")
+    monkeypatch.setattr(retriever_setup, "_retrievers", {})
+    monkeypatch.setattr(retriever_setup, "_embedding_function", None)
+    paragraphs = "".join(f"<p>paragraph {j} has enough words to be worth a chunk.</p>" for j in range(5))
+    (source_dir / "page.html").write_text(f"<html><body>{paragraphs}</body></html>")
+
+    run_pipeline(source_dir)
+    collection = CONFIG["CHROMA"]["COLLECTION_NAME"]
+    assert open_snapshot(snapshot_dir(collection)).count > 0
+
+    retriever = retriever_setup.get_retriever()
+    assert isinstance(retriever.vectorstore, HnswVectorStore)
+    hits = retriever.get_relevant_documents("paragraph 2")
+    assert hits and all(d.metadata["source"] == str(source_dir / "page.html") for d in hits)
+
+    with pytest.raises(ValueError):
+        retriever_setup.get_retriever("no-such-tenant")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,114 @@
+# - tests/test_hybrid_retrieval.py
+
+import logging
+import os
+
+import pytest
+
+from config.defaults import CONFIG
+from nlp.retrieve import bm25, retriever_setup
+from nlp.retrieve.hybrid import HybridRetriever, reciprocal_rank_fusion
+from scripts.ingest import run_pipeline
+from tests.conftest import write_page
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def test_bm25_ranks_exact_terms(tmp_path):
+    chunks = [
+        ("a", "Returns are accepted within thirty days of delivery."),
+        ("b", "Part SKU-4471 ships from the Leeds warehouse."),
+        ("c", "The warehouse ships parts every weekday, parts and more parts."),
+    ]
+    path = str(tmp_path / "index")
+    meta = bm25.build_index(chunks, path, {"version": 3})
+    assert (meta["chunks"], meta["version"]) == (3, 3)
+
+    index = bm25.Bm25Index(path)
+    assert index.search("sku-4471")[0][0] == "b"
+    assert index.search("What about 4471?")[0][0] == "b"
+    assert [hit for hit, _ in index.search("parts", k=1)] == ["c"]
+    assert index.search("nothing matches this") == []
+
+    # A rebuild replaces the index in place
+    bm25.build_index(chunks[:1], path)
+    assert bm25.Bm25Index(path).search("warehouse") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["z", "w"]])
+    assert fused[0] == "z"
+    assert set(fused) == {"x", "y", "z", "w"}
+
+
+@pytest.fixture
+def workspace(source_dir, monkeypatch, gateway):
+    monkeypatch.setitem(CONFIG["RETRIEVAL_CACHE"], "enabled", False)
+    monkeypatch.setattr(retriever_setup, "_retrievers", {})
+    monkeypatch.setattr(retriever_setup, "_embedding_function", None)
+    return source_dir
+
+
+def test_ingest_builds_the_index_and_hybrid_search_finds_codes(workspace):
+    source = workspace
+    for i in range(6):
+        write_page(source / f"page{i}.html", f"page{i}")
+    write_page(
+        source / "parts.html",
+        "parts",
+        extra="Order code ZX-9000 replaces the discontinued ZX-8000 gearbox assembly.",
+    )
+    run_pipeline(source)
+
+    collection = CONFIG["CHROMA"]["COLLECTION_NAME"]
+    index = bm25.open_index(collection)
+    assert index is not None and index.n > 0
+
+    retriever = retriever_setup.get_retriever()
+    assert isinstance(retriever, HybridRetriever)
+    hits = retriever.get_relevant_documents("zx-9000")
+    assert len(hits) <= CONFIG["BM25"]["k"]
+    assert "ZX-9000" in hits[0].page_content
+    # Fused scores ride along for context packing
+    scores = [d.metadata["retrieval_score"] for d in hits]
+    assert scores == sorted(scores, reverse=True) and scores[-1] > 0
+
+    # Removing the file rebuilds the index without it
+    (source / "parts.html").unlink()
+    run_pipeline(source)
+    assert bm25.open_index(collection).search("zx-9000") == []
+    assert all("ZX-9000" not in d.page_content for d in retriever.get_relevant_documents("zx-9000"))
+
+
+def test_small_changes_go_to_a_delta_until_it_is_merged(workspace, monkeypatch):
+    source = workspace
+    monkeypatch.setitem(CONFIG["BM25"], "merge_ratio", 0.5)
+    for i in range(8):
+        write_page(source / f"page{i}.html", f"page{i}")
+    write_page(source / "parts.html", "parts", extra="Order code ZX-9000 fits the old gearbox.")
+    run_pipeline(source)
+    collection = CONFIG["CHROMA"]["COLLECTION_NAME"]
+    built = bm25.open_index(collection).meta
+
+    write_page(source / "parts.html", "parts", extra="Order code QB-7100 fits the new gearbox.")
+    run_pipeline(source)
+
+    index = bm25.open_index(collection)
+    assert index.meta == built  # the main index was left alone
+    assert index.delta is not None and 0 < index.delta.n < index.n
+    assert index.search("zx-9000") == []
+    hits = retriever_setup.get_retriever().get_relevant_documents("qb-7100")
+    assert "QB-7100" in hits[0].page_content
+
+    # Past merge_ratio the delta is folded into a full rebuild
+    monkeypatch.setitem(CONFIG["BM25"], "merge_ratio", 0.0)
+    (source / "page0.html").unlink()
+    run_pipeline(source)
+    index = bm25.open_index(collection)
+    assert index.delta is None and not os.path.exists(bm25.delta_dir(collection))
+    assert index.search("qb-7100") and index.search("zx-9000") == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,75 @@
+# - tests/test_incremental_ingest.py
+
+import logging
+import os
+
+import chromadb
+import pytest
+
+from config.defaults import CONFIG
+from scripts.ingest import run_pipeline
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def page(name, paragraphs=12):
+    body = "".join(
+        f"<p>{name} paragraph {j} has enough words to make a few chunks of text.</p>"
+        for j in range(paragraphs)
+    )
+    return f"<html><body>{body}</body></html>"
+
+
+@pytest.fixture
+def workspace(source_dir, gateway):
+    for name in ("alpha", "beta", "gamma"):
+        (source_dir / f"{name}.html").write_text(page(name))
+    return source_dir, gateway
+
+
+def stored(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path / CONFIG["CHROMA"]["PERSIST_DIR"]))
+    records = client.get_collection(CONFIG["CHROMA"]["COLLECTION_NAME"]).get()
+    by_source = {}
+    for doc_id, metadata in zip(records["ids"], records["metadatas"]):
+        by_source.setdefault(os.path.basename(metadata["source"]), set()).add(doc_id)
+    return by_source
+
+
+def test_only_new_and_changed_files_are_reingested(workspace, tmp_path):
+    source, gateway = workspace
+    run_pipeline(source)
+    first = stored(tmp_path)
+    assert set(first) == {"alpha.html", "beta.html", "gamma.html"}
+
+    requests_before = len(gateway.requests)
+    run_pipeline(source)
+    assert len(gateway.requests) == requests_before  # nothing changed, nothing embedded
+    assert stored(tmp_path) == first
+
+    (source / "alpha.html").write_text(page("alpha, revised", paragraphs=6))
+    (source / "beta.html").unlink()
+    (source / "delta.html").write_text(page("delta"))
+    run_pipeline(source)
+
+    second = stored(tmp_path)
+    assert set(second) == {"alpha.html", "gamma.html", "delta.html"}
+    assert second["gamma.html"] == first["gamma.html"]  # deterministic ids, untouched
+    assert second["alpha.html"].isdisjoint(first["alpha.html"])
+    embedded = {text for _, payload in gateway.requests[requests_before:] for text in payload["text"]}
+    assert not any(text.startswith("gamma") for text in embedded)
+
+
+def test_full_rebuild_reproduces_the_same_ids(workspace, tmp_path):
+    source, _ = workspace
+    run_pipeline(source)
+    first = stored(tmp_path)
+
+    run_pipeline(source, full=True)
+
+    assert stored(tmp_path) == first
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,99 @@
+# - tests/test_ingest_metrics.py
+
+import io
+import json
+import logging
+
+import pytest
+
+from config.defaults import CONFIG
+from nlp.embed.runs import RunLog
+from nlp.utils.metrics import NULL_METRICS, Metrics, Progress, collect_metrics, get_metrics
+from scripts.ingest import run_pipeline
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def source(source_dir, monkeypatch):
+    monkeypatch.setitem(CONFIG["CLOUDFLARE"], "embed_batch_size", 10)
+    monkeypatch.setitem(CONFIG["CLOUDFLARE"], "embed_backoff_base", 0.01)
+    for name in ("alpha", "beta", "gamma"):
+        paragraphs = "".join(
+            f"<p>{name} paragraph {j} has enough words to make a few chunks of text.</p>"
+            for j in range(20)
+        )
+        (source_dir / f"{name}.html").write_text(f"<html><body>{paragraphs}</body></html>")
+    return source_dir
+
+
+def test_nothing_is_recorded_outside_a_collector():
+    assert get_metrics() is NULL_METRICS
+    with NULL_METRICS.timer("parse.file"):
+        NULL_METRICS.count("parse.files")
+    assert NULL_METRICS.report() == {}
+
+    with collect_metrics() as metrics:
+        assert get_metrics() is metrics
+        with metrics.timer("parse.file"):
+            metrics.count("parse.files", 2)
+    assert get_metrics() is NULL_METRICS
+
+    report = metrics.report()
+    assert report["counters"] == {"parse.files": 2}
+    assert report["timings"]["parse.file"]["count"] == 1
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_run_report_covers_every_stage(source, tmp_path, stream, gateway):
+    run_id = run_pipeline(
+        source, purge_vectorstore=True, stream=stream, report=str(tmp_path / "run.json")
+    )
+    requests = len(gateway.requests)
+
+    report = json.loads((tmp_path / "run.json").read_text())
+    counters, timings = report["counters"], report["timings"]
+    record = RunLog().get(run_id)
+
+    assert report["run"]["run_id"] == run_id and report["run"]["status"] == "completed"
+    assert counters["parse.files"] == counters["files.discovered"] == 3
+    assert counters["parse.bytes"] == sum(p.stat().st_size for p in source.iterdir())
+    assert counters["chunk.chunks"] >= record["chunks"] > 0
+    assert counters["store.stored"] == record["stored"] == record["chunks"]
+    assert counters["embed.requests"] == timings["embed.request"]["count"] == requests
+    assert timings["parse.file"]["count"] == 3
+    assert timings["store.flush"]["count"] >= 1
+    assert report["gauges"]["files.total"] == 3
+    assert report["throughput"]["chunks_per_sec"] > 0
+
+
+def test_retries_and_failures_are_counted(source, tmp_path, gateway):
+    gateway.rate_limit_first = 2
+    run_pipeline(
+        source, purge_vectorstore=True, concurrency=2, report=str(tmp_path / "run.json")
+    )
+
+    counters = json.loads((tmp_path / "run.json").read_text())["counters"]
+    assert counters["embed.retries"] == counters["embed.errors"] == 2
+    assert counters["embed.failed"] == 0
+
+
+def test_progress_line_shows_throughput_and_eta():
+    metrics = Metrics()
+    metrics.set("files.total", 10)
+    metrics.count("parse.files", 4)
+    metrics.count("chunk.chunks", 40)
+    metrics.count("store.stored", 20)
+
+    out = io.StringIO()
+    with Progress(metrics, interval=60, stream=out) as progress:
+        line = progress.line()
+
+    assert "files 4/10" in line and "stored 20" in line and "ETA" in line
+    # The final line is drawn on stop
+    assert "files 4/10" in out.getvalue()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
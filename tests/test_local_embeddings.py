@@ -0,0 +1,110 @@
+# - tests/test_local_embeddings.py
+
+import logging
+import os
+
+import pytest
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+
+import chromadb
+import numpy as np
+from onnx import TensorProto, helper, numpy_helper
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+
+from config.defaults import CONFIG
+from nlp.embed.local import OnnxEmbeddings
+from nlp.embed.model import get_embedding_function
+from nlp.embed.utils import check_embedding_compatibility
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+VOCAB = ["[PAD]", "[UNK]", "[CLS]", "hello", "world", "local", "embeddings"]
+
+
+def build_tiny_model(model_dir, dim=384):
+    """Write a stand-in 'transformer': an embedding lookup with the bge I/O names."""
+    rng = np.random.default_rng(0)
+    table = numpy_helper.from_array(
+        rng.standard_normal((len(VOCAB), dim)).astype(np.float32), "table"
+    )
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"])],
+        "tiny",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "seq"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "seq"]),
+        ],
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "seq", dim])],
+        initializer=[table],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    os.makedirs(model_dir, exist_ok=True)
+    onnx.save(model, os.path.join(model_dir, "model.onnx"))
+
+    tokenizer = Tokenizer(WordLevel({w: i for i, w in enumerate(VOCAB)}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.save(os.path.join(model_dir, "tokenizer.json"))
+
+
+@pytest.fixture
+def local_model(tmp_path, monkeypatch):
+    build_tiny_model(str(tmp_path / "bge-small-en-v1.5"))
+    monkeypatch.setitem(CONFIG["LOCAL"], "MODEL_DIR", str(tmp_path))
+    monkeypatch.setitem(CONFIG, "DEFAULT_PROVIDER", "LOCAL")
+    return tmp_path
+
+
+def test_provider_switch_returns_local_embeddings(local_model):
+    embedder = get_embedding_function()
+
+    assert isinstance(embedder, OnnxEmbeddings)
+    vectors = embedder.embed_documents(["hello world", "local embeddings", "hello"])
+    assert len(vectors) == 3 and len(vectors[0]) == 384
+    assert np.linalg.norm(vectors[0]) == pytest.approx(1.0, abs=1e-5)
+    # Batched and single inference agree
+    assert vectors[2] == pytest.approx(embedder.embed_query("hello"), abs=1e-5)
+
+
+def test_quantized_model_is_built_once(local_model):
+    OnnxEmbeddings(quantize=True).embed_query("hello")
+
+    assert (local_model / "bge-small-en-v1.5" / "model_int8.onnx").exists()
+
+
+def test_incompatible_collection_is_refused(local_model, tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    collection = client.get_or_create_collection("refusal_test")
+    collection.add(ids=["a"], embeddings=[[0.1] * 768], documents=["x"])
+    embedder = OnnxEmbeddings()
+
+    with pytest.raises(ValueError, match="768-d"):
+        check_embedding_compatibility(collection, embedder)
+
+    other = client.get_or_create_collection(
+        "other_model", metadata={"embed_model": "sentence-transformers/all-MiniLM-L6-v2"}
+    )
+    with pytest.raises(ValueError, match="refusing to mix"):
+        check_embedding_compatibility(other, embedder)
+
+
+def test_compatible_collection_is_stamped(local_model, tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    collection = client.get_or_create_collection(
+        "cloudflare_built", metadata={"embed_model": "@cf/baai/bge-small-en-v1.5"}
+    )
+    check_embedding_compatibility(collection, OnnxEmbeddings())
+
+    fresh = client.get_or_create_collection("fresh_collection")
+    check_embedding_compatibility(fresh, OnnxEmbeddings())
+    assert client.get_collection("fresh_collection").metadata["embed_dim"] == 384
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,80 @@
+# - tests/test_namespaces.py
+
+import logging
+
+import pytest
+
+from config.defaults import CONFIG
+from nlp.embed.namespaces import collection_for
+from nlp.embed.utils import get_client
+from nlp.retrieve import retriever_setup
+from scripts.ingest import run_pipeline
+from tests.conftest import write_page
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def write_corpus(folder, name):
+    folder.mkdir()
+    write_page(folder / f"{name}.html", name)
+    return folder
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch, gateway):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(CONFIG["CHROMA"], "NAMESPACES", {"handbook": "hr_handbook"})
+    monkeypatch.setattr(retriever_setup, "_retrievers", {})
+    return tmp_path
+
+
+def collections():
+    client = get_client(CONFIG["CHROMA"]["PERSIST_DIR"])
+    return {c.name: c.count() for c in client.list_collections()}
+
+
+def test_namespaces_map_to_collections(monkeypatch):
+    monkeypatch.setitem(CONFIG["CHROMA"], "NAMESPACES", {"handbook": "hr_handbook"})
+
+    assert collection_for() == collection_for("default") == CONFIG["CHROMA"]["COLLECTION_NAME"]
+    assert collection_for("handbook") == "hr_handbook"
+    assert collection_for("tenant-42") == "tenant-42"
+    for bad in ("x", "../etc", "-leading", "has space"):
+        with pytest.raises(ValueError):
+            collection_for(bad)
+
+
+def test_each_namespace_is_ingested_into_its_own_collection(workspace):
+    handbook = write_corpus(workspace / "handbook", "handbook")
+    tenant = write_corpus(workspace / "tenant", "tenant")
+
+    run_pipeline(handbook, namespace="handbook")
+    run_pipeline(tenant, namespace="tenant-42")
+    assert set(collections()) == {"hr_handbook", "tenant-42"}
+
+    # Purging one namespace leaves the others alone
+    before = collections()
+    run_pipeline(tenant, namespace="tenant-42", purge_vectorstore=True)
+    assert collections() == before
+
+    records = get_client(CONFIG["CHROMA"]["PERSIST_DIR"]).get_collection("hr_handbook").get()
+    assert {m["source"] for m in records["metadatas"]} == {str(handbook / "handbook.html")}
+
+
+def test_retrievers_are_cached_per_namespace(workspace):
+    run_pipeline(write_corpus(workspace / "handbook", "handbook"), namespace="handbook")
+
+    retriever = retriever_setup.get_retriever("handbook")
+    assert retriever_setup.get_retriever("handbook") is retriever
+    assert retriever.vectorstore._collection.name == "hr_handbook"
+    assert retriever_setup.get_retriever() is not retriever
+
+    # A request can't create a collection by naming one
+    with pytest.raises(ValueError):
+        retriever_setup.get_retriever("no-such-tenant")
+    assert "no-such-tenant" not in collections()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,87 @@
+# - tests/test_parse_files.py
+
+import logging
+import signal
+import time
+
+import pytest
+from langchain.schema import Document
+
+from input import parser
+from input.parser import PARSER_REGISTRY, parse_files_with_summary
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def parse_slow(file_path):
+    """Stand-in for a pathological file: sleeps for the seconds written in it."""
+    with open(file_path) as f:
+        time.sleep(float(f.read()))
+    return [Document(page_content="slow", metadata={"source": file_path})]
+
+
+def parse_stuck(file_path):
+    """Stand-in for a parser stuck in C code, where SIGALRM never reaches it."""
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    time.sleep(30)
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    monkeypatch.setitem(PARSER_REGISTRY, ".slow", parse_slow)
+    files = []
+    for i in range(6):
+        path = tmp_path / f"page{i}.html"
+        # Later pages are smaller, so workers finish out of order
+        path.write_text(f"<html><body><p>page {i}</p>{'<p>filler</p>' * (6 - i) * 2000}</body></html>")
+        files.append(path)
+    return files
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_output_order_is_deterministic(corpus, workers):
+    documents, summary = parse_files_with_summary(corpus, workers=workers)
+
+    assert [doc.metadata["source"] for doc in documents] == [str(p) for p in corpus]
+    assert summary.documents == 6 and not summary.failed
+
+
+def test_failures_and_timeouts_are_summarized(corpus, tmp_path):
+    hang = tmp_path / "hang.slow"
+    hang.write_text("30")
+    missing = tmp_path / "missing.html"
+    unknown = tmp_path / "notes.xyz"
+    unknown.write_text("?")
+
+    started = time.monotonic()
+    documents, summary = parse_files_with_summary(
+        [corpus[0], hang, missing, unknown, corpus[1]], workers=2, timeout=1
+    )
+
+    assert time.monotonic() - started < 10
+    assert [doc.metadata["source"] for doc in documents] == [str(corpus[0]), str(corpus[1])]
+    assert summary.timed_out == [str(hang)]
+    assert [path for path, _ in summary.failed] == [str(missing)]
+    assert "No such file" in summary.failed[0][1]
+    assert summary.unsupported == [str(unknown)]
+
+
+def test_files_queued_behind_hung_workers_are_still_parsed(corpus, tmp_path, monkeypatch):
+    monkeypatch.setitem(PARSER_REGISTRY, ".stuck", parse_stuck)
+    monkeypatch.setattr(parser, "_deadline", lambda path, timeout: 1)
+    hung = [tmp_path / "hang1.stuck", tmp_path / "hang2.stuck"]
+    for path in hung:
+        path.write_text("")
+
+    started = time.monotonic()
+    documents, summary = parse_files_with_summary(hung + corpus[:2], workers=2, timeout=0.5)
+
+    # Both workers hang; the pool is replaced and the healthy files parsed
+    assert time.monotonic() - started < 10
+    assert summary.timed_out == [str(path) for path in hung]
+    assert [doc.metadata["source"] for doc in documents] == [str(p) for p in corpus[:2]]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,132 @@
+# - tests/test_parse_pdf.py
+
+import logging
+from pathlib import Path
+
+import pytest
+
+from input.parse_pdf import PDF_CONFIG, PageTimeout, iter_pdf_pages, parse_pdf, pdf_info
+from input.parser import ParseSummary, iter_parsed, parse_files_with_summary
+from nlp.chunk.chunker import iter_chunks
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def write_pdf(path, pages, title=None):
+    """A minimal PDF with one line of Helvetica text per page (blank pages allowed)."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # the page tree, filled in once the pages are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode() if text else b""
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids),
+        len(kids),
+    )
+    if title:
+        objects.append(b"<< /Title (%s) >>" % title.encode())
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    trailer = b"/Size %d /Root 1 0 R" % (len(objects) + 1)
+    if title:
+        trailer += b" /Info %d 0 R" % len(objects)
+    out += b"trailer\n<< %s >>\nstartxref\n%d\n%%%%EOF\n" % (trailer, xref)
+    path.write_bytes(bytes(out))
+    return str(path)
+
+
+@pytest.fixture
+def report(tmp_path):
+    pages = [f"Page {n} of the annual report" for n in range(1, 7)]
+    pages[3] = ""  # a blank page yields no document
+    return write_pdf(tmp_path / "report.pdf", pages, title="Annual Report")
+
+
+def test_pages_stream_in_order_with_page_numbers(report):
+    assert pdf_info(report) == (6, "Annual Report")
+
+    pages = list(iter_pdf_pages(report))
+    assert [number for number, _, _ in pages] == [1, 2, 3, 4, 5, 6]
+    assert "Page 2 of the annual report" in pages[1][1]
+
+    subset = list(iter_pdf_pages(report, pagenos=[4, 1]))
+    assert [number for number, _, _ in subset] == [2, 5]
+
+
+def test_one_document_per_page_with_page_metadata(report):
+    documents = parse_pdf(report)
+
+    assert [doc.metadata["page"] for doc in documents] == [1, 2, 3, 5, 6]
+    assert documents[0].page_content == "Page 1 of the annual report"
+    assert {doc.metadata["title"] for doc in documents} == {"Annual Report"}
+    assert {doc.metadata["source"] for doc in documents} == {report}
+
+    chunks = list(iter_chunks(documents))
+    assert [chunk["metadata"]["page"] for chunk in chunks] == [1, 2, 3, 5, 6]
+
+
+def test_parallel_extraction_matches_sequential(report, monkeypatch):
+    sequential = parse_pdf(report)
+
+    monkeypatch.setitem(PDF_CONFIG, "workers", 2)
+    monkeypatch.setitem(PDF_CONFIG, "parallel_min_pages", 2)
+    parallel = parse_pdf(report)
+
+    assert [(d.page_content, d.metadata) for d in parallel] == [
+        (d.page_content, d.metadata) for d in sequential
+    ]
+
+
+def test_identical_text_on_different_pages_gets_distinct_ids(tmp_path):
+    path = write_pdf(tmp_path / "slides.pdf", ["Confidential", "Confidential"])
+
+    chunks = list(iter_chunks(parse_pdf(path)))
+
+    assert len({chunk["metadata"]["chunk_id"] for chunk in chunks}) == 2
+
+
+def test_parse_files_reads_pdfs_in_a_worker_pool(report, tmp_path):
+    other = write_pdf(tmp_path / "memo.pdf", ["A short memo"])
+
+    files = [Path(report), Path(other)]
+    documents, summary = parse_files_with_summary(files, workers=2, timeout=10)
+
+    assert summary.documents == 6 and not summary.failed and not summary.timed_out
+    assert documents[-1].metadata == {"source": other, "page": 1, "title": "memo"}
+
+
+def test_in_process_parsing_hands_on_one_page_at_a_time(report):
+    summary = ParseSummary()
+    parsed = iter_parsed([Path(report)], summary, workers=1)
+
+    path, first = next(parsed)
+    assert path == report and [d.metadata["page"] for d in first] == [1]
+    assert summary.documents == 0  # the file isn't finished yet
+    rest = [d.metadata["page"] for _, documents in parsed for d in documents]
+    assert rest == [2, 3, 5, 6]
+    assert summary.documents == 5 and summary.files == 1 and not summary.failed
+
+    # A page deadline isn't an error the parsers' except Exception may catch
+    assert not issubclass(PageTimeout, Exception)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
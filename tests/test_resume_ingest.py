@@ -0,0 +1,94 @@
+# - tests/test_resume_ingest.py
+
+import logging
+
+import chromadb
+import pytest
+
+from config.defaults import CONFIG
+from nlp.embed.model import CloudflareEmbeddings
+from nlp.embed.runs import RunLog
+from scripts.ingest import run_pipeline
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def workspace(source_dir, monkeypatch, gateway):
+    # Small batches, so a run that dies part-way has stored (and recorded) some
+    monkeypatch.setitem(CONFIG["CLOUDFLARE"], "embed_batch_size", 5)
+    monkeypatch.setitem(CONFIG["CHROMA"], "WRITE_BATCH_SIZE", 5)
+    for name in ("alpha", "beta", "gamma"):
+        paragraphs = "".join(
+            f"<p>{name} paragraph {j} has enough words to make a few chunks of text.</p>"
+            for j in range(60)
+        )
+        (source_dir / f"{name}.html").write_text(f"<html><body>{paragraphs}</body></html>")
+    return source_dir, gateway
+
+
+def gateway_drops_after(monkeypatch, calls):
+    """Make the embedder raise, as a dropped gateway would, after ``calls`` batches."""
+    original = CloudflareEmbeddings.embed_documents_partial
+    made = []
+
+    def flaky(self, texts):
+        if len(made) >= calls:
+            raise ConnectionError("gateway went away")
+        made.append(texts)
+        return original(self, texts)
+
+    monkeypatch.setattr(CloudflareEmbeddings, "embed_documents_partial", flaky)
+
+
+def embedded_texts(gateway):
+    return [text for _, payload in gateway.requests for text in payload["text"]]
+
+
+def stored_count():
+    client = chromadb.PersistentClient(path=CONFIG["CHROMA"]["PERSIST_DIR"])
+    return client.get_collection(CONFIG["CHROMA"]["COLLECTION_NAME"]).count()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_resume_skips_chunks_already_stored(workspace, monkeypatch, stream):
+    source, gateway = workspace
+    with monkeypatch.context() as patch:
+        gateway_drops_after(patch, 3)
+        with pytest.raises(ConnectionError):
+            run_pipeline(source, purge_vectorstore=True, stream=stream)
+
+    runs = RunLog()
+    failed = runs.recent(1)[0]
+    assert failed["status"] == "failed" and "gateway went away" in failed["error"]
+    stored_before = stored_count()
+    assert stored_before > 0
+    first_attempt = embedded_texts(gateway)
+
+    run_pipeline(None, resume=failed["run_id"])
+
+    record = runs.get(failed["run_id"])
+    assert record["status"] == "completed" and record["attempts"] == 2
+    assert record["stored"] == stored_count() == record["chunks"]
+    assert record["skipped"] == stored_before
+    # Nothing stored by the first attempt was embedded again
+    second_attempt = embedded_texts(gateway)[len(first_attempt) :]
+    assert len(second_attempt) == record["chunks"] - stored_before
+
+    with pytest.raises(ValueError):
+        run_pipeline(None, resume=failed["run_id"])
+
+
+def test_completed_runs_get_a_status_record(workspace):
+    source, _ = workspace
+    run_id = run_pipeline(source)
+
+    record = RunLog().get(run_id)
+    assert record["status"] == "completed"
+    assert record["stored"] == record["chunks"] == stored_count()
+    assert record["failed"] == 0 and record["duration"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
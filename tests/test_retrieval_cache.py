@@ -0,0 +1,96 @@
+# - tests/test_retrieval_cache.py
+
+import logging
+import time
+
+import pytest
+from langchain.embeddings.base import Embeddings
+
+from config.defaults import CONFIG
+from nlp.retrieve import cache, retriever_setup
+from nlp.retrieve.cache import CachedQueryEmbeddings, LRUCache
+from scripts.ingest import run_pipeline
+from tests.conftest import write_page
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class CountingEmbeddings(Embeddings):
+    model_id = "counting"
+
+    def __init__(self):
+        self.queries = []
+
+    def embed_documents(self, texts):
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [float(len(text))]
+
+
+def test_lru_is_bounded_and_entries_expire():
+    lru = LRUCache(max_entries=2, ttl=0.2)
+    for key in "abc":
+        lru.get_or_compute(key, lambda: key.upper())
+    assert len(lru) == 2  # "a" was evicted
+
+    assert lru.get_or_compute("c", lambda: "recomputed") == "C"
+    time.sleep(0.25)
+    assert lru.get_or_compute("c", lambda: "recomputed") == "recomputed"
+
+    stats = lru.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 4)
+    assert stats["saved_seconds"] >= 0
+
+
+def test_near_identical_questions_share_a_query_vector():
+    inner = CountingEmbeddings()
+    embeddings = CachedQueryEmbeddings(inner, LRUCache(16))
+
+    first = embeddings.embed_query("What is the refund policy?")
+    assert embeddings.embed_query("  what is the REFUND policy ") == first
+    assert embeddings.embed_query("What is the shipping policy?") != first
+
+    assert len(inner.queries) == 2
+    assert embeddings.model_id == "counting"
+
+
+@pytest.fixture
+def workspace(source_dir, monkeypatch, gateway):
+    monkeypatch.setitem(CONFIG["BM25"], "enabled", False)  # dense results only
+    monkeypatch.setattr(retriever_setup, "_retrievers", {})
+    monkeypatch.setattr(retriever_setup, "_embedding_function", None)
+    monkeypatch.setattr(cache, "query_embeddings", LRUCache(16))
+    monkeypatch.setattr(cache, "results", LRUCache(16, ttl=60))
+    write_page(source_dir / "alpha.html", "alpha")
+    return source_dir, gateway
+
+
+def test_results_are_cached_until_an_ingest_changes_the_collection(workspace):
+    source, gateway = workspace
+    run_pipeline(source)
+    retriever = retriever_setup.get_retriever()
+
+    sent = len(gateway.requests)
+    first = retriever.get_relevant_documents("Tell me about alpha?")
+    again = retriever.get_relevant_documents("tell me about alpha")
+    assert [d.page_content for d in again] == [d.page_content for d in first]
+    assert len(gateway.requests) == sent + 1  # one query embedding for both
+    assert cache.results.stats()["hits"] == 1
+
+    # An ingest bumps the collection version: the next search runs again
+    write_page(source / "beta.html", "beta")
+    run_pipeline(source)
+    updated = retriever.get_relevant_documents("Tell me about alpha?")
+    assert {d.metadata["source"] for d in updated} == {
+        str(source / "alpha.html"),
+        str(source / "beta.html"),
+    }
+    stats = cache.cache_stats()
+    assert stats["results"]["misses"] == 2 and stats["query_embeddings"]["hits"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
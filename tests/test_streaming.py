@@ -0,0 +1,101 @@
+# - tests/test_streaming.py
+
+import json
+import logging
+import time
+
+import chromadb
+import pytest
+from langchain.schema import Document
+
+from input.parser import PARSER_REGISTRY
+from nlp.embed.model import CloudflareEmbeddings
+from scripts.streaming import StreamingPipeline
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+NAV = "Skip to content News USA Canada Catholic Abortion Faith Family Opinion Blogs"
+NAV_LINES = [f"{NAV} {i}" for i in range(6)]  # fills a whole chunk on its own
+
+
+@pytest.fixture
+def gateway(gateway):
+    gateway.latency = 0.01
+    return gateway
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for i in range(12):
+        body = "".join(f"<p>{line}</p>" for line in NAV_LINES) + "".join(
+            f"<p>Page {i} paragraph {j} talks about topic {i * 100 + j} at length.</p>"
+            for j in range(30)
+        )
+        (source / f"page{i}.html").write_text(f"<html><body>{body}</body></html>")
+    return source
+
+
+def pipeline(corpus, tmp_path, **kwargs):
+    return StreamingPipeline(
+        corpus,
+        persist_dir=str(tmp_path / "chroma"),
+        collection_name="streaming_test",
+        chunk_file=str(tmp_path / "chunks.jsonl"),
+        queue_size=2,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_stream_stores_every_unique_chunk(gateway, corpus, tmp_path, concurrency):
+    run = pipeline(corpus, tmp_path, concurrency=concurrency)
+    written = run.run()
+
+    chunks = [json.loads(line) for line in open(tmp_path / "chunks.jsonl")]
+    collection = chromadb.PersistentClient(path=str(tmp_path / "chroma")).get_collection(
+        "streaming_test"
+    )
+    assert written == len(chunks) == run.chunks == collection.count()
+    assert run.parse_summary.files == 12
+    # The first page's nav chunk survives and, once stored, is updated with its copies
+    nav_id = next(c["metadata"]["chunk_id"] for c in chunks if c["page_content"].startswith(NAV))
+    stored = collection.get(ids=[nav_id])["metadatas"][0]
+    assert stored["duplicate_count"] >= 11
+
+
+def test_failing_stage_stops_the_pipeline(gateway, corpus, tmp_path, monkeypatch):
+    def broken(self, texts):
+        raise RuntimeError("embedding backend exploded")
+
+    monkeypatch.setattr(CloudflareEmbeddings, "embed_documents_partial", broken)
+
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="exploded"):
+        pipeline(corpus, tmp_path, concurrency=2).run()
+    assert time.monotonic() - started < 10
+
+
+def parse_slow(file_path):
+    time.sleep(3)
+    return [Document(page_content="slow", metadata={"source": file_path})]
+
+
+def test_parse_timeout_holds_off_the_main_thread(gateway, corpus, tmp_path, monkeypatch):
+    monkeypatch.setitem(PARSER_REGISTRY, ".slow", parse_slow)
+    slow = corpus / "stuck.slow"
+    slow.write_text("")
+
+    started = time.monotonic()
+    run = pipeline(corpus, tmp_path, files=[slow, corpus / "page0.html"], workers=1, timeout=1)
+    run.run()
+
+    assert time.monotonic() - started < 3
+    assert run.parse_summary.timed_out == [str(slow)]
+    assert run.parse_summary.documents == 1 and run.chunks > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
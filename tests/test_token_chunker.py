@@ -0,0 +1,132 @@
+# - tests/test_token_chunker.py
+
+import logging
+
+import pytest
+import tiktoken
+from langchain.schema import Document
+from tokenizers import Tokenizer, models, normalizers, pre_tokenizers
+
+from config.defaults import CONFIG
+from nlp.chunk.chunker import _break_before, chunker, iter_chunks, split_tokens
+from nlp.utils import tokenizer as tokenizers_module
+from nlp.utils.tokenizer import TokenizerJsonEncoding, encode_with_offsets
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope="module")
+def encoding():
+    # Byte-level BPE with a few merges: built locally, so no vocabulary download
+    ranks = {bytes([i]): i for i in range(256)}
+    for merged in (b"th", b"he", b" t", b" th", b"the", b" the", b"in", b"er", b"an"):
+        ranks[merged] = len(ranks)
+    return tiktoken.Encoding(
+        name="test-bytes",
+        pat_str=r"""'s|'t| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+        mergeable_ranks=ranks,
+        special_tokens={},
+    )
+
+
+@pytest.fixture
+def wordpiece(tmp_path, monkeypatch):
+    # A BERT-style WordPiece tokenizer.json, laid out like the local embedding model's
+    monkeypatch.setitem(CONFIG["LOCAL"], "MODEL_DIR", str(tmp_path))
+    words = {w.lower() for w in article().replace(".", " . ").split()}
+    vocab = {token: i for i, token in enumerate(["[UNK]", "[CLS]", "[SEP]", *sorted(words)])}
+    wordpiece = Tokenizer(models.WordPiece(vocab, unk_token="[UNK]"))
+    wordpiece.normalizer = normalizers.BertNormalizer(lowercase=True)
+    wordpiece.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    path = tmp_path / "bge-small-en-v1.5" / "tokenizer.json"
+    path.parent.mkdir()
+    wordpiece.save(str(path))
+    tokenizers_module.get_tokenizer.cache_clear()
+    yield tokenizers_module.get_tokenizer("embedding")
+    tokenizers_module.get_tokenizer.cache_clear()
+
+
+def article(paragraphs=8):
+    return "\n\n".join(
+        f"Paragraph {p} begins here. " + " ".join(f"Then the sentence {s} follows." for s in range(6))
+        for p in range(paragraphs)
+    )
+
+
+def test_windows_respect_the_token_budget(encoding):
+    text = article()
+    windows = list(split_tokens(text, encoding, size=120, overlap=20))
+
+    assert len(windows) > 3
+    for chunk, count in windows:
+        assert 0 < count <= 120
+        assert chunk in text  # slices of the original, never re-decoded fragments
+        assert abs(len(encoding.encode_ordinary(chunk)) - count) <= 1
+    assert windows[0][0].startswith("Paragraph 0")
+
+
+def test_windows_prefer_sentence_and_paragraph_breaks(encoding):
+    windows = list(split_tokens(article(), encoding, size=120, overlap=20))
+
+    assert all(chunk.endswith(".") for chunk, _ in windows)
+
+
+def test_leading_whitespace_is_not_a_sentence_break(encoding):
+    text = "  alpha beta gamma delta."
+    _, tokens, offsets = encode_with_offsets(encoding, text)
+
+    # Nothing precedes the opening spaces, so the full stop at the end doesn't count
+    assert _break_before(text, offsets, 0, len(tokens) - 1) == len(tokens) - 1
+
+
+def test_windows_overlap(encoding):
+    text = "".join(chr(ord("a") + i % 26) for i in range(300))  # no breaks to snap to
+    windows = [chunk for chunk, _ in split_tokens(text, encoding, size=100, overlap=10)]
+
+    assert [len(chunk) for chunk in windows] == [100, 100, 100, 30]
+    assert windows[1][:10] == windows[0][-10:]
+
+
+def test_overlap_must_be_below_the_size(encoding):
+    with pytest.raises(ValueError):
+        list(split_tokens("text", encoding, size=10, overlap=10))
+
+
+def test_token_chunks_record_their_token_count(encoding):
+    documents = [Document(page_content=article(), metadata={"source": "a.html", "title": "A"})]
+
+    chunks = list(iter_chunks(documents, size=120, overlap=20, unit="tokens", encoding=encoding))
+
+    assert all(0 < chunk["metadata"]["token_count"] <= 120 for chunk in chunks)
+    character_chunks = list(iter_chunks(documents, unit="chars", encoding=encoding))
+    assert all(
+        chunk["metadata"]["token_count"] == len(encoding.encode_ordinary(chunk["page_content"]))
+        for chunk in character_chunks
+    )
+
+
+def test_embedding_models_wordpiece_tokenizer_is_used(wordpiece):
+    assert isinstance(wordpiece, TokenizerJsonEncoding)
+    text = article()
+    windows = list(split_tokens(text, wordpiece, size=60, overlap=10))
+
+    assert len(windows) > 3
+    for chunk, count in windows:
+        assert chunk in text and chunk.endswith(".")
+        # WordPiece has no whitespace tokens, so the count is exact
+        assert count == len(wordpiece.encode_ordinary(chunk)) <= 60
+
+
+def test_pool_output_matches_in_process_chunking(encoding):
+    documents = [
+        Document(page_content=article(3 + i % 4), metadata={"source": f"doc{i}.html"})
+        for i in range(24)
+    ]
+    options = dict(size=120, overlap=20, unit="tokens", encoding=encoding)
+
+    assert chunker(documents, workers=3, **options) == chunker(documents, workers=1, **options)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,72 @@
+# - tests/test_transport.py
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from config.defaults import CONFIG
+from nlp.embed.model import CloudflareEmbeddings
+from nlp.llms.cloudflare import CloudflareLLM
+from nlp.utils import transport
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def gateway(gateway):
+    transport.close_session()
+    yield gateway
+    transport.close_session()
+
+
+def test_clients_share_one_keep_alive_connection(gateway):
+    embedder = CloudflareEmbeddings()
+    llm = CloudflareLLM()
+
+    for _ in range(3):
+        embedder.embed_query("What is LangChain?")
+        assert llm("Say hi") == "mock answer"
+
+    assert len(gateway.requests) == 6
+    assert len(set(gateway.connections)) == 1
+
+
+def test_session_is_shared_across_threads(gateway):
+    embedder = CloudflareEmbeddings()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        vectors = list(pool.map(embedder.embed_query, [f"q{i}" for i in range(32)]))
+
+    assert len(vectors) == 32
+    # Never more sockets than the pool allows, however many threads ask
+    assert len(set(gateway.connections)) <= CONFIG["HTTP"]["pool_maxsize"]
+
+
+def test_large_bodies_are_gzipped_when_enabled(gateway, monkeypatch):
+    monkeypatch.setitem(CONFIG["HTTP"], "gzip_requests", True)
+    embedder = CloudflareEmbeddings()
+
+    embedder.embed_query("short")
+    embedder.embed_documents(["long text " * 200])
+
+    assert "Content-Encoding" not in gateway.headers[0]
+    assert gateway.headers[1]["Content-Encoding"] == "gzip"
+
+
+def test_generation_is_not_resent_after_a_server_error(gateway):
+    gateway.fail_status = 502  # may arrive after the completion was generated
+    with pytest.raises(requests.exceptions.HTTPError):
+        CloudflareLLM()("Say hi __FAIL__")
+    assert len(gateway.requests) == 1
+
+
+def test_rate_limit_with_retry_after_is_retried(gateway):
+    gateway.rate_limit_first = 1
+    assert CloudflareLLM()("Say hi") == "mock answer"
+    assert len(gateway.requests) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
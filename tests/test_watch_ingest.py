@@ -0,0 +1,101 @@
+# - tests/test_watch_ingest.py
+
+import logging
+import os
+import threading
+import time
+
+import pytest
+
+from config.defaults import CONFIG
+from input.get_files import get_files
+from input.watcher import DirectoryWatcher
+from nlp.embed import model
+from nlp.embed.utils import get_client
+from scripts.ingest import watch_and_ingest
+from tests.conftest import write_page
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def stored_sources():
+    # The watcher's own client: a second one would race it to create the database
+    client = get_client(CONFIG["CHROMA"]["PERSIST_DIR"])
+    try:
+        records = client.get_collection(CONFIG["CHROMA"]["COLLECTION_NAME"]).get()
+    except ValueError:
+        return set()  # the first run hasn't created it yet
+    return {metadata["source"] for metadata in records["metadatas"]}
+
+
+def eventually(condition, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_a_burst_of_changes_is_released_once_it_settles(tmp_path):
+    watcher = DirectoryWatcher(tmp_path, interval=0.02, debounce=0.2, max_wait=5)
+    stop = threading.Event()
+    result = []
+    thread = threading.Thread(target=lambda: result.append(watcher.wait(stop)))
+    thread.start()
+
+    for i in range(5):
+        write_page(tmp_path / f"page{i}.html", f"page{i}")
+        (tmp_path / "notes.bin").write_bytes(b"unsupported")
+        time.sleep(0.05)
+    thread.join(timeout=5)
+
+    assert result == [sorted(str(tmp_path / f"page{i}.html") for i in range(5))]
+    stop.set()
+    assert watcher.wait(stop) is None
+
+
+@pytest.fixture
+def workspace(source_dir, gateway):
+    write_page(source_dir / "alpha.html", "alpha")
+    return source_dir
+
+
+def test_watch_ingests_new_files_and_applies_deletes(workspace, monkeypatch):
+    source = workspace
+    built, listed = [], []
+    original = model.get_embedding_function
+    monkeypatch.setattr(
+        "scripts.ingest.get_embedding_function",
+        lambda **kwargs: built.append(kwargs) or original(**kwargs),
+    )
+    monkeypatch.setattr(
+        "scripts.ingest.get_files", lambda path: listed.append(path) or get_files(path)
+    )
+    stop = threading.Event()
+    watcher = DirectoryWatcher(source, interval=0.05, debounce=0.2)
+    thread = threading.Thread(target=watch_and_ingest, args=(source, stop, watcher))
+    thread.start()
+    try:
+        alpha, beta = str(source / "alpha.html"), str(source / "beta.html")
+        assert eventually(lambda: stored_sources() == {alpha})
+
+        write_page(source / "beta.html", "beta")
+        assert eventually(lambda: stored_sources() == {alpha, beta})
+
+        os.remove(alpha)
+        assert eventually(lambda: stored_sources() == {beta})
+    finally:
+        stop.set()
+        thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    # One embedder for the whole session, not one per update
+    assert len(built) == 1
+    # Updates plan only the paths the watcher reported; just the catch-up lists the directory
+    assert listed == [source]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])